@@ -1,12 +1,17 @@
 from flask import jsonify, request, current_app
 from app.api.v1 import bp
-from app.models import SiteRecord, TaskRecord, db
-from app.tasks import social_queue_manager, classifier_queue_manager, location_queue_manager, celery
+from app.models import SiteRecord, TaskRecord, ClassificationSample, db
+from app.scrape import Scraper
+from app.retraining import is_held_out
+from app.domain import domain_cache, http_client
+from app.tasks import social_queue_manager, classifier_queue_manager, location_queue_manager, location_bulk_queue_manager, LOCATION_BULK_MAX_URLS, LOCATION_BULK_SAVE_CHUNK, celery, classifier, classification_cache, classification_cache_version
 from app.utils import cache, limiter
+from app.classifier import MISSING_MODEL_MESSAGE
 from celery.signals import task_success
 from datetime import datetime
 from sqlalchemy.exc import SQLAlchemyError
 import requests as req
+from uuid import uuid4
 
 
 # Helper function to calculate hash and check existing record
@@ -74,11 +79,16 @@ def analyze_social():
         if not html or not url:
             return jsonify({'status': 'error', 'message': 'HTML and URL are required'}), 400
 
+        # Optional list of the fields to extract; all of them when omitted
+        fields = request_data.get('fields')
+        if fields is not None and (not isinstance(fields, list) or any(field not in Scraper.extractors for field in fields)):
+            return jsonify({'status': 'error', 'message': f"fields must be a list of: {', '.join(Scraper.extractors)}"}), 400
+
         # Check if site already exists with the same content
         existing_response, existing_record, new_html_hash = get_existing_site_record(url, html)
       
-        # Create new social analysis task
-        social_task = social_queue_manager.apply_async(args=[html, url])
+        # Create new social analysis task (optional 'streaming' flag forces the parsing mode)
+        social_task = social_queue_manager.apply_async(args=[html, url], kwargs={'streaming': request_data.get('streaming'), 'fields': fields})
 
         # Update or create record in the database
         record = update_or_create_site_record(
@@ -110,11 +120,36 @@ def analyze_classification():
         if not html or not url:
             return jsonify({'status': 'error', 'message': 'HTML and URL are required'}), 400
 
-        # Check if site already exists (no need for HTML comparison here)
-        _, existing_record, new_html_hash = get_existing_site_record(url, html)
+        # Check if site already exists with the same content
+        existing_response, existing_record, new_html_hash = get_existing_site_record(url, html)
+        if existing_response:
+            # Unchanged HTML: the status code is returned in place of the hash
+            new_html_hash = existing_record.html_hash
+
+        model_version = classifier.model_version()
+        if model_version is None:
+            # Every task would fail until a model is built
+            return jsonify({'status': 'error', 'message': MISSING_MODEL_MESSAGE}), 503
+
+        # The same HTML was already classified by the current model: point the record at
+        # the task that did it instead of enqueueing another one
+        cached = classification_cache.get(classification_cache.html_key(classification_cache_version(model_version), new_html_hash))
+        if cached is not None:
+            record = update_or_create_site_record(
+                url=url,
+                new_html_hash=new_html_hash,
+                classifier_task_id=cached['task_id']
+            )
+            return jsonify({
+                'status': 'success',
+                'message': 'Classification found for identical content',
+                'task_id': cached['task_id'],
+                'record_id': record.id,
+                'result': {'predicted': cached['predicted']}
+            }), 200
 
         # Create new classification analysis task
-        classifier_task = classifier_queue_manager.apply_async(args=[html])
+        classifier_task = classifier_queue_manager.apply_async(args=[html], kwargs={'streaming': request_data.get('streaming')})
 
         # Update or create record in the database
         record = update_or_create_site_record(
@@ -168,6 +203,51 @@ def analyze_location():
         current_app.logger.error(f"Error in analyze_location: {str(e)}")
         return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
 
+# Endpoint to analyze the location of many URLs at once, each distinct lookup being run once
+@bp.route('/analysis/location/bulk', methods=['POST'])
+@limiter.limit("10/minute")
+def analyze_location_bulk():
+    try:
+        request_data = request.get_json()
+        urls = request_data.get('urls') if isinstance(request_data, dict) else None
+
+        if not isinstance(urls, list) or not urls or not all(isinstance(url, str) and url for url in urls):
+            return jsonify({'status': 'error', 'message': 'A non-empty list of URLs is required'}), 400
+        # Repeated URLs are analyzed once, in the order first given
+        urls = list(dict.fromkeys(urls))
+        if len(urls) > LOCATION_BULK_MAX_URLS:
+            return jsonify({'status': 'error', 'message': f'At most {LOCATION_BULK_MAX_URLS} URLs are analyzed at once'}), 400
+        if any(len(url) > 255 for url in urls):
+            return jsonify({'status': 'error', 'message': 'URLs must be at most 255 characters'}), 400
+
+        # The records point at the task before it starts, so its results always find them
+        task_id = str(uuid4())
+        record_ids = {}
+        for start in range(0, len(urls), LOCATION_BULK_SAVE_CHUNK):
+            chunk = urls[start:start + LOCATION_BULK_SAVE_CHUNK]
+            records = {record.url: record for record in SiteRecord.query.filter(SiteRecord.url.in_(chunk))}
+            for url in chunk:
+                if url in records:
+                    records[url].location_task_id = task_id
+                else:
+                    records[url] = SiteRecord(url=url, location_task_id=task_id)
+                    db.session.add(records[url])
+            db.session.commit()
+            record_ids.update((url, records[url].id) for url in chunk)
+
+        location_bulk_queue_manager.apply_async(args=[urls], task_id=task_id)
+
+        return jsonify({
+            'status': 'success',
+            'message': 'Bulk location analysis task started',
+            'task_id': task_id,
+            'record_ids': record_ids
+        }), 202
+
+    except Exception as e:
+        current_app.logger.error(f"Error in analyze_location_bulk: {str(e)}")
+        return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
+
 # Task status checking endpoint
 @bp.route('/tasks/<task_id>', methods=['GET'])
 @limiter.limit("200/minute")
@@ -180,7 +260,9 @@ def get_task_status(task_id):
     return jsonify({
         'task_id': task.id,
         'state': task.state,
-        'result': task.result if task.state == 'SUCCESS' else None,
+        'result': public_result(task.result) if task.state == 'SUCCESS' else None,
+        # How far a task reporting its progress, such as a bulk location analysis, has got
+        'progress': task.info if task.state == 'PROGRESS' else None,
     }), 200
 
 @bp.route('/tasks/<task_id>/update', methods=['POST'])
@@ -200,6 +282,15 @@ def update_task_result(task_id):
 
     # Replace the existing result with the new one
     task_record.result = data['result']
+
+    # A corrected classification labels the page text it was predicted from, for retraining
+    if isinstance(data['result'], dict) and isinstance(data['result'].get('predicted'), str):
+        # The wrong prediction is no longer served from the cache
+        classification_cache.invalidate_task(task_id)
+        sample = ClassificationSample.query.filter_by(task_id=task_id).first()
+        if sample:
+            sample.label = data['result']['predicted']
+            sample.corrected_at = datetime.utcnow()
     db.session.commit()
 
     return jsonify({
@@ -209,6 +300,26 @@ def update_task_result(task_id):
         'new_result': task_record.result
     }), 200
 
+# Hit and miss counts of the domain lookup cache, for sizing it
+@bp.route('/stats/domain-cache', methods=['GET'])
+@limiter.limit("100/minute")
+def get_domain_cache_stats():
+    try:
+        return jsonify({'status': 'success', 'stats': domain_cache.stats()}), 200
+    except Exception as e:
+        current_app.logger.error(f"Error in get_domain_cache_stats: {str(e)}")
+        return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
+
+# Request counts and latency histograms of the enrichment lookups' upstreams
+@bp.route('/stats/http', methods=['GET'])
+@limiter.limit("100/minute")
+def get_http_stats():
+    try:
+        return jsonify({'status': 'success', 'stats': http_client.stats()}), 200
+    except Exception as e:
+        current_app.logger.error(f"Error in get_http_stats: {str(e)}")
+        return jsonify({'status': 'error', 'message': 'Internal server error'}), 500
+
 # Endpoint to flag a record
 @bp.route('/records/<int:record_id>/flag', methods=['POST'])
 @limiter.limit("100/minute")
@@ -278,8 +389,9 @@ def get_all_records():
                         # Fetch task details from Celery
                         celery_task = celery.AsyncResult(task_id)
                         if celery_task.state == 'SUCCESS':
+                            save_classification_sample(task_id, celery_task.result)
                             # Serialize the result to ensure it's JSON serializable
-                            serialized_result = serialize_dates(celery_task.result)
+                            serialized_result = serialize_dates(public_result(celery_task.result))
                             # Create a new TaskRecord and save it
                             task = TaskRecord(
                                 task_id=task_id,
@@ -350,10 +462,11 @@ def save_task_record_if_done(task_id):
 
         if existing_record is None:
             # If no existing record, create a new one
+            save_classification_sample(task.id, task.result)
             task_record = TaskRecord(
                 task_id=task.id,
                 state=task.state,
-                result=task.result
+                result=public_result(task.result)
             )
             db.session.add(task_record)
             db.session.commit()
@@ -366,6 +479,22 @@ def save_task_record_if_done(task_id):
 
 
 
+def public_result(result):
+    """Returns a task result without the page text classification results carry for retraining."""
+    if isinstance(result, dict) and 'text' in result and 'predicted' in result:
+        return {key: value for key, value in result.items() if key != 'text'}
+    return result
+
+
+def save_classification_sample(task_id, result):
+    """Keeps the page text of a classification result, so a later correction of it can be trained on."""
+    if not (isinstance(result, dict) and 'text' in result and 'predicted' in result):
+        return
+    if ClassificationSample.query.filter_by(task_id=task_id).first() is None:
+        db.session.add(ClassificationSample(task_id=task_id, text=result['text'], predicted=result['predicted'],
+                                            held_out=is_held_out(task_id)))
+
+
 @task_success.connect
 def on_task_success(sender, result, **kwargs):
     task_id = sender.request.id
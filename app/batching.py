@@ -0,0 +1,69 @@
+import threading
+import time
+from concurrent.futures import Future
+from queue import Queue, Empty
+
+
+class MicroBatcher:
+    """
+    Groups items submitted from many threads into batches and processes each batch with
+    a single call to ``handler``, which takes a list of items and returns their results
+    in the same order. A batch is handed over once it has ``max_items`` items, or
+    ``max_wait`` seconds after its first item arrived. Each submitter gets back the
+    result of its own item.
+    """
+
+    def __init__(self, handler, max_items=32, max_wait=0.01):
+        self.handler = handler
+        self.max_items = max_items
+        self.max_wait = max_wait
+        self.batch_count = 0
+        self.item_count = 0
+        self._queue = Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, item):
+        """Queues an item and returns a Future for its result."""
+        future = Future()
+        self._queue.put((item, future))
+        self._ensure_running()
+        return future
+
+    def _ensure_running(self):
+        # Also restarts the thread in forked worker processes, where it does not survive
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                    self._thread.start()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_items:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            self.batch_count += 1
+            self.item_count += len(batch)
+            try:
+                results = list(self.handler([item for item, _ in batch]))
+                if len(results) != len(batch):
+                    # Otherwise the submitters of the items without a result would wait forever
+                    raise ValueError(f"Batch handler returned {len(results)} results for {len(batch)} items")
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
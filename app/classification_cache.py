@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import hashlib
+from redis import Redis, RedisError
+
+
+def normalize_text(text):
+    """
+    Lowercases the text and collapses its whitespace. The classifier's vectorizers
+    lowercase the text and split it into words, so texts that normalize alike get the
+    same prediction.
+    """
+    return ' '.join(text.lower().split())
+
+
+class ClassificationCache:
+    """
+    Caches classification results in Redis, under keys made of the model version and a
+    hash of the page: of its HTML, so a repeated page is answered without parsing it, and
+    of its normalized text, so a page whose markup changed but whose text did not is
+    answered without classifying it. A new model version uses new keys, so results of the
+    previous model are never returned; they are evicted as the oldest entries.
+
+    The cache holds at most ``max_entries`` entries (0 disables it), evicting the least
+    recently used ones, and each entry expires ``ttl`` seconds after it was stored. The
+    keys of each task's result are recorded, so a corrected result can be removed with
+    invalidate_task(). When Redis can't be reached, lookups miss and classification goes
+    on without the cache.
+    """
+
+    index_key = 'classification:index'  # Sorted set of the entries by last use
+    expiry_key = 'classification:expiry'  # Sorted set of the entries by when they expire
+
+    def __init__(self, url=None, max_entries=None, ttl=None, client=None):
+        self.url = url or os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+        if max_entries is None:
+            max_entries = int(os.getenv('CLASSIFICATION_CACHE_SIZE', 100000))
+        self.max_entries = max_entries
+        if ttl is None:
+            # Entries point at the task that stored them, whose result Celery keeps for a day
+            ttl = int(os.getenv('CLASSIFICATION_CACHE_TTL', 86400))
+        self.ttl = ttl
+        self._client = client
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def client(self):
+        # Connected on first use, in the process that uses it
+        if self._client is None:
+            self._client = Redis.from_url(self.url, socket_timeout=1, socket_connect_timeout=1)
+        return self._client
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    @staticmethod
+    def html_key(version, html_hash):
+        return f'classification:{version}:html:{html_hash}'
+
+    @staticmethod
+    def task_key(task_id):
+        return f'classification:task:{task_id}'
+
+    @staticmethod
+    def text_key(version, text):
+        return f"classification:{version}:text:{hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()}"
+
+    def get(self, key):
+        """Returns the cached result stored under the key, or None."""
+        if not self.enabled:
+            return None
+        try:
+            value = self.client.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.client.zadd(self.index_key, {key: time.time()}, xx=True)
+        except RedisError as e:
+            print(f"Classification cache unavailable: {str(e)}")
+            return None
+        self.hits += 1
+        return json.loads(value)
+
+    def set(self, keys, result):
+        """
+        Stores a result under each of the keys, evicting the least recently used entries
+        beyond the size limit. The keys are recorded as those of the result's task.
+        """
+        if not self.enabled:
+            return
+        now = time.time()
+        value = json.dumps(result)
+        try:
+            pipeline = self.client.pipeline()
+            for key in keys:
+                pipeline.set(key, value, ex=self.ttl)
+            pipeline.zadd(self.index_key, {key: now for key in keys})
+            pipeline.zadd(self.expiry_key, {key: now + self.ttl for key in keys})
+            if 'task_id' in result:
+                self._remember(pipeline, result['task_id'], keys)
+            # Entries Redis expired are still in the index; they must not count towards the limit
+            pipeline.zrangebyscore(self.expiry_key, '-inf', now)
+            pipeline.zcard(self.index_key)
+            *_, expired, size = pipeline.execute()
+            if expired:
+                pipeline = self.client.pipeline()
+                pipeline.zrem(self.index_key, *expired)
+                pipeline.zrem(self.expiry_key, *expired)
+                size -= pipeline.execute()[0]
+            if size > self.max_entries:
+                evicted = [key for key, _ in self.client.zpopmin(self.index_key, size - self.max_entries)]
+                if evicted:
+                    pipeline = self.client.pipeline()
+                    pipeline.delete(*evicted)
+                    pipeline.zrem(self.expiry_key, *evicted)
+                    pipeline.execute()
+        except RedisError as e:
+            print(f"Classification cache unavailable: {str(e)}")
+
+    def _remember(self, pipeline, task_id, keys):
+        pipeline.sadd(self.task_key(task_id), *keys)
+        pipeline.expire(self.task_key(task_id), self.ttl)
+
+    def remember(self, task_id, keys):
+        """Records keys as those a task's result came from, such as the entries a cache hit was answered with."""
+        if not self.enabled or not keys:
+            return
+        try:
+            pipeline = self.client.pipeline()
+            self._remember(pipeline, task_id, keys)
+            pipeline.execute()
+        except RedisError as e:
+            print(f"Classification cache unavailable: {str(e)}")
+
+    def invalidate_task(self, task_id):
+        """Removes the entries a task's result was stored under or answered from, once the result was corrected."""
+        if not self.enabled:
+            return
+        try:
+            keys = self.client.smembers(self.task_key(task_id))
+            pipeline = self.client.pipeline()
+            if keys:
+                pipeline.delete(*keys)
+                pipeline.zrem(self.index_key, *keys)
+                pipeline.zrem(self.expiry_key, *keys)
+            pipeline.delete(self.task_key(task_id))
+            pipeline.execute()
+        except RedisError as e:
+            print(f"Classification cache unavailable: {str(e)}")
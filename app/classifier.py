@@ -1,19 +1,66 @@
 import os
+import json
+import time
+import hashlib
 import pickle
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.pipeline import Pipeline
-from sklearn.metrics import accuracy_score, classification_report
+
+# pandas, scikit-learn and numpy (app.text_model) are imported where they are used: they
+# take about a second to import, and processes that only enqueue tasks never need them
+# (unpickling a model imports the parts of scikit-learn it needs)
+
+PIPELINE_MODES = ('tfidf', 'hashing')
+
+# Size of the hashing pipeline's feature space, which fixes its memory whatever the data
+HASHING_FEATURES = 2 ** 18
+
+MISSING_MODEL_MESSAGE = "No classifier model has been built yet. Build one with: python build_model.py --data website_classification.csv"
+
+
+class ModelNotBuiltError(ValueError):
+    """No model version has been published in the artifact directory."""
+
 
 class WebsiteClassifier:
-    def __init__(self, model_path='website_classifier_model.pkl'):
-        self.model_path = model_path
+    """
+    Classifies websites from their text with a model built offline by build_artifact()
+    (``python build_model.py``). Each build is published as a new version in the
+    artifact directory, and runtime processes only load the current version, on the first
+    classification.
+
+    Versions are also exported as memory-mapped arrays (see LinearTextModel), which are
+    loaded instead of the pickle when ``memory_map`` is on: worker processes then share
+    one copy of the model rather than each holding its own. Unless a version is pinned,
+    the current version is checked again every ``reload_interval`` seconds, so a newly
+    published model is picked up without restarting the workers.
+
+    ``mode`` selects the pipeline new models are built with: 'tfidf' (TF-IDF and logistic
+    regression) or 'hashing' (a stateless hashing vectorizer with a fixed feature space
+    and a linear model trained by SGD), whose memory does not grow with the vocabulary
+    and which update_artifact() can train further on new pages without refitting.
+    """
+
+    def __init__(self, artifacts_dir=None, version=None, memory_map=True, reload_interval=None, mode=None):
+        self.artifacts_dir = artifacts_dir or os.getenv('CLASSIFIER_ARTIFACTS_DIR', 'models')
+        self.mode = mode or os.getenv('CLASSIFIER_PIPELINE', 'tfidf')
+        if self.mode not in PIPELINE_MODES:
+            raise ValueError(f"Unknown classifier pipeline {self.mode!r}, expected one of: {', '.join(PIPELINE_MODES)}")
+        # Pinned model version; the current version is used when none is given
+        self.pinned_version = version or os.getenv('CLASSIFIER_MODEL_VERSION') or None
+        self.memory_map = memory_map
+        if reload_interval is None:
+            reload_interval = float(os.getenv('CLASSIFIER_RELOAD_INTERVAL', 30))
+        self.reload_interval = reload_interval
+        # Version of the loaded model
+        self.version = None
         self.pipeline = None
+        self.metadata = None
+        self.checked_at = 0
 
     def load_data(self, csv_file):
         """Loads CSV data and splits it into training and testing sets."""
+        import pandas as pd
+        from sklearn.model_selection import train_test_split
+
         data = pd.read_csv(csv_file)
         X = data['cleaned_website_text']
         y = data['Category']
@@ -21,6 +68,18 @@ class WebsiteClassifier:
 
     def build_pipeline(self):
         """Builds the text classification pipeline."""
+        from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression, SGDClassifier
+        from sklearn.pipeline import Pipeline
+
+        if self.mode == 'hashing':
+            # alternate_sign=False keeps the features non-negative like TF-IDF's; the log
+            # loss makes the SGD model a logistic regression, like the TF-IDF pipeline's
+            self.pipeline = Pipeline([
+                ('hashing', HashingVectorizer(stop_words='english', n_features=HASHING_FEATURES, alternate_sign=False)),
+                ('clf', SGDClassifier(loss='log_loss', alpha=1e-5, random_state=42))
+            ])
+            return
         self.pipeline = Pipeline([
             ('tfidf', TfidfVectorizer(stop_words='english', max_df=0.9)),
             ('clf', LogisticRegression())
@@ -30,68 +89,185 @@ class WebsiteClassifier:
         """Trains the model."""
         self.build_pipeline()  # Ensure the pipeline is built before training
         self.pipeline.fit(X_train, y_train)
-        self.save_model()
-
-    def save_model(self):
-        """Saves the trained model to a file."""
-        with open(self.model_path, 'wb') as model_file:
-            pickle.dump(self.pipeline, model_file)
-
-    def load_model(self):
-        """Loads the model from a file, if it exists."""
-        if os.path.exists(self.model_path):
-            with open(self.model_path, 'rb') as model_file:
-                self.pipeline = pickle.load(model_file)
-            print(f"Model loaded from {self.model_path}")
-        else:
-            print(f"Model not found at {self.model_path}, retraining...")
-            self.pipeline = None  # Ensures pipeline is None so retraining happens
 
-    def ensure_model_is_trained(self, X_train, y_train):
-        """Ensures the model is trained, either by loading or retraining."""
-        self.load_model()
+    def update_model(self, X_train, y_train):
+        """
+        Trains the hashing pipeline further on new labelled pages, without refitting it.
+        The pages' categories must be among those the model was first trained on.
+        """
         if self.pipeline is None:
-            self.train_model(X_train, y_train)
+            raise ValueError("Model not trained.")
+        if not self.is_updatable():
+            raise ValueError("Only models built with the hashing pipeline can be updated; rebuild this one instead")
+        self.pipeline.steps[-1][1].partial_fit(self.pipeline[:-1].transform(X_train), y_train)
 
     def evaluate_model(self, X_test, y_test):
-        """Evaluates the model on the test set."""
+        """Evaluates the model on the test set and returns the metrics."""
+        from sklearn.metrics import accuracy_score, classification_report
+
         if self.pipeline is None:
             print("Model not trained.")
-            return
+            return None
         y_pred = self.pipeline.predict(X_test)
         print(f"Accuracy: {accuracy_score(y_test, y_pred)}")
         print(f"Classification Report:\n{classification_report(y_test, y_pred, zero_division=0)}")
+        return {
+            'accuracy': accuracy_score(y_test, y_pred),
+            'report': classification_report(y_test, y_pred, zero_division=0, output_dict=True),
+        }
 
-    def classify_website(self, cleaned_text):
-        """Classifies a new website based on cleaned text."""
-        if self.pipeline is None:
-            raise ValueError("Model is not loaded or trained. Please ensure the model is trained.")
-        return self.pipeline.predict([cleaned_text])[0]
+    def build_artifact(self, csv_file):
+        """
+        Trains the model on the CSV data, evaluates it on the held-out split and publishes
+        it with its metrics as a new version, which becomes the current one. Returns the
+        new version.
+        """
+        X_train, X_test, y_train, y_test = self.load_data(csv_file)
+        self.train_model(X_train, y_train)
+        metrics = self.evaluate_model(X_test, y_test)
+        with open(csv_file, 'rb') as data_file:
+            data_hash = hashlib.sha256(data_file.read()).hexdigest()
+        return self.save_artifact({
+            'pipeline': self.mode,
+            'data_file': os.path.basename(csv_file),
+            'data_sha256': data_hash,
+            'train_size': len(X_train),
+            'test_size': len(X_test),
+            'metrics': metrics,
+        })
+
+    def is_updatable(self):
+        """Returns whether the loaded model can be trained further with update_model()."""
+        # Memory-mapped models have no steps: they are read-only
+        return hasattr(self.pipeline, 'steps') and hasattr(self.pipeline.steps[-1][1], 'partial_fit')
+
+    def load_for_update(self):
+        """Loads the current (or pinned) model from its pickle: unlike its memory-mapped arrays, it can be trained further."""
+        memory_map, self.memory_map = self.memory_map, False
+        try:
+            self.load_model()
+        finally:
+            self.memory_map = memory_map
+
+    def update_artifact(self, csv_file):
+        """
+        Trains the current (or pinned) hashing model further on the CSV data, evaluates it on
+        the held-out split and publishes it as a new version, which becomes the current one.
+        Returns the new version.
+        """
+        self.load_for_update()
+        base = self.metadata
+        X_train, X_test, y_train, y_test = self.load_data(csv_file)
+        self.update_model(X_train, y_train)
+        metrics = self.evaluate_model(X_test, y_test)
+        with open(csv_file, 'rb') as data_file:
+            data_hash = hashlib.sha256(data_file.read()).hexdigest()
+        return self.save_artifact({
+            'pipeline': base.get('pipeline', 'tfidf'),
+            'base_version': base['version'],
+            'data_file': os.path.basename(csv_file),
+            'data_sha256': data_hash,
+            'train_size': base.get('train_size', 0) + len(X_train),
+            'test_size': len(X_test),
+            'metrics': metrics,
+        })
+
+    def save_artifact(self, metadata):
+        """Writes the trained pipeline and its metadata as a new version and makes it current."""
+        import sklearn
+        from app.text_model import LinearTextModel
+
+        version = time.strftime('%Y%m%d-%H%M%S', time.gmtime())
+        suffix = 1
+        while os.path.exists(self.artifact_path(version)):
+            suffix += 1
+            version = f"{time.strftime('%Y%m%d-%H%M%S', time.gmtime())}-{suffix}"
+        path = self.artifact_path(version)
+        os.makedirs(path)
+
+        with open(os.path.join(path, 'model.pkl'), 'wb') as model_file:
+            pickle.dump(self.pipeline, model_file)
+        if LinearTextModel.supports(self.pipeline):
+            LinearTextModel.export(self.pipeline, os.path.join(path, 'arrays'))
+        self.metadata = {
+            'version': version,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'sklearn_version': sklearn.__version__,
+            **metadata,
+        }
+        with open(os.path.join(path, 'metadata.json'), 'w', encoding='utf-8') as metadata_file:
+            json.dump(self.metadata, metadata_file, indent=2)
 
+        # Switch the current version in one step, so readers never see a partial write
+        pointer = os.path.join(self.artifacts_dir, 'CURRENT')
+        with open(f'{pointer}.tmp', 'w', encoding='utf-8') as pointer_file:
+            pointer_file.write(version)
+        os.replace(f'{pointer}.tmp', pointer)
+        self.version = version
+        return version
 
-    
-# Example usage:
-if __name__ == "__main__":
-    classifier = WebsiteClassifier()
+    def artifact_path(self, version):
+        return os.path.join(self.artifacts_dir, version)
 
-    # Load data and split into train/test sets
-    X_train, X_test, y_train, y_test = classifier.load_data('website_classification.csv')
+    def current_version(self):
+        """Returns the version the artifact directory points at, or None if nothing was built yet."""
+        try:
+            with open(os.path.join(self.artifacts_dir, 'CURRENT'), encoding='utf-8') as pointer_file:
+                return pointer_file.read().strip() or None
+        except FileNotFoundError:
+            return None
 
-    # Ensure the model is trained (load or retrain if necessary)
-    classifier.ensure_model_is_trained(X_train, y_train)
+    def read_metadata(self, version):
+        with open(os.path.join(self.artifact_path(version), 'metadata.json'), encoding='utf-8') as metadata_file:
+            return json.load(metadata_file)
 
-    # Evaluate the model
-    classifier.evaluate_model(X_test, y_test)
+    def model_version(self):
+        """Returns the version classifications use: the pinned one, or the current one."""
+        return self.pinned_version or self.current_version()
+
+    def load_model(self):
+        """
+        Loads the pinned model version, or the current one: its memory-mapped arrays if it
+        has them and ``memory_map`` is on, otherwise its pickle.
+        """
+        version = self.model_version()
+        if version is None:
+            raise ModelNotBuiltError(f"{MISSING_MODEL_MESSAGE} (artifact directory: {self.artifacts_dir})")
+        path = self.artifact_path(version)
+        if self.memory_map and os.path.isdir(os.path.join(path, 'arrays')):
+            from app.text_model import LinearTextModel
+
+            path = os.path.join(path, 'arrays')
+            pipeline = LinearTextModel(path)
+        else:
+            with open(os.path.join(path, 'model.pkl'), 'rb') as model_file:
+                pipeline = pickle.load(model_file)
+        metadata = self.read_metadata(version)
+        # Swapped in together, so a classification running meanwhile uses either model whole
+        self.pipeline, self.metadata, self.version = pipeline, metadata, version
+        self.checked_at = time.monotonic()
+        print(f"Model {version} loaded from {path}")
+
+    def ensure_model_is_loaded(self):
+        """Loads the model on first use, and a newly published version once the reload interval has passed."""
+        if self.pipeline is None:
+            self.load_model()
+        elif self.pinned_version is None and time.monotonic() - self.checked_at >= self.reload_interval:
+            self.checked_at = time.monotonic()
+            version = self.current_version()
+            if version is not None and version != self.version:
+                self.load_model()
+
+    def classify_website(self, cleaned_text):
+        """Classifies a new website based on cleaned text."""
+        self.ensure_model_is_loaded()
+        return self.pipeline.predict([cleaned_text])[0]
 
-    # Classify new websites
-    test_website_texts = [
-        "Find the best hotel deals with Expedia. Book flights, hotels, vacation packages, and car rentals for your next holiday. Trusted by millions of travelers for affordable travel solutions.",
-        "Shop for the latest fashion trends at unbeatable prices on Amazon. Discover a wide range of clothing, accessories, and electronics. Fast delivery and excellent customer service guaranteed.",
-        "Stay updated with the latest world news, politics, sports, and entertainment on CNN. Breaking news, analysis, and expert opinions all in one place.",
-        "Access free online courses and educational resources on Coursera. Learn new skills from top universities and companies in various fields such as data science, business, and computer science.",
-        "Connect with friends and family on Facebook. Share photos, updates, and experiences."
-    ]
+    def classify_many(self, cleaned_texts):
+        """
+        Classifies several websites at once: their texts are vectorized into one matrix
+        and predicted in a single call, which costs far less than one call per text.
+        """
+        self.ensure_model_is_loaded()
+        return list(self.pipeline.predict(cleaned_texts))
 
-    for text in test_website_texts:
-        predicted_category = classifier.classify_website(text)
-        print(f"Predicted Category: {predicted_category}")
@@ -1,16 +1,66 @@
 import json
+import os
+import time
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as LookupTimeout, wait
 import whois
-import wikipedia
-from urllib.parse import urlparse
+from whois.parser import WhoisEntry
 import socket
 import requests
 import spacy
+from app.batching import MicroBatcher
+from app.domain_cache import DomainCache
+from app.geoip import GeoIPDatabase
+from app.http_client import CircuitOpenError, OutboundClient
+from app.public_suffix import hostname_of, is_ip_address, registrable_domain, top_level_domain
+from app.resolver import DNSResolver, HostNotFound, ResolverError
+from app.wikipedia_client import WikipediaClient
+
+# Seconds each lookup of get_all_domain_info may take before the result is returned without it
+WHOIS_TIMEOUT = float(os.getenv('DOMAIN_WHOIS_TIMEOUT', 10))
+DNS_TIMEOUT = float(os.getenv('DOMAIN_DNS_TIMEOUT', 5))
+GEO_TIMEOUT = float(os.getenv('DOMAIN_GEO_TIMEOUT', 5))
+# Threads running lookups, shared by the tasks of a worker process
+LOOKUP_THREADS = int(os.getenv('DOMAIN_LOOKUP_THREADS', 16))
+# IP geolocation endpoint, with {ip} for the address
+IPINFO_URL = os.getenv('IPINFO_URL', 'https://ipinfo.io/{ip}/json')
+# host[:port] of a WHOIS server to query instead of the domain's registry
+WHOIS_SERVER = os.getenv('WHOIS_SERVER', '')
+# Offline IP geolocation database built by build_geoip.py, used before IPINFO_URL
+GEOIP_DATABASE = os.getenv('GEOIP_DATABASE', 'geoip')
+# Whether addresses the offline database has no range for are looked up at IPINFO_URL
+GEOIP_IPINFO_FALLBACK = os.getenv('GEOIP_IPINFO_FALLBACK', '1') == '1'
+# Whether get_all_domain_info finds the places named in the domain's Wikipedia summary,
+# and the seconds it may take to
+EXTRACT_LOCATIONS = os.getenv('DOMAIN_EXTRACT_LOCATIONS', '1') == '1'
+LOCATION_TIMEOUT = float(os.getenv('DOMAIN_LOCATION_TIMEOUT', 10))
+# spaCy pipeline whose entity recognizer finds the places, and the characters of a summary it reads
+SPACY_MODEL = os.getenv('SPACY_MODEL', 'en_core_web_sm')
+NER_MAX_CHARS = int(os.getenv('DOMAIN_NER_MAX_CHARS', 20000))
+# Summaries of concurrent lookups are run through the pipeline together, up to
+# DOMAIN_NER_BATCH_SIZE at a time, waiting at most DOMAIN_NER_BATCH_WAIT_MS for a batch to fill
+NER_BATCH_SIZE = int(os.getenv('DOMAIN_NER_BATCH_SIZE', 16))
+NER_BATCH_WAIT_MS = float(os.getenv('DOMAIN_NER_BATCH_WAIT_MS', 20))
+LOCATION_LABELS = ('GPE', 'LOC')
+# Lookups get_bulk_domain_info runs at once
+BULK_CONCURRENCY = int(os.getenv('LOCATION_BULK_CONCURRENCY', 32))
+
+# Lookup results shared by the tasks of all workers
+domain_cache = DomainCache()
+# Resolves host names for all the tasks of a worker process
+dns_resolver = DNSResolver()
+# Pooled, retried and circuit-broken HTTP requests of the geolocation and Wikipedia lookups
+http_client = OutboundClient()
+# Fetches the Wikipedia summaries places are extracted from, cached on the host
+wikipedia_client = WikipediaClient(http=http_client)
+
 
 class DomainInfo:
-    def __init__(self, url):
+    def __init__(self, url, cache=None):
         self.url = url
+        self.cache = cache if cache is not None else domain_cache
         self.domain_name = self.extract_domain_name()
-        self._nlp = None  # spaCy model will be loaded lazily
+        self.registrable_domain = registrable_domain(url)
         self._wikipedia_summary = None
         self._whois_info = None
         self._ip_address = None
@@ -19,35 +69,19 @@ class DomainInfo:
         self.country_code = self.get_country_code()
 
     def extract_domain_name(self):
-        parsed_url = urlparse(self.url)
-        domain = parsed_url.netloc.replace('www.', '')  # Remove 'www.' if present
-        parts = domain.split('.')
-        return parts[0] if len(parts) > 1 else domain  # Return the main domain part
+        # The site's name, searched for on Wikipedia: bbc for news.bbc.co.uk and www.bbc.com alike
+        domain = registrable_domain(self.url)
+        if is_ip_address(domain):
+            return domain
+        return domain.split('.')[0]
 
     def load_spacy_model(self):
-        if self._nlp is None:
-            self._nlp = spacy.load("en_core_web_sm")
-        return self._nlp
+        # One pipeline for the whole process, loaded by the first caller
+        return get_nlp()
 
     def get_wikipedia_summary(self):
-        if self._wikipedia_summary is not None:
-            return self._wikipedia_summary
-
-        try:
-            search_results = wikipedia.search(self.domain_name)
-            if search_results:
-                page_title = search_results[0]  # Take the most relevant result
-                page = wikipedia.page(page_title)
-                page_id = page.pageid
-                full_page = wikipedia.WikipediaPage(pageid=page_id)
-                self._wikipedia_summary = full_page.content
-            else:
-                self._wikipedia_summary = 'No Wikipedia page found.'
-        except wikipedia.exceptions.DisambiguationError as e:
-            self._wikipedia_summary = f"Disambiguation Error: {e.options}"
-        except wikipedia.exceptions.PageError:
-            self._wikipedia_summary = 'No Wikipedia page found.'
-        
+        if self._wikipedia_summary is None:
+            self._wikipedia_summary = wikipedia_client.summary(self.domain_name) or 'No Wikipedia page found.'
         return self._wikipedia_summary
 
     def extract_location(self):
@@ -55,11 +89,11 @@ class DomainInfo:
             return self._location_info
 
         summary = self.get_wikipedia_summary()
-        nlp = self.load_spacy_model()
-        doc = nlp(summary)
-
-        # Extract location names using list comprehension
-        self._location_info = list(set(ent.text for ent in doc.ents if ent.label_ in ["GPE", "LOC"]))
+        if summary == 'No Wikipedia page found.':
+            self._location_info = []
+        else:
+            # Through the batcher's thread even one at a time: the pipeline isn't thread-safe
+            self._location_info = location_batcher.submit(summary).result()
         return self._location_info
 
     def get_location_data(self):
@@ -69,11 +103,25 @@ class DomainInfo:
         if self._ip_address is not None:
             return self._ip_address
 
+        # The host alone: without the port or user info of the netloc, and IPv6 addresses unbracketed
+        hostname = hostname_of(self.url)
+        if not hostname:
+            self._ip_address = "Error retrieving IP address: the URL has no host name"
+            return self._ip_address
+        self._ip_address = self.cache.get('dns', hostname)
+        if self._ip_address is not None:
+            return self._ip_address
+
         try:
-            parsed_url = urlparse(self.url)
-            hostname = parsed_url.netloc.replace('www.', '')
-            self._ip_address = socket.gethostbyname(hostname)
-        except socket.error as e:
+            # IPv4 addresses first, as before
+            resolution = dns_resolver.resolve_sync(hostname, timeout=DNS_TIMEOUT)
+            self._ip_address = resolution.addresses[0]
+            self.cache.set('dns', hostname, self._ip_address, ttl=resolution.ttl)
+        except HostNotFound as e:
+            self._ip_address = f"Error retrieving IP address: {str(e)}"
+            self.cache.set('dns', hostname, self._ip_address, ttl=e.ttl, negative=True)
+        except ResolverError as e:
+            # Not cached: the name servers may answer next time
             self._ip_address = f"Error retrieving IP address: {str(e)}"
 
         return self._ip_address
@@ -87,9 +135,32 @@ class DomainInfo:
             self._server_location = "Unable to retrieve server location."
             return self._server_location
 
+        # The offline database answers in microseconds, faster than the cache
+        geoip = get_geoip_database()
+        if geoip is not None:
+            location = geoip.lookup(ip_address)
+            if location is not None:
+                coordinates = f"{location['latitude']},{location['longitude']}" if location['latitude'] and location['longitude'] else 'N/A'
+                self._server_location = {
+                    'IP Address': ip_address,
+                    'City': location['city'] or 'N/A',
+                    'Region': location['region'] or 'N/A',
+                    'Country': location['country'] or 'N/A',
+                    'Location': coordinates
+                }
+                return self._server_location
+            if not GEOIP_IPINFO_FALLBACK:
+                self._server_location = "No server location found for the IP address."
+                return self._server_location
+
+        self._server_location = self.cache.get('geo', ip_address)
+        if self._server_location is not None:
+            return self._server_location
+
         # Use a public IP geolocation API
         try:
-            response = requests.get(f"https://ipinfo.io/{ip_address}/json")
+            response = http_client.get('ipinfo', IPINFO_URL.format(ip=ip_address), timeout=GEO_TIMEOUT)
+            response.raise_for_status()
             data = response.json()
             self._server_location = {
                 'IP Address': ip_address,
@@ -98,26 +169,36 @@ class DomainInfo:
                 'Country': data.get('country', 'N/A'),
                 'Location': data.get('loc', 'N/A')  # Lat, Long
             }
-        except requests.RequestException as e:
+            self.cache.set('geo', ip_address, self._server_location)
+        except CircuitOpenError as e:
+            # Not cached: the address is looked up once the provider is back
+            self._server_location = f"Error retrieving server location: {str(e)}"
+        except (requests.RequestException, ValueError) as e:
             self._server_location = f"Error retrieving server location: {str(e)}"
+            self.cache.set('geo', ip_address, self._server_location, negative=True)
 
         return self._server_location
 
     def get_country_code(self):
-        domain_parts = self.url.split('.')
-        if len(domain_parts) > 1:
-            tld = domain_parts[-1].upper()
-            # Check if the TLD is a country code
-            if len(tld) == 2 and tld.isalpha():
-                return tld
+        tld = top_level_domain(self.url).upper()
+        # Check if the TLD is a country code
+        if len(tld) == 2 and tld.isalpha():
+            return tld
         return 'N/A'
 
     def get_whois_info(self):
         if self._whois_info is not None:
             return self._whois_info
 
+        self._whois_info = self.cache.get('whois', self.registrable_domain)
+        if self._whois_info is not None:
+            return self._whois_info
+
         try:
-            domain_info = whois.whois(self.url)
+            if WHOIS_SERVER:
+                domain_info = query_whois_server(self.registrable_domain, WHOIS_SERVER)
+            else:
+                domain_info = whois.whois(self.registrable_domain)
             self._whois_info = {
                 'Domain Name': domain_info.domain_name,
                 'Registrar': domain_info.registrar,
@@ -127,27 +208,279 @@ class DomainInfo:
                 'Registrant Organization': domain_info.registrant_organization,
                 'Registrant Country': domain_info.registrant_country
             }
+            self.cache.set('whois', self.registrable_domain, self._whois_info)
         except Exception as e:
             self._whois_info = f"Error retrieving WHOIS information: {str(e)}"
+            self.cache.set('whois', self.registrable_domain, self._whois_info, negative=True)
 
         return self._whois_info
 
+def query_whois_server(domain, server, timeout=WHOIS_TIMEOUT):
+    """Asks a WHOIS server (host[:port]) about a domain, without following referrals."""
+    host, _, port = server.partition(':')
+    with socket.create_connection((host, int(port or 43)), timeout=timeout) as connection:
+        connection.sendall(domain.encode('idna') + b'\r\n')
+        response = b''
+        while True:
+            chunk = connection.recv(4096)
+            if not chunk:
+                break
+            response += chunk
+    return WhoisEntry.load(domain, response.decode('utf-8', 'replace'))
+
+
+# Loaded by the first location extraction, so that worker processes each load their own
+nlp = None
+# Held while the pipeline is loaded or run: it is shared by the threads of the process, and spaCy pipelines aren't thread-safe
+nlp_lock = threading.Lock()
+
+def get_nlp():
+    """Returns the process's spaCy pipeline, loaded with its entity recognizer only."""
+    global nlp
+    if nlp is None:
+        nlp = load_ner_pipeline(SPACY_MODEL)
+    return nlp
+
+
+def load_ner_pipeline(name):
+    """
+    Loads a spaCy pipeline and removes its components other than the entity recognizer
+    and the token-to-vector layer it listens to, if it shares one (en_core_web_sm's has
+    its own): tagging, parsing and lemmatizing take most of the time of a full pipeline,
+    and the places only need the entities.
+    """
+    started = time.perf_counter()
+    pipeline = spacy.load(name)
+    needed = {'ner'} | {component for component, pipe in pipeline.components
+                        if 'ner' in getattr(pipe, 'listening_components', [])}
+    for component in pipeline.component_names:
+        if component not in needed:
+            pipeline.remove_pipe(component)
+    print(f"Loaded spaCy pipeline {name} with {', '.join(pipeline.pipe_names)} in {time.perf_counter() - started:.1f}s")
+    return pipeline
+
+
+def extract_locations(texts):
+    """Returns the distinct place names found in each text, running the texts through the pipeline together."""
+    texts = [text[:NER_MAX_CHARS] for text in texts]
+    with nlp_lock:
+        return [list(dict.fromkeys(ent.text for ent in doc.ents if ent.label_ in LOCATION_LABELS))
+                for doc in get_nlp().pipe(texts, batch_size=max(len(texts), 1))]
+
+
+location_batcher = MicroBatcher(extract_locations, NER_BATCH_SIZE, NER_BATCH_WAIT_MS / 1000)
+
+
+# Loaded by the first geolocation; False when there is no database
+geoip_database = None
+
+def get_geoip_database():
+    """Returns the offline geolocation database, mapped on first use, or None when none was built."""
+    global geoip_database
+    if geoip_database is None:
+        if os.path.exists(os.path.join(GEOIP_DATABASE, 'geoip.json')):
+            geoip_database = GeoIPDatabase(GEOIP_DATABASE)
+            print(f"Loaded geolocation database {GEOIP_DATABASE}: {geoip_database.metadata}")
+        else:
+            geoip_database = False
+    return geoip_database or None
+
+
+# Created by the first get_all_domain_info() call, so that worker processes each get their own
+lookup_executor = None
+
+def get_lookup_executor():
+    global lookup_executor
+    if lookup_executor is None:
+        lookup_executor = ThreadPoolExecutor(max_workers=LOOKUP_THREADS, thread_name_prefix='domain-lookup')
+    return lookup_executor
+
+
+def timed_call(function):
+    start = time.perf_counter()
+    value = function()
+    return value, time.perf_counter() - start
+
+
 def get_all_domain_info(url):
+    """
+    Looks up a URL's domain. WHOIS and the places named in the domain's Wikipedia summary
+    run concurrently with the DNS resolution and the geolocation of the address it
+    resolves to. Each lookup has a deadline; one that misses it is left out, its field
+    says so, and it is listed under 'timed_out'. The seconds each completed lookup took
+    are under 'timings'.
+    """
     domain_info = DomainInfo(url)
+    executor = get_lookup_executor()
+    timings = {}
+    timed_out = []
+
+    whois_deadline = time.monotonic() + WHOIS_TIMEOUT
+    whois_future = executor.submit(timed_call, domain_info.get_whois_info)
+    dns_future = executor.submit(timed_call, domain_info.get_ip_address)
+    if EXTRACT_LOCATIONS:
+        locations_deadline = time.monotonic() + LOCATION_TIMEOUT
+        locations_future = executor.submit(timed_call, domain_info.get_location_data)
+
+    try:
+        ip_address, timings['dns'] = dns_future.result(timeout=DNS_TIMEOUT)
+    except LookupTimeout:
+        ip_address = 'Timed out retrieving IP address.'
+        timed_out.append('IP Address')
+    if 'dns' not in timings:
+        server_location = 'Unable to retrieve server location.'
+    else:
+        geo_future = executor.submit(timed_call, domain_info.get_server_location)
+        try:
+            server_location, timings['geo'] = geo_future.result(timeout=GEO_TIMEOUT)
+        except LookupTimeout:
+            server_location = 'Timed out retrieving server location.'
+            timed_out.append('Server Location')
+
+    try:
+        whois_info, timings['whois'] = whois_future.result(timeout=max(0, whois_deadline - time.monotonic()))
+    except LookupTimeout:
+        whois_info = 'Timed out retrieving WHOIS information.'
+        timed_out.append('WHOIS Info')
+
+    if EXTRACT_LOCATIONS:
+        try:
+            locations, timings['locations'] = locations_future.result(timeout=max(0, locations_deadline - time.monotonic()))
+        except LookupTimeout:
+            locations = 'Timed out extracting locations.'
+            timed_out.append('Extracted Locations')
+        except Exception as e:
+            # Such as the spaCy model not being installed
+            locations = f"Error extracting locations: {str(e)}"
 
     # Collect all the relevant information
     data = {
         'Domain Name': domain_info.domain_name,
-        'WHOIS Info': domain_info.get_whois_info(),
-        'IP Address': domain_info.get_ip_address(),
-        'Server Location': domain_info.get_server_location(),
-        #'Extracted Locations': domain_info.get_location_data(),
-        'Country Code': domain_info.get_country_code()
+        'WHOIS Info': whois_info,
+        'IP Address': ip_address,
+        'Server Location': server_location,
     }
+    if EXTRACT_LOCATIONS:
+        data['Extracted Locations'] = locations
+    data['Country Code'] = domain_info.get_country_code()
+    if timed_out:
+        data['timed_out'] = timed_out
+    data['timings'] = timings
 
     # Convert to JSON format
     return data 
 
+# Lookups of get_bulk_domain_info: the field each fills, and what it says when the lookup missed its deadline
+BULK_LOOKUPS = {
+    'whois': ('WHOIS Info', 'Timed out retrieving WHOIS information.'),
+    'locations': ('Extracted Locations', 'Timed out extracting locations.'),
+    'dns': ('IP Address', 'Timed out retrieving IP address.'),
+    'geo': ('Server Location', 'Timed out retrieving server location.'),
+}
+
+
+def get_bulk_domain_info(urls, concurrency=None, progress=None):
+    """
+    Looks up the domains of many URLs, running each distinct lookup once: WHOIS and the
+    places of the Wikipedia summary by registrable domain, DNS resolution by host name and
+    geolocation by address, at most ``concurrency`` lookups at a time. Each lookup has the
+    deadline it has in get_all_domain_info, from when it starts. Returns what
+    get_all_domain_info gives for each host name, by host name. ``progress(done, total)``
+    is called as lookups complete, and at least every second; the total grows as host
+    names resolve to addresses not seen before.
+    """
+    infos = {}
+    for url in urls:
+        hostname = hostname_of(url)
+        if hostname not in infos:
+            infos[hostname] = DomainInfo(url)
+    # The host looked up for each registrable domain, whose WHOIS record and summary the others share
+    domains = {}
+    for info in infos.values():
+        domains.setdefault(info.registrable_domain, info)
+
+    timeouts = {'whois': WHOIS_TIMEOUT, 'locations': LOCATION_TIMEOUT, 'dns': DNS_TIMEOUT, 'geo': GEO_TIMEOUT}
+    started = {}  # (lookup, key) -> when it started running
+    outcomes = {}  # (lookup, key) -> (value, seconds), with seconds None for a failure; missing if timed out
+    pending = {}  # future -> (lookup, key)
+    executor = ThreadPoolExecutor(max_workers=concurrency or BULK_CONCURRENCY, thread_name_prefix='bulk-lookup')
+
+    def run(lookup, key, function):
+        started[(lookup, key)] = time.monotonic()
+        return timed_call(function)
+
+    def submit(lookup, key, function):
+        pending[executor.submit(run, lookup, key, function)] = (lookup, key)
+
+    for domain, info in domains.items():
+        submit('whois', domain, info.get_whois_info)
+        if EXTRACT_LOCATIONS:
+            submit('locations', domain, info.get_location_data)
+    for hostname, info in infos.items():
+        submit('dns', hostname, info.get_ip_address)
+
+    addresses = set()
+    total = len(pending)
+    try:
+        while pending:
+            done, _ = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+            for future in done:
+                lookup, key = pending.pop(future)
+                try:
+                    outcomes[(lookup, key)] = future.result()
+                except Exception as e:
+                    # Such as the spaCy model not being installed
+                    action = 'extracting locations' if lookup == 'locations' else f"retrieving {BULK_LOOKUPS[lookup][0]}"
+                    outcomes[(lookup, key)] = (f"Error {action}: {str(e)}", None)
+                ip_address = outcomes[(lookup, key)][0]
+                if lookup == 'dns' and "Error" not in ip_address and ip_address not in addresses:
+                    addresses.add(ip_address)
+                    submit('geo', ip_address, infos[key].get_server_location)
+                    total += 1
+            now = time.monotonic()
+            for future, (lookup, key) in list(pending.items()):
+                if (lookup, key) in started and now - started[(lookup, key)] > timeouts[lookup]:
+                    # Left running, as in get_all_domain_info; its result is not waited for
+                    del pending[future]
+            if progress is not None:
+                progress(total - len(pending), total)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    results = {}
+    for hostname, info in infos.items():
+        timings = {}
+        timed_out = []
+
+        def outcome(lookup, key):
+            if (lookup, key) not in outcomes:
+                timed_out.append(BULK_LOOKUPS[lookup][0])
+                return BULK_LOOKUPS[lookup][1]
+            value, seconds = outcomes[(lookup, key)]
+            if seconds is not None:
+                timings[lookup] = seconds
+            return value
+
+        ip_address = outcome('dns', hostname)
+        if 'dns' not in timings or "Error" in ip_address:
+            server_location = 'Unable to retrieve server location.'
+        else:
+            server_location = outcome('geo', ip_address)
+        data = {
+            'Domain Name': info.domain_name,
+            'WHOIS Info': outcome('whois', info.registrable_domain),
+            'IP Address': ip_address,
+            'Server Location': server_location,
+        }
+        if EXTRACT_LOCATIONS:
+            data['Extracted Locations'] = outcome('locations', info.registrable_domain)
+        data['Country Code'] = info.get_country_code()
+        if timed_out:
+            data['timed_out'] = timed_out
+        data['timings'] = timings
+        results[hostname] = data
+    return results
+
 # Example usage:
 if __name__ == "__main__":
     url = 'https://example.com'
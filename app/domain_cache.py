@@ -0,0 +1,161 @@
+import os
+import json
+import time
+import threading
+from collections import Counter, OrderedDict
+from redis import Redis, RedisError
+
+# Lookups cached, with the seconds their results are kept for by default
+SOURCE_TTLS = {
+    'whois': ('DOMAIN_CACHE_WHOIS_TTL', 3 * 86400),
+    # Used when the resolver doesn't give the record's own TTL
+    'dns': ('DOMAIN_CACHE_DNS_TTL', 300),
+    'geo': ('DOMAIN_CACHE_GEO_TTL', 6 * 3600),
+}
+
+
+class DomainCache:
+    """
+    Caches the lookups of location analysis across tasks and workers: WHOIS records by
+    registrable domain, addresses by host name and geolocations by address. Entries are
+    kept in Redis, with a least recently used cache of at most ``local_size`` entries in
+    each process in front of it, and expire after their source's TTL (0 turns caching off
+    for that source). Failed lookups are cached for ``negative_ttl`` seconds, so a domain
+    that doesn't resolve isn't looked up again on every task, but is retried soon.
+
+    Hits and misses are counted by source, in the process (``hits``, ``local_hits``,
+    ``misses``) and in Redis for all processes together (``stats()``), where a process adds
+    its counts with its next request. When Redis can't be reached, lookups miss and go on
+    without it.
+    """
+
+    stats_key = 'domain:stats'  # Hash of the counters of all processes
+
+    def __init__(self, url=None, local_size=None, ttls=None, negative_ttl=None, client=None):
+        self.url = url or os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+        if local_size is None:
+            local_size = int(os.getenv('DOMAIN_CACHE_LOCAL_SIZE', 10000))
+        self.local_size = local_size
+        self.ttls = {source: int(os.getenv(variable, default)) for source, (variable, default) in SOURCE_TTLS.items()}
+        self.ttls.update(ttls or {})
+        if negative_ttl is None:
+            negative_ttl = int(os.getenv('DOMAIN_CACHE_NEGATIVE_TTL', 300))
+        self.negative_ttl = negative_ttl
+        self._client = client
+        self._local = OrderedDict()  # key -> (expiry, value), least recently used first
+        self._lock = threading.Lock()  # Lookups of one task run in several threads
+        self.hits = Counter()
+        self.local_hits = Counter()
+        self.misses = Counter()
+        self._unreported = Counter()  # Counts not yet added to Redis, sent with the next request to it
+
+    @property
+    def client(self):
+        # Connected on first use, in the process that uses it
+        if self._client is None:
+            self._client = Redis.from_url(self.url, socket_timeout=1, socket_connect_timeout=1)
+        return self._client
+
+    @staticmethod
+    def key(source, name):
+        return f'domain:{source}:{name.lower()}'
+
+    def get(self, source, name):
+        """Returns the cached result of a lookup of ``name`` from ``source``, or None."""
+        if not self.ttls.get(source):
+            return None
+        key = self.key(source, name)
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._local.move_to_end(key)
+                    self.hits[source] += 1
+                    self.local_hits[source] += 1
+                    self._count(f'{source}:hits', f'{source}:local_hits')
+                    return entry[1]
+                del self._local[key]
+        try:
+            pipeline = self._pipeline()
+            pipeline.get(key)
+            pipeline.pttl(key)
+            value, ttl_ms = pipeline.execute()[-2:]
+        except RedisError as e:
+            print(f"Domain cache unavailable: {str(e)}")
+            self.misses[source] += 1
+            return None
+        with self._lock:
+            if value is None:
+                self.misses[source] += 1
+                self._count(f'{source}:misses')
+                return None
+            self.hits[source] += 1
+            self._count(f'{source}:hits')
+        result = json.loads(value)
+        if ttl_ms > 0:
+            self._store_locally(key, result, ttl_ms / 1000)
+        return result
+
+    def set(self, source, name, result, ttl=None, negative=False):
+        """
+        Stores the result of a lookup for its source's TTL, or for ``ttl`` seconds (such as
+        a DNS record's own TTL), or briefly when the lookup failed (``negative``): for at most
+        ``negative_ttl`` seconds.
+        """
+        if not self.ttls.get(source):
+            return
+        if negative:
+            ttl = self.negative_ttl if ttl is None else min(ttl, self.negative_ttl)
+        elif ttl is None:
+            ttl = self.ttls[source]
+        if ttl <= 0:
+            return
+        key = self.key(source, name)
+        self._store_locally(key, result, ttl)
+        try:
+            pipeline = self._pipeline()
+            pipeline.set(key, json.dumps(result), ex=int(ttl))
+            pipeline.execute()
+        except RedisError as e:
+            print(f"Domain cache unavailable: {str(e)}")
+
+    def _count(self, *fields):
+        # Called with the lock held
+        for field in fields:
+            self._unreported[field] += 1
+
+    def _pipeline(self):
+        """Returns a pipeline that starts by adding the counts not yet in Redis."""
+        with self._lock:
+            unreported, self._unreported = self._unreported, Counter()
+        pipeline = self.client.pipeline(transaction=False)
+        for field, count in unreported.items():
+            pipeline.hincrby(self.stats_key, field, count)
+        return pipeline
+
+    def _store_locally(self, key, result, ttl):
+        if self.local_size <= 0:
+            return
+        with self._lock:
+            self._local[key] = (time.monotonic() + ttl, result)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def stats(self):
+        """Returns the hits, local hits, misses and hit rate of each source, counted by all processes."""
+        pipeline = self._pipeline()
+        pipeline.hgetall(self.stats_key)
+        counts = {key.decode(): int(value) for key, value in pipeline.execute()[-1].items()}
+        stats = {}
+        for source in SOURCE_TTLS:
+            hits = counts.get(f'{source}:hits', 0)
+            misses = counts.get(f'{source}:misses', 0)
+            stats[source] = {
+                'hits': hits,
+                'local_hits': counts.get(f'{source}:local_hits', 0),
+                'misses': misses,
+                'hit_rate': hits / (hits + misses) if hits + misses else None,
+                'ttl': self.ttls[source],
+            }
+        return stats
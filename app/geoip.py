@@ -0,0 +1,157 @@
+import os
+import csv
+import json
+import ipaddress
+import mmap
+import shutil
+import numpy as np
+
+# Columns of a CSV without a header, as in the DB-IP "IP to City Lite" dump
+DBIP_COLUMNS = ['start_ip', 'end_ip', 'continent', 'country', 'region', 'city', 'latitude', 'longitude']
+# Other names of the columns a CSV with a header may use
+COLUMN_ALIASES = {
+    'ip_start': 'start_ip', 'ip_end': 'end_ip', 'stateprov': 'region', 'state': 'region',
+    'lat': 'latitude', 'lng': 'longitude', 'lon': 'longitude', 'country_code': 'country',
+}
+LOCATION_FIELDS = ('country', 'region', 'city', 'latitude', 'longitude')
+
+
+class GeoIPDatabase:
+    """
+    An IP geolocation database stored as sorted range tables that are memory-mapped
+    read-only, so every worker process on a machine shares one physical copy through the
+    page cache. IPv4 ranges are kept as 32-bit start and end addresses, IPv6 ranges as
+    the high and low 64 bits of theirs; each range points at a location, stored once as
+    a JSON line in a blob of locations. An address is looked up with a binary search
+    for the last range starting at or before it.
+    """
+
+    arrays = ('v4_starts', 'v4_ends', 'v4_locations', 'v6_starts_high', 'v6_starts_low',
+              'v6_ends_high', 'v6_ends_low', 'v6_locations', 'location_offsets')
+
+    def __init__(self, path):
+        with open(os.path.join(path, 'geoip.json'), encoding='utf-8') as metadata_file:
+            self.metadata = json.load(metadata_file)
+        # Plain arrays over the mapped files: operations on np.memmap objects are several
+        # times slower, as each result is wrapped in a memmap again
+        for name in self.arrays:
+            setattr(self, name, np.asarray(np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')))
+        with open(os.path.join(path, 'locations.jsonl'), 'rb') as locations_file:
+            # An empty file can't be mapped
+            self.locations = mmap.mmap(locations_file.fileno(), 0, access=mmap.ACCESS_READ) \
+                if os.fstat(locations_file.fileno()).st_size else b''
+
+    def lookup(self, ip_address):
+        """Returns the location of an address as a dict of LOCATION_FIELDS, or None when no range holds it."""
+        try:
+            address = ipaddress.ip_address(ip_address)
+        except ValueError:
+            return None
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if address.version == 4:
+            value = np.uint32(int(address))
+            index = int(np.searchsorted(self.v4_starts, value, side='right')) - 1
+            if index < 0 or value > self.v4_ends[index]:
+                return None
+            return self.location(self.v4_locations[index])
+
+        value = int(address)
+        # As numpy integers: Python ones above 2**63 would be compared as floats
+        high, low = np.uint64(value >> 64), np.uint64(value & 0xFFFFFFFFFFFFFFFF)
+        # Ranges are sorted by (high, low): among those starting with the same high bits,
+        # find the last starting at or before the low bits
+        first = int(np.searchsorted(self.v6_starts_high, high, side='left'))
+        end = int(np.searchsorted(self.v6_starts_high, high, side='right'))
+        index = first + int(np.searchsorted(self.v6_starts_low[first:end], low, side='right')) - 1
+        if index < 0:
+            return None
+        if (high, low) > (self.v6_ends_high[index], self.v6_ends_low[index]):
+            return None
+        return self.location(self.v6_locations[index])
+
+    def location(self, index):
+        start, end = self.location_offsets[index], self.location_offsets[index + 1]
+        return json.loads(self.locations[start:end])
+
+
+def read_ranges(csv_path):
+    """Yields (start, end, location) for the rows of a range CSV, with or without a header."""
+    with open(csv_path, newline='', encoding='utf-8') as csv_file:
+        rows = csv.reader(csv_file)
+        first = next(rows, None)
+        if first is None:
+            return
+        try:
+            ipaddress.ip_address(first[0])
+            columns = DBIP_COLUMNS
+            rows_to_read = [first]
+        except ValueError:
+            columns = [COLUMN_ALIASES.get(name.strip().lower(), name.strip().lower()) for name in first]
+            rows_to_read = []
+        if 'start_ip' not in columns or 'end_ip' not in columns:
+            raise ValueError(f'{csv_path} has no start_ip and end_ip columns')
+        positions = {name: position for position, name in enumerate(columns)}
+        for rows_iterable in (rows_to_read, rows):
+            for row in rows_iterable:
+                if not row:
+                    continue
+                start = ipaddress.ip_address(row[positions['start_ip']])
+                end = ipaddress.ip_address(row[positions['end_ip']])
+                location = {field: row[positions[field]] if field in positions and positions[field] < len(row) else ''
+                            for field in LOCATION_FIELDS}
+                yield start, end, location
+
+
+def build_geoip_database(csv_path, path):
+    """
+    Builds a GeoIPDatabase at ``path`` from a CSV of IP ranges: a DB-IP style dump without
+    a header, or a CSV whose header names start_ip, end_ip and any of country, region,
+    city, latitude and longitude. The database is written next to ``path`` and moved into
+    place, so processes never open a half-written one. Returns the number of ranges.
+    """
+    location_index = {}
+    location_lines = []
+    ranges = {4: [], 6: []}
+    for start, end, location in read_ranges(csv_path):
+        if start.version != end.version or start > end:
+            raise ValueError(f'Invalid range {start} - {end}')
+        line = json.dumps(location, separators=(',', ':')).encode('utf-8') + b'\n'
+        index = location_index.get(line)
+        if index is None:
+            index = location_index[line] = len(location_lines)
+            location_lines.append(line)
+        ranges[start.version].append((int(start), int(end), index))
+    for version_ranges in ranges.values():
+        version_ranges.sort()
+
+    staging = f'{path.rstrip(os.sep)}.building'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    v4, v6 = ranges[4], ranges[6]
+    arrays = {
+        'v4_starts': np.array([start for start, _, _ in v4], dtype=np.uint32),
+        'v4_ends': np.array([end for _, end, _ in v4], dtype=np.uint32),
+        'v4_locations': np.array([index for _, _, index in v4], dtype=np.uint32),
+        'v6_starts_high': np.array([start >> 64 for start, _, _ in v6], dtype=np.uint64),
+        'v6_starts_low': np.array([start & 0xFFFFFFFFFFFFFFFF for start, _, _ in v6], dtype=np.uint64),
+        'v6_ends_high': np.array([end >> 64 for _, end, _ in v6], dtype=np.uint64),
+        'v6_ends_low': np.array([end & 0xFFFFFFFFFFFFFFFF for _, end, _ in v6], dtype=np.uint64),
+        'v6_locations': np.array([index for _, _, index in v6], dtype=np.uint32),
+        'location_offsets': np.cumsum([0] + [len(line) for line in location_lines], dtype=np.uint64),
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(staging, f'{name}.npy'), array)
+    with open(os.path.join(staging, 'locations.jsonl'), 'wb') as locations_file:
+        locations_file.write(b''.join(location_lines))
+    with open(os.path.join(staging, 'geoip.json'), 'w', encoding='utf-8') as metadata_file:
+        json.dump({'source': os.path.basename(csv_path), 'ipv4_ranges': len(v4), 'ipv6_ranges': len(v6),
+                   'locations': len(location_lines)}, metadata_file, indent=2)
+
+    previous = f'{path.rstrip(os.sep)}.previous'
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.exists(path):
+        os.rename(path, previous)
+    os.rename(staging, path)
+    shutil.rmtree(previous, ignore_errors=True)
+    return len(v4) + len(v6)
@@ -0,0 +1,226 @@
+import os
+import time
+import random
+import threading
+from collections import Counter
+import requests
+from requests.adapters import HTTPAdapter
+from redis import Redis, RedisError
+
+# Upper bounds of the latency histogram's buckets, in milliseconds; the last bucket is unbounded
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Responses worth another attempt: the upstream is overloaded or failing, not refusing the request
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+
+class CircuitOpenError(requests.RequestException):
+    """The upstream failed too often lately and isn't asked until its circuit closes again."""
+
+
+class CircuitBreaker:
+    """
+    Opens after ``failures`` requests in a row failed, and then fails requests at once for
+    ``reset_after`` seconds. The first request after that is let through as a trial: the
+    circuit closes if it succeeds, and opens again for another ``reset_after`` if it fails.
+    """
+
+    def __init__(self, failures=5, reset_after=30):
+        self.failures = failures
+        self.reset_after = reset_after
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half-open' if time.monotonic() - self.opened_at >= self.reset_after else 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self.trial_running:
+                self.trial_running = True
+                return True
+            return False
+
+    def record(self, success):
+        with self._lock:
+            self.trial_running = False
+            if success:
+                self.consecutive_failures = 0
+                self.opened_at = None
+                return
+            self.consecutive_failures += 1
+            if self.opened_at is not None or self.consecutive_failures >= self.failures:
+                self.opened_at = time.monotonic()
+
+
+class OutboundClient:
+    """
+    Makes the HTTP requests of the enrichment lookups (geolocation, Wikipedia) with a
+    session per process, whose pool keeps up to ``pool_size`` connections to each host
+    alive between requests. Each attempt may take ``connect_timeout`` seconds to connect
+    and the request's ``timeout`` to answer; attempts that fail to connect, time out or get
+    a 429 or 5xx response are repeated up to ``retries`` times after a random wait of up to
+    ``backoff`` seconds, doubled each time, unless ``timeout`` seconds have passed since
+    the first. Each upstream has a CircuitBreaker, so a provider that is down is not waited
+    on by every lookup.
+
+    The latency of every attempt is counted into a histogram per upstream, and with the
+    request, error, retry and rejection counts added to Redis every ``flush_interval``
+    seconds, for all processes together (``stats()``).
+    """
+
+    stats_key = 'http:stats'  # Hash of the counters of all processes
+
+    def __init__(self, pool_size=None, connect_timeout=None, retries=None, backoff=None,
+                 breaker_failures=None, breaker_reset=None, flush_interval=10, redis_url=None, client=None):
+        self.pool_size = int(os.getenv('HTTP_POOL_SIZE', 16)) if pool_size is None else pool_size
+        self.connect_timeout = float(os.getenv('HTTP_CONNECT_TIMEOUT', 3)) if connect_timeout is None else connect_timeout
+        self.retries = int(os.getenv('HTTP_RETRIES', 2)) if retries is None else retries
+        self.backoff = float(os.getenv('HTTP_RETRY_BACKOFF_MS', 100)) / 1000 if backoff is None else backoff
+        self.breaker_failures = int(os.getenv('HTTP_BREAKER_FAILURES', 5)) if breaker_failures is None else breaker_failures
+        self.breaker_reset = float(os.getenv('HTTP_BREAKER_RESET', 30)) if breaker_reset is None else breaker_reset
+        self.flush_interval = flush_interval
+        self.redis_url = redis_url or os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+        self._client = client
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.breakers = {}
+        self.counts = Counter()  # '{upstream}:{counter}' -> count, in this process
+        self._unreported = Counter()
+        self._flushed_at = time.monotonic()
+
+    def session(self):
+        # A session's connections must not be shared with a forked worker
+        with self._lock:
+            if self._session is None or self._pid != os.getpid():
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._session, self._pid = session, os.getpid()
+            return self._session
+
+    def breaker(self, upstream):
+        with self._lock:
+            if upstream not in self.breakers:
+                self.breakers[upstream] = CircuitBreaker(self.breaker_failures, self.breaker_reset)
+            return self.breakers[upstream]
+
+    def get(self, upstream, url, timeout, **kwargs):
+        """
+        GETs a URL of an upstream, and returns the response, which may be an error response
+        that wasn't worth retrying. Raises CircuitOpenError without a request while the
+        upstream's circuit is open, or the last attempt's requests exception.
+        """
+        breaker = self.breaker(upstream)
+        if not breaker.allow():
+            self._count(upstream, 'rejected')
+            raise CircuitOpenError(f"{upstream} is failing, not asked again for up to {self.breaker_reset:.0f}s")
+        session = self.session()
+        started = time.monotonic()
+        attempt = 0
+        failed = True
+        # Whatever is raised, the outcome is recorded, or a half-open circuit would wait for its trial forever
+        try:
+            while True:
+                attempt_started = time.perf_counter()
+                try:
+                    response = session.get(url, timeout=(self.connect_timeout, timeout), **kwargs)
+                    error = None
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    response, error = None, e
+                except requests.RequestException:
+                    # Not worth another attempt, such as too many redirects or a broken body
+                    self._record(upstream, time.perf_counter() - attempt_started, True)
+                    raise
+                failed = response is None or response.status_code in RETRY_STATUSES
+                self._record(upstream, time.perf_counter() - attempt_started, failed)
+                # A trial request of a half-open circuit isn't repeated: its outcome decides the circuit
+                if not failed or attempt >= self.retries or breaker.state != 'closed':
+                    break
+                wait = random.uniform(0, self.backoff * 2 ** attempt)  # Full jitter
+                if time.monotonic() - started + wait >= timeout:
+                    break
+                attempt += 1
+                self._count(upstream, 'retries')
+                time.sleep(wait)
+        finally:
+            breaker.record(not failed)
+        if error is not None:
+            raise error
+        return response
+
+    def _record(self, upstream, seconds, failed):
+        milliseconds = seconds * 1000
+        bucket = next((f'le_{bound}' for bound in LATENCY_BUCKETS_MS if milliseconds <= bound), 'le_inf')
+        self._count(upstream, 'requests', bucket, *(('errors',) if failed else ()), milliseconds=milliseconds)
+
+    def _count(self, upstream, *counters, milliseconds=0):
+        with self._lock:
+            for counter in counters:
+                self.counts[f'{upstream}:{counter}'] += 1
+                self._unreported[f'{upstream}:{counter}'] += 1
+            if milliseconds:
+                self.counts[f'{upstream}:total_ms'] += round(milliseconds)
+                self._unreported[f'{upstream}:total_ms'] += round(milliseconds)
+            if time.monotonic() - self._flushed_at < self.flush_interval:
+                return
+            unreported, self._unreported = self._unreported, Counter()
+            self._flushed_at = time.monotonic()
+        self._flush(unreported)
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = Redis.from_url(self.redis_url, socket_timeout=1, socket_connect_timeout=1)
+        return self._client
+
+    def _flush(self, unreported):
+        try:
+            pipeline = self.client.pipeline(transaction=False)
+            for field, count in unreported.items():
+                pipeline.hincrby(self.stats_key, field, count)
+            pipeline.execute()
+        except RedisError as e:
+            print(f"HTTP stats not recorded: {str(e)}")
+
+    def flush(self):
+        """Adds the counts not yet in Redis."""
+        with self._lock:
+            unreported, self._unreported = self._unreported, Counter()
+            self._flushed_at = time.monotonic()
+        if unreported:
+            self._flush(unreported)
+
+    def stats(self, counts=None):
+        """
+        Returns the request, error, retry and rejection counts of each upstream, its mean
+        latency and its latency histogram (attempts per bucket, by upper bound in ms), counted
+        by all processes, or from ``counts`` (such as ``self.counts``) when given.
+        """
+        if counts is None:
+            counts = {key.decode(): int(value) for key, value in self.client.hgetall(self.stats_key).items()}
+        stats = {}
+        for upstream in sorted({key.split(':')[0] for key in counts}):
+            upstream_counts = {key.split(':', 1)[1]: value for key, value in counts.items() if key.split(':')[0] == upstream}
+            requests_made = upstream_counts.get('requests', 0)
+            stats[upstream] = {
+                'requests': requests_made,
+                'errors': upstream_counts.get('errors', 0),
+                'retries': upstream_counts.get('retries', 0),
+                'rejected': upstream_counts.get('rejected', 0),
+                'mean_ms': upstream_counts.get('total_ms', 0) / requests_made if requests_made else None,
+                'latency_ms': {bucket: upstream_counts.get(f'le_{bucket}', 0)
+                               for bucket in [*map(str, LATENCY_BUCKETS_MS), 'inf']},
+            }
+            if upstream in self.breakers:
+                stats[upstream]['circuit'] = self.breakers[upstream].state
+        return stats
@@ -67,3 +67,20 @@ class TaskRecord(db.Model, TimestampMixin):
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
+
+
+class ClassificationSample(db.Model, TimestampMixin):
+    """Page text a classification task predicted from, and the label a user corrected it to, if any."""
+    __tablename__ = 'classification_samples'
+
+    id = db.Column(db.Integer, primary_key=True)
+    task_id = db.Column(db.String(255), unique=True, nullable=False, index=True)
+    text = db.Column(db.Text, nullable=False)
+    predicted = db.Column(db.String(100), nullable=True)
+    label = db.Column(db.String(100), nullable=True)
+    corrected_at = db.Column(db.DateTime, nullable=True, index=True)
+    # Held out of retraining, to evaluate the retrained models on
+    held_out = db.Column(db.Boolean, default=False, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<ClassificationSample {self.task_id}>'
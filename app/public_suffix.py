@@ -0,0 +1,154 @@
+import os
+import ipaddress
+from functools import lru_cache
+
+# Keys of a trie node that aren't labels: the node ends a rule, or an exception rule
+_RULE = '$'
+_EXCEPTION = '!'
+
+
+def default_list_path():
+    """The public suffix list shipped with python-whois."""
+    import whois
+    return os.path.join(os.path.dirname(whois.__file__), 'data', 'public_suffix_list.dat')
+
+
+def hostname_of(url):
+    """
+    Returns the lowercased host of a URL, or of a bare host name such as bbc.co.uk/news,
+    without port, user info or brackets, as urlparse(url).hostname does but faster.
+    """
+    if url.startswith('//'):
+        start = 2
+    else:
+        position = url.find('://')
+        start = position + 3 if position > 0 and url[:position].isalnum() else 0
+    end = len(url)
+    for delimiter in '/?#':
+        position = url.find(delimiter, start, end)
+        if position >= 0:
+            end = position
+    host = url[start:end].rpartition('@')[2]
+    if host.startswith('['):
+        host = host[1:].partition(']')[0]
+    else:
+        host = host.partition(':')[0]
+    return host.rstrip('.').lower()
+
+
+class PublicSuffixList:
+    """
+    The rules of a public suffix list (https://publicsuffix.org/list/) compiled into a trie
+    of labels from the TLD down, so the public suffix of a host name is found in one walk
+    over its labels. Rules are added in their Unicode and punycode forms. Only the ICANN
+    section is used unless ``include_private``: private suffixes such as github.io would
+    make every user's site a domain of its own, which its registry's WHOIS doesn't know.
+    """
+
+    def __init__(self, path=None, include_private=False):
+        self.path = path or os.getenv('PUBLIC_SUFFIX_LIST') or default_list_path()
+        self.include_private = include_private
+        self.root = {}
+        self.rule_count = 0
+        with open(self.path, encoding='utf-8') as rules:
+            for line in rules:
+                line = line.strip()
+                if line.startswith('// ===BEGIN PRIVATE DOMAINS===') and not include_private:
+                    break
+                if line and not line.startswith('//'):
+                    self.add(line.split()[0])
+
+    def add(self, rule):
+        exception = rule.startswith('!')
+        rule = rule.lstrip('!').lower()
+        forms = {rule}
+        try:
+            forms.add('.'.join(label if label == '*' else label.encode('idna').decode('ascii') for label in rule.split('.')))
+        except UnicodeError:
+            pass
+        for form in forms:
+            node = self.root
+            for label in reversed(form.split('.')):
+                node = node.setdefault(label, {})
+            node[_EXCEPTION if exception else _RULE] = True
+        self.rule_count += 1
+
+    def suffix_length(self, labels):
+        """Returns how many of the last labels of a host name (given as a list) make its public suffix."""
+        node = self.root
+        length = 1  # A TLD missing from the list is a public suffix all the same
+        for depth, label in enumerate(reversed(labels), 1):
+            child = node.get(label)
+            if '*' in node:
+                if child is not None and _EXCEPTION in child:
+                    return depth - 1
+                length = depth
+            if child is None:
+                break
+            if _RULE in child:
+                length = depth
+            node = child
+        return length
+
+    def split(self, hostname):
+        """
+        Returns the registrable domain of a host name (bbc.co.uk for news.bbc.co.uk), or None
+        when the host is a public suffix itself, and its public suffix (co.uk).
+        """
+        labels = hostname.split('.')
+        length = self.suffix_length(labels)
+        suffix = '.'.join(labels[-length:])
+        if len(labels) <= length:
+            return None, suffix
+        return '.'.join(labels[-length - 1:]), suffix
+
+
+# Compiled by the first lookup, once per process
+public_suffixes = None
+
+def get_public_suffixes():
+    global public_suffixes
+    if public_suffixes is None:
+        public_suffixes = PublicSuffixList(include_private=os.getenv('PUBLIC_SUFFIX_PRIVATE', '0') == '1')
+    return public_suffixes
+
+
+def is_ip_address(hostname):
+    # Host names end in a TLD, which has letters; only addresses need parsing
+    if not (hostname[-1:].isdigit() or ':' in hostname):
+        return False
+    try:
+        ipaddress.ip_address(hostname)
+        return True
+    except ValueError:
+        return False
+
+
+@lru_cache(maxsize=100000)
+def split_host(hostname):
+    """
+    Returns the registrable domain and public suffix of a host name, with the list of
+    get_public_suffixes(). The registrable domain is the host itself for a single label
+    such as localhost or a public suffix, and for an IP address, whose suffix is ''.
+    """
+    if not hostname or is_ip_address(hostname):
+        return hostname, ''
+    domain, suffix = get_public_suffixes().split(hostname)
+    return domain or hostname, suffix
+
+
+def registrable_domain(url):
+    """
+    Returns the domain a URL's host is registered under (bbc.co.uk for
+    https://news.bbc.co.uk:8080/path), the host itself when it is an IP address, a single
+    label such as localhost or a public suffix, or '' when there is no host.
+    """
+    return split_host(hostname_of(url))[0]
+
+
+def top_level_domain(url):
+    """Returns the last label of a URL's host (uk for news.bbc.co.uk), or '' for IP addresses and URLs without a host."""
+    hostname = hostname_of(url)
+    if not split_host(hostname)[1]:
+        return ''
+    return hostname.rpartition('.')[2]
@@ -0,0 +1,293 @@
+import os
+import time
+import random
+import socket
+import struct
+import asyncio
+import ipaddress
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import TimeoutError as FutureTimeout
+
+# Addresses of a host name, and the seconds they may be cached for
+Resolution = namedtuple('Resolution', ['addresses', 'ttl'])
+
+A, CNAME, SOA, AAAA = 1, 5, 6, 28
+NXDOMAIN = 3
+
+
+class ResolverError(Exception):
+    """The name servers gave no usable answer in time."""
+
+
+class HostNotFound(ResolverError):
+    """The host name has no addresses; ``ttl`` is how long that answer may be cached."""
+
+    def __init__(self, hostname, ttl):
+        super().__init__(f"{hostname} not found")
+        self.ttl = ttl
+
+
+def encode_query(query_id, hostname, record_type):
+    """Returns a DNS query message asking recursively for one record type of a host name."""
+    labels = hostname.encode('idna').split(b'.')
+    question = b''.join(bytes([len(label)]) + label for label in labels) + b'\0'
+    return struct.pack('!HHHHHH', query_id, 0x0100, 1, 0, 0, 0) + question + struct.pack('!HH', record_type, 1)
+
+
+def skip_name(message, offset):
+    """Returns the offset just past the (possibly compressed) domain name at ``offset``."""
+    while True:
+        length = message[offset]
+        if length & 0xC0 == 0xC0:
+            return offset + 2
+        offset += 1 + length
+        if length == 0:
+            return offset
+
+
+def parse_response(message, query_id, record_type):
+    """
+    Returns the response code, the addresses of the record type in the answer, the lowest
+    TTL of the answer's records (CNAMEs included), the negative TTL given by the SOA record
+    of the authority section, if any, and whether the response was truncated.
+    """
+    response_id, flags, questions, answers, authorities, _ = struct.unpack_from('!HHHHHH', message)
+    if response_id != query_id or not flags & 0x8000:
+        raise ValueError('Not a response to the query')
+    if flags & 0x0200:
+        # Truncated: the records may be cut anywhere, the query has to be repeated over TCP
+        return flags & 0xF, [], 0, None, True
+    offset = 12
+    for _ in range(questions):
+        offset = skip_name(message, offset) + 4
+    addresses, ttls = [], []
+    negative_ttl = None
+    for section, count in (('answer', answers), ('authority', authorities)):
+        for _ in range(count):
+            offset = skip_name(message, offset)
+            rtype, _, ttl, length = struct.unpack_from('!HHIH', message, offset)
+            offset += 10
+            data = message[offset:offset + length]
+            offset += length
+            if section == 'answer' and rtype in (record_type, CNAME):
+                if rtype == record_type:
+                    addresses.append(str(ipaddress.ip_address(data)))
+                ttls.append(ttl)
+            elif section == 'authority' and rtype == SOA:
+                # The SOA's minimum field, its last 4 bytes, bounds how long a negative answer is kept
+                negative_ttl = min(ttl, struct.unpack_from('!I', data, len(data) - 4)[0])
+    return flags & 0xF, addresses, min(ttls) if ttls else 0, negative_ttl, False
+
+
+def parse_nameserver(nameserver, default_port=53):
+    """Returns (host, port) for host, host:port, [IPv6] or [IPv6]:port."""
+    nameserver = nameserver.strip()
+    if nameserver.startswith('['):
+        host, _, port = nameserver[1:].partition(']')
+        return host, int(port.lstrip(':') or default_port)
+    if nameserver.count(':') == 1:
+        host, port = nameserver.split(':')
+        return host, int(port)
+    return nameserver, default_port
+
+
+def system_nameservers(path='/etc/resolv.conf'):
+    try:
+        with open(path, encoding='utf-8') as resolv_conf:
+            return [(line.split()[1].split('%')[0], 53) for line in resolv_conf
+                    if line.startswith('nameserver') and len(line.split()) > 1]
+    except OSError:
+        return []
+
+
+def read_hosts_file(path='/etc/hosts'):
+    """Returns the addresses the hosts file gives each host name."""
+    hosts = {}
+    try:
+        with open(path, encoding='utf-8') as hosts_file:
+            for line in hosts_file:
+                fields = line.split('#')[0].split()
+                for name in fields[1:]:
+                    hosts.setdefault(name.lower(), []).append(fields[0])
+    except OSError:
+        pass
+    return hosts
+
+
+class _DatagramQuery(asyncio.DatagramProtocol):
+    def __init__(self, future):
+        self.future = future
+
+    def datagram_received(self, data, address):
+        if not self.future.done():
+            self.future.set_result(data)
+
+    def error_received(self, exc):
+        if not self.future.done():
+            self.future.set_exception(exc)
+
+
+class DNSResolver:
+    """
+    A caching stub resolver for host names, on an asyncio event loop of its own.
+
+    It asks the name servers (``nameservers``, or DNS_NAMESERVERS as host[:port] items
+    separated by commas, or those of /etc/resolv.conf) for the A and AAAA records of a name
+    at once, over UDP, and over TCP when an answer is truncated. Answers are cached in the
+    process for the lowest TTL of their records, up to ``max_ttl``; names that don't exist
+    or have no addresses for the TTL their zone gives negative answers, up to
+    ``max_negative_ttl``. Failures (timeouts, server errors) are not cached. Concurrent
+    lookups of the same name share one query. Names of the hosts file are answered from it.
+
+    ``resolve()`` is a coroutine for the resolver's loop; threads call ``resolve_sync()``.
+    """
+
+    def __init__(self, nameservers=None, timeout=None, attempts=2, max_ttl=86400, max_negative_ttl=300,
+                 max_entries=10000, hosts=None):
+        if nameservers is None:
+            configured = os.getenv('DNS_NAMESERVERS', '')
+            nameservers = [parse_nameserver(item) for item in configured.split(',') if item.strip()] or system_nameservers()
+        self.nameservers = [parse_nameserver(item) if isinstance(item, str) else tuple(item) for item in nameservers]
+        self.timeout = float(os.getenv('DNS_QUERY_TIMEOUT', 2)) if timeout is None else timeout  # Per query
+        self.attempts = attempts
+        self.max_ttl = max_ttl
+        self.max_negative_ttl = max_negative_ttl
+        self.max_entries = max_entries
+        self.hosts = read_hosts_file() if hosts is None else hosts
+        self._cache = OrderedDict()  # name -> (expiry, Resolution), least recently used first
+        self._inflight = {}  # name -> task looking it up
+        self._loop = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.queries = 0  # Sent to name servers
+        self.hits = 0
+        self.collapsed = 0  # Lookups that joined one already running
+
+    def loop(self):
+        """Returns the resolver's event loop, started in a thread on first use in each process."""
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                # A forked worker doesn't inherit the loop's thread
+                self._loop = asyncio.new_event_loop()
+                self._cache.clear()
+                self._inflight = {}
+                threading.Thread(target=self._loop.run_forever, name='dns-resolver', daemon=True).start()
+                self._pid = os.getpid()
+            return self._loop
+
+    def resolve_sync(self, hostname, timeout=None):
+        """Resolves a host name from any thread, waiting at most ``timeout`` seconds."""
+        future = asyncio.run_coroutine_threadsafe(self.resolve(hostname), self.loop())
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise ResolverError(f"Timed out resolving {hostname}")
+
+    async def resolve(self, hostname):
+        """Returns the Resolution of a host name, or raises HostNotFound or ResolverError."""
+        hostname = hostname.rstrip('.').lower()
+        try:
+            return Resolution([str(ipaddress.ip_address(hostname))], self.max_ttl)
+        except ValueError:
+            pass
+        if hostname in self.hosts:
+            return Resolution(self.hosts[hostname], self.max_ttl)
+
+        entry = self._cache.get(hostname)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._cache.move_to_end(hostname)
+                self.hits += 1
+                if not entry[1].addresses:
+                    raise HostNotFound(hostname, entry[1].ttl)
+                return entry[1]
+            del self._cache[hostname]
+
+        task = self._inflight.get(hostname)
+        if task is None:
+            task = self._inflight[hostname] = asyncio.get_running_loop().create_task(self._lookup(hostname))
+            task.add_done_callback(lambda _: self._inflight.pop(hostname, None))
+        else:
+            self.collapsed += 1
+        # Shielded, so a caller giving up doesn't cancel the query the others wait for
+        return await asyncio.shield(task)
+
+    async def _lookup(self, hostname):
+        if not self.nameservers:
+            return await self._system_lookup(hostname)
+        results = await asyncio.gather(self._query(hostname, A), self._query(hostname, AAAA), return_exceptions=True)
+        answers = [result for result in results if not isinstance(result, BaseException)]
+        addresses = [address for answer in answers for address in answer[0]]
+        if addresses:
+            ttl = min(min(answer[1] for answer in answers if answer[0]), self.max_ttl)
+            return self._store(hostname, Resolution(addresses, ttl))
+        if any(answer[2] for answer in answers) or len(answers) == len(results):
+            # The name doesn't exist, or none of its records are addresses
+            ttls = [answer[3] for answer in answers if answer[3] is not None]
+            ttl = min(ttls + [self.max_negative_ttl])
+            self._store(hostname, Resolution([], ttl))
+            raise HostNotFound(hostname, ttl)
+        raise next(result for result in results if isinstance(result, BaseException))
+
+    async def _system_lookup(self, hostname):
+        # No name servers to ask: the system resolver, in the loop's executor, without TTLs
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(hostname, None, type=socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            if e.errno in (socket.EAI_NONAME, getattr(socket, 'EAI_NODATA', socket.EAI_NONAME)):
+                self._store(hostname, Resolution([], self.max_negative_ttl))
+                raise HostNotFound(hostname, self.max_negative_ttl)
+            raise ResolverError(str(e))
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        return self._store(hostname, Resolution(addresses, min(300, self.max_ttl)))
+
+    def _store(self, hostname, resolution):
+        if resolution.ttl > 0:
+            self._cache[hostname] = (time.monotonic() + resolution.ttl, resolution)
+            self._cache.move_to_end(hostname)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return resolution
+
+    async def _query(self, hostname, record_type):
+        """Returns (addresses, ttl, whether the name doesn't exist, negative ttl) from the first server answering."""
+        error = None
+        for _ in range(self.attempts):
+            for nameserver in self.nameservers:
+                query_id = random.getrandbits(16)
+                query = encode_query(query_id, hostname, record_type)
+                try:
+                    self.queries += 1
+                    rcode, addresses, ttl, negative_ttl, truncated = parse_response(
+                        await self._send_udp(nameserver, query), query_id, record_type)
+                    if truncated:
+                        rcode, addresses, ttl, negative_ttl, _ = parse_response(
+                            await self._send_tcp(nameserver, query), query_id, record_type)
+                except (OSError, asyncio.TimeoutError, ValueError, struct.error, IndexError) as e:
+                    error = str(e) or type(e).__name__
+                    continue
+                if rcode in (0, NXDOMAIN):
+                    return addresses, ttl, rcode == NXDOMAIN, negative_ttl
+                error = f"response code {rcode}"
+        raise ResolverError(f"No answer for {hostname}: {error}")
+
+    async def _send_udp(self, nameserver, query):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        transport, _ = await loop.create_datagram_endpoint(lambda: _DatagramQuery(future), remote_addr=nameserver)
+        try:
+            transport.sendto(query)
+            return await asyncio.wait_for(future, self.timeout)
+        finally:
+            transport.close()
+
+    async def _send_tcp(self, nameserver, query):
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(*nameserver), self.timeout)
+        try:
+            writer.write(struct.pack('!H', len(query)) + query)
+            length = struct.unpack('!H', await asyncio.wait_for(reader.readexactly(2), self.timeout))[0]
+            return await asyncio.wait_for(reader.readexactly(length), self.timeout)
+        finally:
+            writer.close()
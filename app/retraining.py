@@ -0,0 +1,116 @@
+import os
+import hashlib
+from datetime import datetime
+from app.models import ClassificationSample
+
+# One corrected page in this many is held out of training, to evaluate retrained models on
+HOLDOUT_EVERY = 5
+
+# Most recent held-out corrections each retrained model is evaluated on
+CLASSIFIER_HOLDOUT_SIZE = int(os.getenv('CLASSIFIER_HOLDOUT_SIZE', 1000))
+
+# Drop in held-out accuracy past which a retrained model is not published
+CLASSIFIER_RETRAIN_MAX_ACCURACY_DROP = float(os.getenv('CLASSIFIER_RETRAIN_MAX_ACCURACY_DROP', 0.02))
+
+
+def is_held_out(task_id):
+    """Whether a classification task's page is held out of retraining; fixed for each task."""
+    return int(hashlib.md5(task_id.encode('utf-8')).hexdigest(), 16) % HOLDOUT_EVERY == 0
+
+
+def watermark_path(classifier, version):
+    return os.path.join(classifier.artifact_path(version), 'corrections_until')
+
+
+def read_watermark(classifier, version):
+    """
+    Returns the time of the last correction a run on this version has read, as an ISO
+    string: the one its runs recorded, or the one it was trained up to, or None.
+    """
+    try:
+        with open(watermark_path(classifier, version), encoding='utf-8') as watermark_file:
+            return watermark_file.read().strip() or None
+    except FileNotFoundError:
+        return classifier.read_metadata(version).get('corrections_until')
+
+
+def write_watermark(classifier, version, corrected_at):
+    path = watermark_path(classifier, version)
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as watermark_file:
+        watermark_file.write(corrected_at.isoformat())
+    os.replace(f'{path}.tmp', path)
+
+
+def accuracy(classifier, samples):
+    if not samples:
+        return None
+    predicted = classifier.pipeline.predict([sample.text for sample in samples])
+    return sum(label == sample.label for label, sample in zip(predicted, samples)) / len(samples)
+
+
+def retrain_from_corrections(classifier):
+    """
+    Trains the current hashing model further on the classifications users corrected since
+    it was published, evaluates it on the held-out corrections and, unless its accuracy
+    dropped by more than CLASSIFIER_RETRAIN_MAX_ACCURACY_DROP, publishes it as a new
+    version. The version records the time of the last correction it was trained on, and
+    runs that publish nothing (rejected, or only finding corrections to categories the
+    model doesn't know) record it next to the version they read, so the next run only reads
+    corrections made after it: the cost of a run grows with the new corrections and the
+    (bounded) held-out set, not with all the data seen so far.
+
+    Needs an application context for the database. Returns a summary of the run.
+    """
+    version = classifier.model_version()
+    if version is None:
+        return {'status': 'skipped', 'reason': 'no model artifact'}
+    # Known from the metadata, before any correction is read or the model unpickled
+    if classifier.read_metadata(version).get('pipeline', 'tfidf') != 'hashing':
+        return {'status': 'skipped', 'reason': 'the model was not built with the hashing pipeline', 'version': version}
+    since = read_watermark(classifier, version)
+
+    query = ClassificationSample.query.filter(ClassificationSample.corrected_at.isnot(None),
+                                              ClassificationSample.held_out.is_(False))
+    if since:
+        query = query.filter(ClassificationSample.corrected_at > datetime.fromisoformat(since))
+    corrections = query.order_by(ClassificationSample.corrected_at).all()
+    if not corrections:
+        return {'status': 'skipped', 'reason': 'no new corrections', 'version': version}
+
+    classifier.load_for_update()
+    if not classifier.is_updatable():
+        return {'status': 'skipped', 'reason': 'the model was not built with the hashing pipeline', 'version': version}
+    base = classifier.metadata
+
+    # Partial fits only take the categories the model was first trained on
+    classes = set(classifier.pipeline.classes_)
+    training = [sample for sample in corrections if sample.label in classes]
+    holdout = ClassificationSample.query.filter(ClassificationSample.corrected_at.isnot(None),
+                                                ClassificationSample.held_out.is_(True)) \
+        .order_by(ClassificationSample.corrected_at.desc()).limit(CLASSIFIER_HOLDOUT_SIZE).all()
+    holdout = [sample for sample in holdout if sample.label in classes]
+    summary = {'base_version': base['version'], 'corrections': len(corrections), 'trained_on': len(training),
+               'holdout_size': len(holdout)}
+    if not training:
+        write_watermark(classifier, version, corrections[-1].corrected_at)
+        return {'status': 'skipped', 'reason': 'no corrections to a known category', **summary}
+
+    previous_accuracy = accuracy(classifier, holdout)
+    classifier.update_model([sample.text for sample in training], [sample.label for sample in training])
+    new_accuracy = accuracy(classifier, holdout)
+    summary.update(previous_accuracy=previous_accuracy, accuracy=new_accuracy)
+    if holdout and new_accuracy < previous_accuracy - CLASSIFIER_RETRAIN_MAX_ACCURACY_DROP:
+        # Not read again: a later run trains the same model on newer corrections only
+        write_watermark(classifier, version, corrections[-1].corrected_at)
+        return {'status': 'rejected', **summary}
+
+    summary['version'] = classifier.save_artifact({
+        'pipeline': base.get('pipeline', 'hashing'),
+        'base_version': base['version'],
+        'data_file': 'corrections',
+        'corrections_until': corrections[-1].corrected_at.isoformat(),
+        'train_size': base.get('train_size', 0) + len(training),
+        'test_size': len(holdout),
+        'metrics': {'accuracy': new_accuracy, 'previous_accuracy': previous_accuracy},
+    })
+    return {'status': 'published', **summary}
@@ -1,8 +1,143 @@
-from bs4 import BeautifulSoup
+import os
+import time
+import multiprocessing
+from functools import lru_cache
+from bs4 import BeautifulSoup, Tag
+from lxml import etree
 import re
-from urllib.parse import urlparse, urljoin
+from urllib.parse import urljoin, urlsplit
 import phonenumbers
 
+# Pages larger than this (in characters) are scraped in streaming mode unless a mode is requested
+STREAMING_THRESHOLD = int(os.getenv('SCRAPER_STREAMING_THRESHOLD', 2_000_000))
+
+# Elements whose strings soup.get_text() leaves out (BeautifulSoup's string containers)
+NON_TEXT_CONTAINERS = {'script', 'style', 'template', 'rt', 'rp'}
+
+
+@lru_cache(maxsize=65536)
+def validate_phone_number(number, region=None):
+    """
+    Parses and validates a cleaned phone number, returning it in E.164 format, or None if
+    it is not a valid number. Verdicts are cached process-wide, as the same numbers (and
+    the same junk digit runs) recur across the pages of a site.
+    """
+    try:
+        parsed_number = phonenumbers.parse(number, region)
+    except phonenumbers.NumberParseException:
+        return None
+    if not phonenumbers.is_valid_number(parsed_number):
+        return None
+    return phonenumbers.format_number(parsed_number, phonenumbers.PhoneNumberFormat.E164)
+
+
+class Blacklist:
+    """
+    A set of regular expressions that blacklist a URL when any of them is found in its
+    netloc. The patterns are compiled into a single alternation, so checking a URL costs
+    one search however many entries the blacklist has. Instances are immutable and can be
+    shared between scrapers.
+    """
+
+    # Patterns that would change meaning inside a combined pattern (numbered backreferences
+    # and conditionals, whose group numbers shift, inline flags, named groups, which two
+    # entries may both define) are kept apart and searched separately
+    standalone_pattern = re.compile(r'\\\d|\(\?[aiLmsux]+[):]|\(\?P[<=]|\(\?\(')
+
+    def __init__(self, patterns=()):
+        self.patterns = list(dict.fromkeys(patterns))
+        combined = []
+        self.separate = []
+        for pattern in self.patterns:
+            compiled = re.compile(pattern)
+            if self.standalone_pattern.search(pattern):
+                self.separate.append(compiled)
+            else:
+                combined.append(f'(?:{pattern})')
+        try:
+            self.combined = re.compile('|'.join(combined)) if combined else None
+        except re.error:
+            # Entries that only clash once combined, which each compile on their own
+            self.combined = None
+            self.separate = [re.compile(pattern) for pattern in self.patterns]
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def matches(self, netloc):
+        """Returns whether any pattern is found in the netloc."""
+        if self.combined is not None and self.combined.search(netloc):
+            return True
+        return any(pattern.search(netloc) for pattern in self.separate)
+
+
+@lru_cache(maxsize=None)
+def load_blacklist(path):
+    """
+    Reads a blacklist file, one pattern per line (blank lines and lines starting with #
+    are skipped), and compiles it. Each file is only read and compiled once per process.
+    """
+    with open(path, encoding='utf-8') as blacklist_file:
+        lines = (line.strip() for line in blacklist_file)
+        return Blacklist(line for line in lines if line and not line.startswith('#'))
+
+
+def default_blacklist():
+    """Returns the blacklist named by SCRAPER_BLACKLIST_FILE, or an empty one if it is not set."""
+    path = os.getenv('SCRAPER_BLACKLIST_FILE')
+    return load_blacklist(path) if path else EMPTY_BLACKLIST
+
+
+EMPTY_BLACKLIST = Blacklist()
+
+
+class SocialLinkMatcher:
+    """
+    Matches links against the per-platform social media patterns. Each link is dispatched
+    on its host through a suffix-keyed index, so only the pattern of the platform it points
+    at is run, instead of every pattern on every link.
+    """
+
+    def __init__(self, patterns, hosts):
+        self.patterns = {platform: re.compile(pattern) for platform, pattern in patterns.items()}
+        self.order = {platform: position for position, platform in enumerate(patterns)}
+        self.host_index = {}
+        for platform, host in hosts.items():
+            self.host_index.setdefault(host, []).append(platform)
+        # The patterns are not anchored to the host, so a platform host mentioned anywhere
+        # else in the link (e.g. a redirect parameter) can still produce a match
+        alternatives = '|'.join(re.escape(host) for host in sorted(self.host_index))
+        self.mention_pattern = re.compile(f'(?=({alternatives}))')
+
+    def mentions_platform(self, text):
+        """Cheap pre-check: a link that mentions no platform host cannot match any pattern."""
+        return self.mention_pattern.search(text) is not None
+
+    def lookup_host(self, host):
+        """Returns the platforms registered for the host or any of its parent domains."""
+        platforms = []
+        while host:
+            platforms.extend(self.host_index.get(host, ()))
+            host = host.partition('.')[2]
+        return platforms
+
+    def match(self, href):
+        """Returns the platforms whose pattern matches the link, in declaration order."""
+        try:
+            netloc = urlsplit(href).netloc
+        except ValueError:
+            netloc = ''
+        host = netloc.rpartition('@')[2].partition(':')[0]
+        candidates = set(self.lookup_host(host)) if host else set()
+
+        # Links with a known host only need the part after it scanned for other mentions
+        scan_from = href.find(netloc) + len(netloc) if candidates else 0
+        for mention in self.mention_pattern.finditer(href, scan_from):
+            candidates.update(self.host_index[mention.group(1)])
+
+        return [platform for platform in sorted(candidates, key=self.order.__getitem__)
+                if self.patterns[platform].search(href)]
+
 
 class Scraper:
     social_media_domains = {
@@ -28,50 +163,253 @@ class Scraper:
         'wordpress': r'[\w.-]+\.wordpress\.com/?$',
     }
 
+    # Host each platform's links live on, used to pick the pattern to run for a link
+    social_media_hosts = {
+        'facebook': 'facebook.com',
+        'twitter': 'twitter.com',
+        'linkedin': 'linkedin.com',
+        'instagram': 'instagram.com',
+        'youtube': 'youtube.com',
+        'tiktok': 'tiktok.com',
+        'pinterest': 'pinterest.com',
+        'github': 'github.com',
+        'medium': 'medium.com',
+        'reddit': 'reddit.com',
+        'tumblr': 'tumblr.com',
+        'snapchat': 'snapchat.com',
+        'vimeo': 'vimeo.com',
+        'soundcloud': 'soundcloud.com',
+        'behance': 'behance.net',
+        'dribbble': 'dribbble.com',
+        'quora': 'quora.com',
+        'flickr': 'flickr.com',
+        'deviantart': 'deviantart.com',
+        'wordpress': 'wordpress.com',
+    }
+
+    # Patterns are compiled once per process instead of on every call
+    social_link_matcher = SocialLinkMatcher(social_media_domains, social_media_hosts)
+
+    email_pattern = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,7}\b')
+    valid_email_pattern = re.compile(r'^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,7}$')
+
+    # A single scan for anything shaped like a phone number: an optional '+', then digits
+    # with the usual separators. Digit runs glued to words, prices or decimals are skipped.
+    phone_candidate_pattern = re.compile(r'((?:(?<![\d+])\+|(?<![\w+.,/$€£¥-]))\(?\d[\d \t\-.()\u00a0]{5,24}\d)(?![\w%/]|[.,]\d)')
+    date_pattern = re.compile(r'\d{4}[-./]\d{1,2}[-./]\d{1,2}|\d{1,2}[-./]\d{1,2}[-./]\d{2,4}')
+    # Region for numbers written without a country code. Without one, only international
+    # numbers can be read unambiguously, so national ones are not extracted.
+    phone_region = os.getenv('SCRAPER_PHONE_REGION') or None
+    phone_separators = re.compile(r'[^\d\+]')
+
+    # Addresses are only looked for in a bounded window of the line around each street
+    # keyword, and the patterns only use bounded repetition, so the cost of address
+    # extraction stays linear in the length of the text however it is laid out
+    street_keyword_pattern = re.compile(r'\b(?:street|st|avenue|ave|road|rd|boulevard|blvd|lane|ln|drive|dr|way|place|pl|court|ct)\b', re.IGNORECASE)
+    address_window_size = 120
+
+    # Written token by token (words, then separators) so there is only one way for a
+    # pattern to consume any stretch of text, which keeps backtracking small
+    address_patterns = [
+        # US Address: Street number, street name, city, state abbreviation, zip code
+        re.compile(r'\d{1,5}(?:\s+[A-Za-z0-9.-]+){1,3}?\s+(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Lane|Ln|Drive|Dr|Way|Place|Pl|Court|Ct)\b\.?(?:\s+(?:Apt|Suite|Unit)\s+\d+)?,?\s+[A-Za-z]+(?:\s+[A-Za-z]+){0,3}?,?\s+[A-Z]{2}\s+\d{5}(?:-\d{4})?', re.IGNORECASE),
+
+        # UK Address: Street number, street name, optionally city, UK postal code
+        re.compile(r'\d{1,4}\s+[A-Za-z]+(?:\s+[A-Za-z]+){0,5}(?:,\s*[A-Za-z]+(?:\s+[A-Za-z]+){0,3}){0,3},\s*[A-Z]{1,2}\d{1,2}[A-Z]?\s*\d[A-Z]{2}', re.IGNORECASE),
+
+        # General International Address: Street number, street name, postal code
+        re.compile(r'\d{1,5}(?:[\s,]+\w+(?:-\w+)*){0,6}?[\s,]+(?:street|avenue|road|boulevard|lane|drive|way|place|court)(?:[\s,]+\w+(?:-\w+)*){0,6}?[\s,]+\d{4,6}', re.IGNORECASE),
+    ]
+    street_keywords = ['street', 'st', 'avenue', 'ave', 'road', 'rd', 'boulevard', 'blvd', 'lane', 'ln', 'drive', 'dr', 'way', 'place', 'court', 'ct']
+    digit_pattern = re.compile(r'\d')
+
+    feed_type_pattern = re.compile(r'(rss|atom)\+xml')
+    feed_href_pattern = re.compile(r'(rss|feed)', re.I)
+
+    # The extractor behind each field extract_all() can return, in result order
+    extractors = {
+        'social_links': 'extract_social_links',
+        'emails': 'extract_emails',
+        'phone_numbers': 'extract_phone_numbers',
+        'addresses': 'extract_addresses',
+        'rss_feeds': 'extract_rss_feeds',
+    }
+
+    # Patterns each field's extractor runs over the whole page text. Fields not listed
+    # only use the link index.
+    field_text_patterns = {
+        'emails': [email_pattern],
+        'phone_numbers': [phone_candidate_pattern],
+        'addresses': [street_keyword_pattern],
+    }
+
+    # Every pattern that runs over the whole page text; extract_all() narrows this down to
+    # what the requested fields need before the document is indexed
+    text_patterns = [email_pattern, phone_candidate_pattern, street_keyword_pattern]
+
+    # Seconds an extractor may run before it stops and returns what it has found so far
+    extractor_time_budget = float(os.getenv('SCRAPER_EXTRACTOR_TIME_BUDGET', 10))
+
     def __init__(self, html_content, base_url=None):
         self.soup = BeautifulSoup(html_content, 'lxml')
         self.base_url = base_url
-        self.blacklist = set()
+        self.blacklist = default_blacklist()
+        self._blacklist_verdicts = {}  # netloc -> whether it is blacklisted
+        self.truncated = []  # Fields whose extractor ran out of time
+        self.timings = {}  # Seconds taken by each step of the last extract_all()
+        self._text = None  # Built lazily by index_document()
+        self._anchor_hrefs = None
+        self._feed_link_hrefs = None
 
     def set_blacklist(self, blacklist):
-        """Set a blacklist of domains or patterns to ignore."""
-        self.blacklist = set(blacklist)
+        """Set a blacklist of domains or patterns to ignore, as patterns or a compiled Blacklist."""
+        self.blacklist = blacklist if isinstance(blacklist, Blacklist) else Blacklist(blacklist)
+        self._blacklist_verdicts = {}
 
     def is_blacklisted(self, url):
         """Check if a URL is blacklisted."""
-        parsed_url = urlparse(url)
-        return any(re.search(pattern, parsed_url.netloc) for pattern in self.blacklist)
+        if not self.blacklist:
+            return False
+        netloc = urlsplit(url).netloc
+        verdict = self._blacklist_verdicts.get(netloc)
+        if verdict is None:
+            verdict = self._blacklist_verdicts[netloc] = self.blacklist.matches(netloc)
+        return verdict
+
+    def start_time_budget(self):
+        """Returns the deadline for an extractor starting now."""
+        return time.monotonic() + self.extractor_time_budget
+
+    def over_time_budget(self, field, deadline):
+        """Checks an extractor's deadline, recording its field as truncated once it has passed."""
+        if time.monotonic() < deadline:
+            return False
+        if field not in self.truncated:
+            self.truncated.append(field)
+        return True
+
+    def index_document(self):
+        """
+        Walks the parsed document once, collecting the page text and the links every
+        extractor works from, so no extractor has to traverse the tree again. The text is
+        skipped when no text pattern is wanted.
+        """
+        if self._anchor_hrefs is not None:
+            return
+        collect_text = bool(self.text_patterns)
+
+        # The same string types soup.get_text() concatenates (no comments, scripts, etc.)
+        text_types = self.soup.interesting_string_types
+        if isinstance(text_types, type):
+            text_types = (text_types,)
+
+        text_parts = []
+        self._anchor_hrefs = []
+        self._feed_link_hrefs = []
+        for node in self.soup.descendants:
+            node_type = type(node)
+            if node_type in text_types:
+                if collect_text:
+                    text_parts.append(node)
+            elif node_type is Tag:
+                self.index_tag(node.name, node)
+
+        if collect_text:
+            self._text = ''.join(text_parts)
+
+    def index_tag(self, name, tag):
+        """Records an <a> or RSS/Atom <link> tag in the link index; other tags are ignored."""
+        if name == 'a':
+            href = tag.get('href')
+            if href is not None:
+                self._anchor_hrefs.append(href)
+        elif name == 'link':
+            link_type = tag.get('type')
+            href = tag.get('href')
+            if link_type is not None and href and self.feed_type_pattern.search(link_type):
+                self._feed_link_hrefs.append(href)
+
+    def get_text(self):
+        """Returns the page text, equivalent to soup.get_text()."""
+        self.index_document()
+        if self._text is None:
+            # The document was indexed for extractors that did not need the text
+            self._text = self.soup.get_text()
+        return self._text
 
+    def find_all_in_text(self, pattern):
+        """Returns the result of pattern.findall() over the page text."""
+        return pattern.findall(self.get_text())
+
+    def address_window(self, match):
+        """Returns the text around a street keyword match, within its line, in which addresses are looked for."""
+        text = match.string
+        start = max(match.start() - self.address_window_size, 0)
+        end = min(match.end() + self.address_window_size, len(text))
+        # Addresses do not span lines
+        start = max(start, text.rfind('\n', start, match.start()) + 1)
+        line_end = text.find('\n', match.end(), end)
+        if line_end != -1:
+            end = line_end
+        # Do not start or end in the middle of a word or number
+        if start > 0 and not text[start - 1].isspace():
+            space = text.find(' ', start, match.start())
+            if space != -1:
+                start = space + 1
+        if end < len(text) and not text[end].isspace():
+            space = text.rfind(' ', match.end(), end)
+            if space != -1:
+                end = space
+        return text[start:end]
+
+    def find_address_windows(self):
+        """Returns the address window around every street keyword in the page text."""
+        return [self.address_window(match) for match in self.street_keyword_pattern.finditer(self.get_text())]
+
+    def get_anchor_hrefs(self):
+        """Returns the href of every <a> tag that has one, in document order."""
+        self.index_document()
+        return self._anchor_hrefs
+
+    def get_feed_link_hrefs(self):
+        """Returns the href of every RSS/Atom <link> tag, in document order."""
+        self.index_document()
+        return self._feed_link_hrefs
 
     def extract_social_links(self):
-        links = self.soup.find_all('a', href=True)
         social_links = {}
-        for link in links:
-            href = link['href'].lower()
+        seen = set()
+        matcher = self.social_link_matcher
+        # Joining a relative link onto a base URL that mentions no platform cannot create a
+        # mention either, so such links can be dropped before paying for urljoin
+        base_mentions_platform = bool(self.base_url) and matcher.mentions_platform(self.base_url)
+        for href in self.get_anchor_hrefs():
+            href = href.lower()
+            # Repeated links (menus, footers) can only add what they added the first time
+            if href in seen:
+                continue
+            seen.add(href)
+            if not base_mentions_platform and not matcher.mentions_platform(href):
+                continue
             if self.base_url:
                 href = urljoin(self.base_url, href)
-            if self.is_blacklisted(href):
+            platforms = matcher.match(href)
+            # Only links that matched a platform need the blacklist check
+            if not platforms or self.is_blacklisted(href):
                 continue
-            for platform, pattern in self.social_media_domains.items():
-                if re.search(pattern, href):
-                    if platform not in social_links:
-                        social_links[platform] = set()
-                    social_links[platform].add(href)
+            for platform in platforms:
+                if platform not in social_links:
+                    social_links[platform] = set()
+                social_links[platform].add(href)
         return {k: list(v) for k, v in social_links.items()}
 
     def extract_emails(self):
-        # Email pattern to match standard emails in the text
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,7}\b'
-        
         # Find all emails in the plain text
-        emails_in_text = set(re.findall(email_pattern, self.soup.get_text()))
+        emails_in_text = set(self.find_all_in_text(self.email_pattern))
         
         # Find all mailto: links in the HTML content
-        mailto_links = self.soup.select('a[href^=mailto]')
-        
         emails_in_mailto = set()
-        for link in mailto_links:
-            href = link.get('href', '')
+        for href in self.get_anchor_hrefs():
             if href.startswith('mailto:'):
                 # Remove the 'mailto:' part and strip any parameters like ?subject=...
                 parsed_email = href[7:].split('?')[0]
@@ -87,71 +425,66 @@ class Scraper:
     def is_valid_email(self, email):
         """Performs additional validation on extracted email addresses to filter out malformed ones."""
         # Basic email validation to ensure the format is correct
-        email_pattern = r'^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,7}$'
-        return re.match(email_pattern, email) is not None
+        return self.valid_email_pattern.match(email) is not None
 
     def extract_phone_numbers(self):
-        phone_patterns = [
-            # US/Canada
-            r'\b(?:\+1\s*[\-\.\(\)]*)?(?:\(?([2-9][0-9]{2})\)?[\-\.\s]*)?([2-9][0-9]{2})[\-\.\s]*([0-9]{4})\b',
-            # UK
-            r'\b(?:\+44\s?|\(?0\)?)([1-9][0-9]{1,4})\s?([0-9]{4,6})\b',
-            # Germany
-            r'\b(?:\+49\s?|\(?0\)?)([1-9][0-9]{1,4})\s?([0-9]{4,7})\b',
-            # France
-            r'\b(?:\+33\s?|\(?0\)?)([1-9][0-9]{1,9})\b',
-            # Japan
-            r'\b(?:\+81\s?|\(?0\)?)([0-9]{2,4})[\-\.\s]?([0-9]{2,4})[\-\.\s]?([0-9]{4})\b',
-            # General international phone numbers
-            r'\b(?:\+\d{1,3}\s*[-.\(\)]*)?(?:\(?\d{1,4}\)?[-.\s]*)?\d{1,4}[-.\s]?\d{1,4}[-.\s]?\d{1,9}\b'
-        ]
-
+        # Cheap checks first, so only distinct plausible numbers reach phonenumbers
         phone_numbers = set()
-        text = self.soup.get_text()
+        for candidate in self.find_all_in_text(self.phone_candidate_pattern):
+            number = self.clean_phone_candidate(candidate)
+            if number:
+                phone_numbers.add(number)
         
-        for pattern in phone_patterns:
-            matches = re.findall(pattern, text)
-            for match in matches:
-                # Reconstruct the phone number from the match groups
-                if isinstance(match, tuple):
-                    match = ''.join(match)
-                # Clean up extra spaces or separators
-                clean_number = re.sub(r'[^\d\+]', '', match)
-                phone_numbers.add(clean_number)
-        
-        validated_numbers = []
+        validated_numbers = set()
+        deadline = self.start_time_budget()
         for number in phone_numbers:
-            try:
-                parsed_number = phonenumbers.parse(number)
-                if phonenumbers.is_valid_number(parsed_number):
-                    validated_numbers.append(phonenumbers.format_number(parsed_number, phonenumbers.PhoneNumberFormat.E164))
-            except phonenumbers.NumberParseException:
-                continue
+            if self.over_time_budget('phone_numbers', deadline):
+                break
+            formatted_number = validate_phone_number(number, self.phone_region)
+            if formatted_number:
+                validated_numbers.add(formatted_number)
         
-        return validated_numbers
+        return list(validated_numbers)
+
+    def clean_phone_candidate(self, candidate):
+        """
+        Strips separators from a phone number candidate, returning None for digit runs that
+        cannot be a phone number we are able to validate (dates, wrong length, national
+        numbers when no region is configured).
+        """
+        if self.date_pattern.fullmatch(candidate):
+            return None
+        number = self.phone_separators.sub('', candidate)
+        if number.startswith('00'):
+            number = '+' + number[2:]  # International dialling prefix
+        international = number.startswith('+')
+        if not international and self.phone_region is None:
+            return None
+        # E.164 numbers have at most 15 digits; nothing valid has fewer than 7
+        if not 7 <= len(number) - international <= 15:
+            return None
+        return number
 
     def extract_addresses(self):
-        # Refined patterns for different address formats
-        address_patterns = [
-            # US Address: Street number, street name, city, state abbreviation, zip code
-            r'\d{1,5}\s+(?:[A-Za-z0-9.-]+\s+){1,3}(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Lane|Ln|Drive|Dr|Way|Place|Pl|Court|Ct)\.?(?:\s+(?:Apt|Suite|Unit)\s+\d+)?(?:,?\s+[A-Za-z\s]+,?\s+[A-Z]{2}\s+\d{5}(?:-\d{4})?)',
-            
-            # UK Address: Street number, street name, optionally city, UK postal code
-            r'\d{1,4}\s+[A-Za-z\s]+(?:,\s*[A-Za-z\s]+)*,\s*[A-Z]{1,2}\d{1,2}[A-Z]?\s*\d[A-Z]{2}',
-            
-            # General International Address: Street number, street name, postal code
-            r'\d{1,5}(?:[\w\s,-]+)?(?:street|avenue|road|boulevard|lane|drive|way|place|court)[\w\s,-]+\d{4,6}'
-        ]
-        
         # Set to store unique addresses
         addresses = set()
+        searched_windows = set()
+        deadline = self.start_time_budget()
         
-        # Apply patterns and collect matches
-        for pattern in address_patterns:
-            matches = re.findall(pattern, self.soup.get_text(), re.IGNORECASE)
-            for match in matches:
-                if self.is_valid_address(match):
-                    addresses.add(match.strip())
+        # Apply patterns to the text around each street keyword and collect matches
+        for window in self.find_address_windows():
+            if window in searched_windows:
+                continue
+            searched_windows.add(window)
+            if self.over_time_budget('addresses', deadline):
+                break
+            # Every valid address contains a number
+            if not self.digit_pattern.search(window):
+                continue
+            for pattern in self.address_patterns:
+                for match in pattern.findall(window):
+                    if self.is_valid_address(match):
+                        addresses.add(match.strip())
         
         return list(addresses)
 
@@ -161,10 +494,8 @@ class Scraper:
         You can add more complex validation rules here based on your data.
         """
         # Check if the address contains some form of a street type (e.g., 'St', 'Ave', 'Rd')
-        street_keywords = ['street', 'st', 'avenue', 'ave', 'road', 'rd', 'boulevard', 'blvd', 'lane', 'ln', 'drive', 'dr', 'way', 'place', 'court', 'ct']
-        
-        # Ensure the address contains a keyword and numbers (like house numbers, zip codes)
-        if any(keyword in address.lower() for keyword in street_keywords) and re.search(r'\d', address):
+        # and numbers (like house numbers, zip codes)
+        if any(keyword in address.lower() for keyword in self.street_keywords) and self.digit_pattern.search(address):
             return True
         return False
 
@@ -172,18 +503,10 @@ class Scraper:
         """Extract RSS feed links from the HTML content."""
         rss_links = set()
         
-        # Look for link tags with type "application/rss+xml" or "application/atom+xml"
-        for link in self.soup.find_all('link', type=re.compile(r'(rss|atom)\+xml')):
-            href = link.get('href')
-            if href:
-                if self.base_url:
-                    href = urljoin(self.base_url, href)
-                if not self.is_blacklisted(href):
-                    rss_links.add(href)
-        
-        # Look for 'a' tags with href containing 'rss' or 'feed'
-        for link in self.soup.find_all('a', href=re.compile(r'(rss|feed)', re.I)):
-            href = link.get('href')
+        # Link tags with type "application/rss+xml" or "application/atom+xml", followed by
+        # 'a' tags with href containing 'rss' or 'feed'
+        feed_anchor_hrefs = [href for href in self.get_anchor_hrefs() if self.feed_href_pattern.search(href)]
+        for href in self.get_feed_link_hrefs() + feed_anchor_hrefs:
             if href:
                 if self.base_url:
                     href = urljoin(self.base_url, href)
@@ -192,14 +515,388 @@ class Scraper:
         
         return list(rss_links)
 
-    def extract_all(self):
-        return {
-            'social_links': self.extract_social_links(),
-            'emails': self.extract_emails(),
-            'phone_numbers': self.extract_phone_numbers(),
-            'addresses': self.extract_addresses(),
-            'rss_feeds': self.extract_rss_feeds(),
-        }
+    @classmethod
+    def check_fields(cls, fields):
+        """Returns the fields to extract, all of them for None; raises ValueError for unknown fields."""
+        if fields is None:
+            return list(cls.extractors)
+        unknown = [field for field in fields if field not in cls.extractors]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return fields
+
+    def extract_all(self, fields=None):
+        """
+        Runs the extractors for the requested fields (all of them by default) and returns
+        their results by field. Other extractors never run, and the page text is only built
+        if a requested extractor needs it. How long indexing and each extractor took is
+        left in self.timings.
+        """
+        fields = self.check_fields(fields)
+        self.text_patterns = [
+            pattern
+            for field in self.extractors if field in fields
+            for pattern in self.field_text_patterns.get(field, [])
+        ]
+        self.timings = {}
+        start = time.perf_counter()
+        self.index_document()
+        self.timings['index'] = time.perf_counter() - start
+
+        results = {}
+        for field, method in self.extractors.items():
+            if field not in fields:
+                continue
+            start = time.perf_counter()
+            results[field] = getattr(self, method)()
+            self.timings[field] = time.perf_counter() - start
+        return results
+
+def iter_html_events(html_content, feed_size=65536, ends=False):
+    """
+    Parses HTML incrementally with lxml's pull parser and yields ``('text', string)`` and
+    ``('start', element)`` events in document order, and ``('end', element)`` events too
+    with ``ends``. The text is the same sequence of strings soup.get_text() joins, and each
+    piece of it lies directly within the innermost element started and not yet ended.
+    Elements are pruned as soon as they are processed, so memory use does not grow with
+    the size of the document.
+    """
+    parser = etree.HTMLPullParser(events=('start', 'end', 'comment', 'pi'), recover=True)
+
+    def parser_events():
+        for offset in range(0, len(html_content), feed_size):
+            parser.feed(html_content[offset:offset + feed_size])
+            yield from parser.read_events()
+        try:
+            parser.close()
+        except etree.XMLSyntaxError:
+            return  # Nothing parseable in the document
+        yield from parser.read_events()
+
+    # Whether each open element's own text is left out of the page text
+    excluded = []
+    for event, element in parser_events():
+        if event == 'end':
+            if not excluded.pop():
+                # Text after the last child (or all of it, for a leaf) is complete now
+                text = element[-1].tail if len(element) else element.text
+                if text:
+                    yield 'text', text
+            if ends:
+                yield 'end', element
+            # Everything but this element's tail has been emitted, and so has everything
+            # of its previous siblings
+            element.clear(keep_tail=True)
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+            continue
+
+        # A new node (element, comment or processing instruction) completes the text before it
+        parent = element.getparent()
+        parent_excluded = excluded[-1] if excluded else False
+        if parent is not None and not parent_excluded:
+            previous = element.getprevious()
+            text = previous.tail if previous is not None else parent.text
+            if text:
+                yield 'text', text
+        if event == 'start':
+            excluded.append(parent_excluded or element.tag in NON_TEXT_CONTAINERS)
+            yield 'start', element
+
+
+def extract_text(html_content, streaming=None):
+    """Returns the text of an HTML document, streaming it for large documents."""
+    if streaming is None:
+        streaming = len(html_content) > STREAMING_THRESHOLD
+    if not streaming:
+        return BeautifulSoup(html_content, 'lxml').get_text()
+    return ''.join(value for event, value in iter_html_events(html_content) if event == 'text')
+
+
+# Elements holding page furniture (navigation, banners, forms, widgets) rather than content,
+# and the ARIA roles and whole class/id names marking them. Names are matched whole: page
+# states and wrappers such as has-sidebar, nav-open or social-share-enabled hold content
+BOILERPLATE_TAGS = {'nav', 'aside', 'form', 'noscript', 'button', 'select', 'svg', 'iframe', 'menu', 'dialog'}
+BOILERPLATE_ROLES = {'navigation', 'banner', 'contentinfo', 'complementary', 'search', 'menu', 'menubar', 'dialog'}
+BOILERPLATE_NAMES = {
+    'nav', 'navbar', 'navigation', 'menu', 'footer', 'sidebar', 'breadcrumb', 'breadcrumbs', 'cookie', 'cookies',
+    'share', 'social', 'comment', 'comments', 'related', 'ad', 'ads', 'advert', 'banner',
+    'site-nav', 'main-nav', 'site-footer', 'page-footer', 'cookie-banner', 'cookie-notice', 'share-buttons',
+    'social-links', 'related-posts',
+}
+# The document and its body are never boilerplate, whatever their classes say
+PAGE_TAGS = {'html', 'body'}
+MAIN_CONTENT_TAGS = {'main', 'article'}
+
+# Main content shorter than this is classified along with the rest of the page's text
+MIN_MAIN_CONTENT_WORDS = 50
+# Text left after boilerplate is removed shorter than this is replaced by all the body's text
+MIN_FILTERED_WORDS = 20
+
+# Words as in the classifier's training texts: two or more letters, no digits
+WORD_PATTERN = re.compile(r'[^\W\d_]{2,}')
+
+
+def is_boilerplate(element, in_main):
+    if element.tag in PAGE_TAGS:
+        return False
+    if element.tag in BOILERPLATE_TAGS:
+        return True
+    # Page headers and footers; those of an article or the main content belong to it
+    if element.tag in ('header', 'footer') and not in_main:
+        return True
+    if (element.get('role') or '').lower() in BOILERPLATE_ROLES:
+        return True
+    names = f"{element.get('class') or ''} {element.get('id') or ''}".lower().split()
+    return any(name in BOILERPLATE_NAMES for name in names)
+
+
+def extract_main_text(html_content, max_tokens=1000):
+    """
+    Returns the text of an HTML document's main content prepared the way the classifier's
+    training texts (cleaned_website_text) were: lowercased words of two letters or more,
+    without digits, punctuation or English stop words, separated by single spaces. The
+    title and meta description come first, then the text of the <main> and <article>
+    elements (role="main" too) or, when they hold fewer than MIN_MAIN_CONTENT_WORDS words,
+    of the whole body. Navigation, page headers and footers, sidebars, forms, scripts and
+    their <noscript> fallbacks are left out, unless that leaves fewer than
+    MIN_FILTERED_WORDS words: then all the body's text is used.
+
+    At most ``max_tokens`` words are returned (all of them with 0), and parsing stops as
+    soon as that many are found, so large pages cost little more than small ones; for a
+    page without a main element, that is before any main content further down is seen.
+    """
+    from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+    def words(text):
+        return [word for word in WORD_PATTERN.findall(text.lower()) if word not in ENGLISH_STOP_WORDS]
+
+    heading = []
+    main_words = []
+    other_words = []
+    all_words = []  # Of the body, boilerplate included, in case filtering leaves almost nothing
+    has_main = False
+    # (skipped, in main content, tag) of each open element
+    stack = []
+    for event, value in iter_html_events(html_content, ends=True):
+        if event == 'start':
+            skipped, in_main, _ = stack[-1] if stack else (False, False, None)
+            if value.tag == 'meta' and (value.get('name') or '').lower() == 'description':
+                heading.extend(words(value.get('content') or ''))
+            elif not skipped:
+                if value.tag in MAIN_CONTENT_TAGS or (value.get('role') or '').lower() == 'main':
+                    in_main = has_main = True
+                elif is_boilerplate(value, in_main):
+                    skipped = True
+            stack.append((skipped, in_main, value.tag))
+        elif event == 'end':
+            stack.pop()
+        elif stack and stack[-1][2] == 'title':
+            if not stack[-1][0]:
+                heading.extend(words(value))
+        elif stack:
+            text_words = words(value)
+            if not max_tokens or len(all_words) < max_tokens:
+                all_words.extend(text_words)
+            skipped, in_main, _ = stack[-1]
+            if not skipped:
+                (main_words if in_main else other_words).extend(text_words)
+                if max_tokens and len(main_words if has_main else other_words) >= max_tokens:
+                    break
+
+    content = main_words if len(main_words) >= MIN_MAIN_CONTENT_WORDS else main_words + other_words
+    if len(content) < MIN_FILTERED_WORDS:
+        # Most likely a wrapper of the whole page was taken for boilerplate
+        content = all_words
+    tokens = heading + content
+    return ' '.join(tokens[:max_tokens] if max_tokens else tokens)
+
+
+class StreamingTextScanner:
+    """
+    Runs a set of patterns over text that arrives in pieces, keeping only a bounded window
+    of it in memory. Each match is attributed to the window its start falls in, and the
+    next window re-reads the last ``overlap`` characters, so the results equal findall()
+    over the whole text for any match shorter than ``overlap``, except that repeated
+    matches are only reported once.
+    """
+
+    def __init__(self, patterns, collectors=None, chunk_size=65536, overlap=4096, context=64):
+        self.patterns = patterns
+        # Optional per-pattern functions turning a match into the item to report
+        self.collectors = collectors or {}
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.context = context  # Characters kept before a window, for lookbehinds and collectors
+        self.matches = {pattern: {} for pattern in patterns}  # Used as ordered sets
+        self._resume = {pattern: 0 for pattern in patterns}
+        self._pieces = []
+        self._buffered = 0
+
+    def feed(self, text):
+        self._pieces.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self.chunk_size + self.overlap:
+            self._scan(final=False)
+
+    def close(self):
+        self._scan(final=True)
+        return {pattern: list(found) for pattern, found in self.matches.items()}
+
+    def _scan(self, final):
+        window = ''.join(self._pieces)
+        limit = len(window) if final else len(window) - self.overlap
+        for pattern in self.patterns:
+            position = self._resume[pattern]
+            found = self.matches[pattern]
+            collect = self.collectors.get(pattern)
+            for match in pattern.finditer(window, position):
+                if match.start() >= limit:
+                    break
+                found[collect(match) if collect else self._findall_item(pattern, match)] = None
+                position = match.end()
+            self._resume[pattern] = max(position, limit)
+
+        # Keep the unscanned tail plus some context in front of it
+        cut = max(0, limit - self.context)
+        window = window[cut:]
+        self._pieces = [window]
+        self._buffered = len(window)
+        for pattern in self.patterns:
+            self._resume[pattern] -= cut
+
+    @staticmethod
+    def _findall_item(pattern, match):
+        """Formats a match the way pattern.findall() would."""
+        if pattern.groups == 0:
+            return match.group(0)
+        if pattern.groups == 1:
+            return match.group(1) or ''
+        return match.groups('')
+
+
+class StreamingScraper(Scraper):
+    """
+    Scraper that never builds a document tree. The page is parsed with lxml's incremental
+    parser; text is scanned in bounded windows as it streams past and only the links are
+    kept, so peak memory stays flat regardless of the page size. Extractors return the same
+    results as Scraper.
+    """
+
+    def __init__(self, html_content, base_url=None):
+        self.html_content = html_content
+        self.base_url = base_url
+        self.blacklist = default_blacklist()
+        self._blacklist_verdicts = {}  # netloc -> whether it is blacklisted
+        self.truncated = []
+        self.timings = {}
+        self._anchor_hrefs = None
+        self._feed_link_hrefs = None
+        self._text_matches = None
+
+    def make_text_scanner(self, patterns):
+        # Address windows are cut from the scanned text, so enough of it must be kept around
+        return StreamingTextScanner(
+            patterns,
+            collectors={self.street_keyword_pattern: self.address_window},
+            context=self.address_window_size + 64,
+        )
+
+    def index_document(self):
+        if self._anchor_hrefs is not None:
+            return
+
+        scanner = self.make_text_scanner(self.text_patterns)
+        self._anchor_hrefs = []
+        self._feed_link_hrefs = []
+        for event, value in iter_html_events(self.html_content):
+            if event == 'text':
+                if self.text_patterns:
+                    scanner.feed(value)
+            elif isinstance(value.tag, str):
+                self.index_tag(value.tag, value)
+        self._text_matches = scanner.close()
+
+    def get_text(self):
+        """Returns the page text. This materializes the whole text; extractors do not use it."""
+        return extract_text(self.html_content, streaming=True)
+
+    def find_all_in_text(self, pattern):
+        self.index_document()
+        if pattern not in self._text_matches:
+            # Not wanted when the document was indexed: parse it again to scan for this one
+            scanner = self.make_text_scanner([pattern])
+            for event, value in iter_html_events(self.html_content):
+                if event == 'text':
+                    scanner.feed(value)
+            self._text_matches.update(scanner.close())
+        return self._text_matches[pattern]
+
+    def find_address_windows(self):
+        return self.find_all_in_text(self.street_keyword_pattern)
+
+
+def make_scraper(html_content, base_url=None, streaming=None):
+    """
+    Returns a Scraper for the page, or a StreamingScraper when streaming is requested or,
+    if no mode is given, when the page is larger than STREAMING_THRESHOLD.
+    """
+    if streaming is None:
+        streaming = len(html_content) > STREAMING_THRESHOLD
+    scraper_class = StreamingScraper if streaming else Scraper
+    return scraper_class(html_content, base_url)
+
+
+def scrape_page(html_content, base_url=None, streaming=None, fields=None):
+    """
+    Parses a page and runs the extractors for ``fields`` (all of them by default) on it.
+    Returns the extracted data with the seconds each step took under 'timings', and the
+    fields whose extractor ran out of time, if any, under 'truncated'.
+    """
+    start = time.perf_counter()
+    extractor = make_scraper(html_content, base_url, streaming=streaming)
+    parse_time = time.perf_counter() - start
+    parsed_data = extractor.extract_all(fields)
+    if extractor.truncated:
+        # Extractors that hit their time budget returned partial results
+        parsed_data['truncated'] = extractor.truncated
+    parsed_data['timings'] = {'parse': parse_time, **extractor.timings}
+    return parsed_data
+
+
+def _scrape_batch_page(job):
+    html_content, base_url, streaming, fields = job
+    try:
+        return base_url, scrape_page(html_content, base_url, streaming=streaming, fields=fields)
+    except Exception as e:
+        print(f"Error scraping {base_url}: {str(e)}")
+        return base_url, None
+
+
+def extract_many(pages, streaming=None, fields=None, processes=None):
+    """
+    Scrapes an iterable of (html_content, base_url) pairs and yields a (base_url, result)
+    pair for each page as soon as it is done, so not necessarily in input order. Pages
+    are spread over a pool of ``processes`` worker processes (one per core by default);
+    with processes=1 they are scraped one after another in this process. The result is
+    what scrape_page() returns, or None if the page could not be scraped.
+    """
+    fields = Scraper.check_fields(fields)
+    jobs = ((html_content, base_url, streaming, fields) for html_content, base_url in pages)
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    if processes == 1:
+        for job in jobs:
+            yield _scrape_batch_page(job)
+        return
+
+    with multiprocessing.Pool(processes) as pool:
+        # Pages differ a lot in size, so they are handed out one at a time
+        yield from pool.imap_unordered(_scrape_batch_page, jobs)
+
 
 def flatten_data(input_data):
     # Create a new dictionary to store the flattened data
@@ -219,10 +916,14 @@ def flatten_data(input_data):
     # Flatten RSS feeds
     flattened['rss_feeds'] = '??'.join(input_data.get('rss_feeds', []))
 
+    # Seconds per step, named after the fields they extracted, so kept apart from them
+    for step, seconds in input_data.get('timings', {}).items():
+        flattened[f'timing_{step}'] = str(seconds)
+
     # Handle any unlisted categories dynamically
     for key, value in input_data.items():
         # Skip the keys that have already been handled
-        if key in ['social_links', 'emails', 'phone_numbers', 'addresses', 'rss_feeds']:
+        if key in ['social_links', 'emails', 'phone_numbers', 'addresses', 'rss_feeds', 'timings']:
             continue
 
         # If the value is a list, flatten it
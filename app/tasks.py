@@ -1,38 +1,134 @@
+import os
+import time
 from celery import Celery
-from bs4 import BeautifulSoup
-from app.scrape import Scraper
-from app.classifier import WebsiteClassifier
-from app.domain import get_all_domain_info
+from app.scrape import scrape_page, extract_many, extract_text, extract_main_text
+from app.classifier import ModelNotBuiltError, WebsiteClassifier
+from app.batching import MicroBatcher
+from app.classification_cache import ClassificationCache
+from app.models import SiteRecord, db
+from app.domain import get_all_domain_info, get_bulk_domain_info
+from app.public_suffix import hostname_of, registrable_domain
 from celery.signals import task_success
 
 celery = Celery()
 
+# The model artifact is only loaded by the first classification, so importing this module
+# stays cheap for the web processes
 classifier = WebsiteClassifier()
-X_train, X_test, y_train, y_test = classifier.load_data('website_classification.csv')
-classifier.ensure_model_is_trained(X_train, y_train)
-classifier.evaluate_model(X_test, y_test)
+
+# With CLASSIFIER_BATCH_SIZE above 1, pages that this worker classifies concurrently (run it
+# with a thread pool, e.g. --pool threads) are predicted together, up to that many at a
+# time, waiting at most CLASSIFIER_BATCH_WAIT_MS for a batch to fill
+CLASSIFIER_BATCH_SIZE = int(os.getenv('CLASSIFIER_BATCH_SIZE', 1))
+CLASSIFIER_BATCH_WAIT_MS = float(os.getenv('CLASSIFIER_BATCH_WAIT_MS', 10))
+classification_batcher = MicroBatcher(classifier.classify_many, CLASSIFIER_BATCH_SIZE, CLASSIFIER_BATCH_WAIT_MS / 1000)
+
+# Text pages are classified from: 'main' is the normalized main content of the page, up to
+# CLASSIFIER_MAX_TOKENS words (0 for no limit); 'full' is all of its text, as parsed
+CLASSIFIER_TEXT = os.getenv('CLASSIFIER_TEXT', 'main')
+CLASSIFIER_MAX_TOKENS = int(os.getenv('CLASSIFIER_MAX_TOKENS', 1000))
+
+# Results of pages classified before, by their HTML and text, for the current model version
+classification_cache = ClassificationCache()
+
+
+def classification_cache_version(model_version):
+    """Version the cached results are stored under: they depend on the model and on how the page text is prepared."""
+    if CLASSIFIER_TEXT == 'main':
+        return f'{model_version}-main{CLASSIFIER_MAX_TOKENS}'
+    return f'{model_version}-{CLASSIFIER_TEXT}'
 
 
 @celery.task(bind=True, rate_limit='100/s')
-def social_queue_manager(self, html, url):
+def social_queue_manager(self, html, url, streaming=None, fields=None):
     try:
         print(f"Starting social_queue_manager task for URL: {url}")
-        extractor = Scraper(html, url)
-        parsed_data = extractor.extract_all()
+        # streaming=None picks streaming mode automatically for very large pages,
+        # fields=None runs every extractor
+        parsed_data = scrape_page(html, url, streaming=streaming, fields=fields)
         print(f"Finished social_queue_manager task for URL: {url}")
         return parsed_data
     except Exception as e:
         print(f"Error in social_queue_manager: {str(e)}")
         return None
 
+# Processes each batch task scrapes its pages with. Celery already runs tasks in parallel
+# across its worker pool, so by default a batch is scraped within its worker; raise this
+# for workers started with a single process (e.g. --pool=solo) on a multi-core machine.
+SCRAPER_BATCH_PROCESSES = int(os.getenv('SCRAPER_BATCH_PROCESSES', 1))
+
+@celery.task(bind=True, rate_limit='10/s')
+def social_batch_queue_manager(self, pages, streaming=None, fields=None):
+    """
+    Scrapes a batch of pages given as [html, url] pairs, saving a broker round-trip per
+    page. Progress is reported in the task state while the batch runs; the result is a
+    list of {'url': ..., 'result': ...} entries in the order the pages finished.
+    """
+    try:
+        print(f"Starting social_batch_queue_manager task for {len(pages)} pages")
+        results = []
+        last_update = time.monotonic()
+        for url, parsed_data in extract_many(pages, streaming=streaming, fields=fields, processes=SCRAPER_BATCH_PROCESSES):
+            results.append({'url': url, 'result': parsed_data})
+            if time.monotonic() - last_update >= 1:
+                self.update_state(state='PROGRESS', meta={'done': len(results), 'total': len(pages)})
+                last_update = time.monotonic()
+        print(f"Finished social_batch_queue_manager task for {len(pages)} pages")
+        return results
+    except Exception as e:
+        print(f"Error in social_batch_queue_manager: {str(e)}")
+        return None
+
+def without_text(entry):
+    return {key: value for key, value in entry.items() if key != 'text'}
+
 @celery.task(bind=True, rate_limit='100/s')
-def classifier_queue_manager(self, html):
+def classifier_queue_manager(self, html, streaming=None):
     try:
         print("Starting classifier_queue_manager task")
-        soup = BeautifulSoup(html, 'lxml')
-        predicted_category = classifier.classify_website(soup.get_text())
-        print(f"Classification result: {predicted_category}")
-        return {"predicted":predicted_category}
+        classifier.ensure_model_is_loaded()
+        version = classification_cache_version(classifier.version)
+        html_key = classification_cache.html_key(version, SiteRecord.calculate_html_hash(html))
+        cached = classification_cache.get(html_key)
+        text = None
+        if cached is None:
+            if CLASSIFIER_TEXT == 'main':
+                text = extract_main_text(html, max_tokens=CLASSIFIER_MAX_TOKENS)
+            else:
+                text = extract_text(html, streaming=streaming)
+            text_key = classification_cache.text_key(version, text)
+            cached = classification_cache.get(text_key)
+            if cached is not None:
+                classification_cache.set([html_key], {**without_text(cached), 'text_key': text_key})
+        elif 'text_key' in cached:
+            # The page isn't parsed again; its text, kept once under the text key, is only
+            # needed for the result to be usable for retraining
+            text_key = cached['text_key']
+            text_entry = classification_cache.get(text_key)
+            text = text_entry.get('text') if text_entry else None
+        if cached is not None:
+            predicted_category = cached['predicted']
+            # A correction of this task's result then also removes the entries it came from
+            classification_cache.remember(self.request.id, [html_key] + ([text_key] if text is not None else []))
+            print(f"Cached classification result: {predicted_category}")
+        else:
+            if CLASSIFIER_BATCH_SIZE > 1:
+                predicted_category = classification_batcher.submit(text).result()
+            else:
+                predicted_category = classifier.classify_website(text)
+            result = {'predicted': predicted_category, 'task_id': self.request.id}
+            classification_cache.set([text_key], {**result, 'text': text})
+            classification_cache.set([html_key], {**result, 'text_key': text_key})
+            print(f"Classification result: {predicted_category}")
+        if text is None:
+            return {"predicted": predicted_category}
+        # The text is kept apart when the result is saved (the API doesn't return it), so a
+        # correction of the result can be used to retrain the classifier
+        return {"predicted":predicted_category, "text": text}
+    except ModelNotBuiltError as e:
+        # An error result rather than None, so the client is told why there is no category
+        print(f"Error in classifier_queue_manager: {str(e)}")
+        return {"error": str(e)}
     except Exception as e:
         print(f"Error in classifier_queue_manager: {str(e)}")
         return None
@@ -48,3 +144,97 @@ def location_queue_manager(self, url):
         print(f"Error in location_queue_manager: {str(e)}")
         return None
 
+
+# Most URLs a bulk location analysis may be given
+LOCATION_BULK_MAX_URLS = int(os.getenv('LOCATION_BULK_MAX_URLS', 50000))
+# Site records saved per database transaction by location_bulk_queue_manager
+LOCATION_BULK_SAVE_CHUNK = 500
+
+@celery.task(bind=True, rate_limit='10/s')
+def location_bulk_queue_manager(self, urls):
+    """
+    Analyzes the location of many URLs, running each distinct lookup once (see
+    get_bulk_domain_info), and saves each URL's result under 'location' in the data of its
+    SiteRecord, creating the records that don't exist. Progress is reported in the task
+    state while the lookups run. The result only counts the URLs, registrable domains, host
+    names and addresses, and the records saved: every record of the batch points at this
+    task, so the results themselves are only kept in the records.
+    """
+    try:
+        print(f"Starting location_bulk_queue_manager task for {len(urls)} URLs")
+        last_update = time.monotonic()
+
+        def progress(done, total):
+            nonlocal last_update
+            if time.monotonic() - last_update >= 1:
+                self.update_state(state='PROGRESS', meta={'done': done, 'total': total})
+                last_update = time.monotonic()
+
+        results = get_bulk_domain_info(urls, progress=progress)
+        with get_task_app().app_context():
+            records = save_location_results(urls, results, self.request.id)
+        addresses = {data['IP Address'] for data in results.values() if 'dns' in data['timings'] and 'Error' not in data['IP Address']}
+        summary = {
+            'urls': len(urls),
+            'domains': len({registrable_domain(url) for url in urls}),
+            'hosts': len(results),
+            'addresses': len(addresses),
+            'records': records,
+        }
+        print(f"Finished location_bulk_queue_manager task: {summary}")
+        return summary
+    except Exception as e:
+        print(f"Error in location_bulk_queue_manager: {str(e)}")
+        return None
+
+
+def save_location_results(urls, results, task_id):
+    """Saves each URL's location result, by its host name, in its SiteRecord; returns how many records were saved."""
+    saved = 0
+    for start in range(0, len(urls), LOCATION_BULK_SAVE_CHUNK):
+        chunk = list(dict.fromkeys(urls[start:start + LOCATION_BULK_SAVE_CHUNK]))
+        records = {record.url: record for record in SiteRecord.query.filter(SiteRecord.url.in_(chunk))}
+        for url in chunk:
+            record = records.get(url)
+            if record is None:
+                record = SiteRecord(url=url, data={}, location_task_id=task_id)
+                db.session.add(record)
+            # A new dict, so that the JSON column is seen as changed
+            record.data = {**(record.data or {}), 'location': results[hostname_of(url)]}
+            saved += 1
+        db.session.commit()
+    return saved
+
+
+# Seconds between runs of retrain_classifier under celery beat; 0 turns them off
+CLASSIFIER_RETRAIN_INTERVAL = float(os.getenv('CLASSIFIER_RETRAIN_INTERVAL', 3600))
+if CLASSIFIER_RETRAIN_INTERVAL > 0:
+    celery.conf.beat_schedule = {
+        'retrain-classifier': {'task': 'app.tasks.retrain_classifier', 'schedule': CLASSIFIER_RETRAIN_INTERVAL},
+    }
+
+# Flask app giving the tasks that write to the database their session, created by the first of them
+task_app = None
+
+def get_task_app():
+    global task_app
+    if task_app is None:
+        from app import create_app
+        task_app = create_app()
+    return task_app
+
+@celery.task(bind=True)
+def retrain_classifier(self):
+    """Trains the classifier further on the corrections users made since the last run and publishes it."""
+    try:
+        print("Starting retrain_classifier task")
+        from app.retraining import retrain_from_corrections
+        with get_task_app().app_context():
+            # A classifier of its own: the one classifying pages keeps serving its model
+            # until it picks up the published version
+            summary = retrain_from_corrections(WebsiteClassifier())
+        print(f"Retraining result: {summary}")
+        return summary
+    except Exception as e:
+        print(f"Error in retrain_classifier: {str(e)}")
+        return None
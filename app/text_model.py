@@ -0,0 +1,167 @@
+import os
+import json
+import hashlib
+from collections import Counter
+import numpy as np
+
+# Vectorizer settings LinearTextModel reproduces; pipelines using others (custom callables,
+# file input) are only saved as a pickle
+SUPPORTED_VECTORIZER_PARAMS = {
+    'analyzer': ('word', 'char', 'char_wb'),
+    'input': ('content',),
+    'preprocessor': (None,),
+    'tokenizer': (None,),
+    'norm': ('l1', 'l2', None),
+}
+
+
+def term_hash(term):
+    """Stable 64-bit hash of a term (Python's own hash() differs between processes)."""
+    return int.from_bytes(hashlib.blake2b(term.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class LinearTextModel:
+    """
+    A fitted TF-IDF + linear classifier pipeline stored as plain arrays that are
+    memory-mapped read-only, so every process using the same model version shares one
+    physical copy through the page cache instead of unpickling a private one.
+
+    With a TF-IDF vectorizer, the vocabulary is stored as the sorted 64-bit hashes of its
+    terms, with the feature columns of the IDF weights and coefficients permuted to match,
+    so a page is vectorized by looking up its distinct tokens with one binary search over
+    the mapped array. A collision between two vocabulary hashes is detected when exporting;
+    one between an unseen token and a vocabulary term (odds about 1 in 10^13 per token for a
+    million-term vocabulary) would count the token as that term. A hashing vectorizer has
+    no state, so only the coefficients are stored. Either way, predictions equal the
+    pipeline's.
+    """
+
+    files = {
+        'tfidf': ('terms.npy', 'idf.npy', 'coef.npy', 'intercept.npy'),
+        'hashing': ('coef.npy', 'intercept.npy'),
+    }
+
+    def __init__(self, path):
+        with open(os.path.join(path, 'model.json'), encoding='utf-8') as model_file:
+            self.config = json.load(model_file)
+        # Exports from before hashing pipelines existed have no vectorizer type
+        self.vectorizer_type = self.config.get('vectorizer_type', 'tfidf')
+        arrays = {name: np.load(os.path.join(path, name), mmap_mode='r') for name in self.files[self.vectorizer_type]}
+        self.terms, self.idf = arrays.get('terms.npy'), arrays.get('idf.npy')
+        self.coef, self.intercept = arrays['coef.npy'], arrays['intercept.npy']
+        self.classes = np.array(self.config['classes'], dtype=object)
+        self.vectorizer = self.build_vectorizer(self.vectorizer_type, self.config['vectorizer'])
+        self.analyzer = self.vectorizer.build_analyzer()
+
+    @staticmethod
+    def build_vectorizer(vectorizer_type, params):
+        """Returns an unfitted vectorizer with the exported parameters."""
+        from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+
+        vectorizer_params = {key: value for key, value in params.items() if key != 'dtype'}
+        vectorizer_params['ngram_range'] = tuple(vectorizer_params['ngram_range'])
+        if vectorizer_type == 'hashing':
+            return HashingVectorizer(dtype=np.dtype(params['dtype']), **vectorizer_params)
+        return TfidfVectorizer(**vectorizer_params)
+
+    @classmethod
+    def supports(cls, pipeline):
+        """
+        Returns whether the pipeline is a TF-IDF or hashing vectorizer followed by a linear
+        classifier this class can reproduce.
+        """
+        from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+
+        if len(pipeline.steps) != 2:
+            return False
+        vectorizer, model = pipeline.steps[0][1], pipeline.steps[1][1]
+        # Linear classifiers predict the class with the highest decision function, which is
+        # what predict() computes from coef_ and intercept_
+        if type(vectorizer) not in (TfidfVectorizer, HashingVectorizer) or not all(
+                hasattr(model, name) for name in ('coef_', 'intercept_', 'classes_', 'decision_function')):
+            return False
+        params = vectorizer.get_params()
+        return all(params[key] in allowed for key, allowed in SUPPORTED_VECTORIZER_PARAMS.items())
+
+    @staticmethod
+    def vectorizer_type_of(vectorizer):
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        return 'hashing' if isinstance(vectorizer, HashingVectorizer) else 'tfidf'
+
+    @classmethod
+    def export(cls, pipeline, path):
+        """Writes a fitted pipeline to ``path`` in this layout."""
+        vectorizer, model = pipeline.steps[0][1], pipeline.steps[1][1]
+        vectorizer_type = cls.vectorizer_type_of(vectorizer)
+        params = vectorizer.get_params()
+        params.pop('vocabulary', None)
+        params['dtype'] = np.dtype(params['dtype']).name
+        config = {'vectorizer_type': vectorizer_type, 'vectorizer': params, 'classes': model.classes_.tolist()}
+
+        os.makedirs(path)
+        if vectorizer_type == 'hashing':
+            np.save(os.path.join(path, 'coef.npy'), np.ascontiguousarray(model.coef_.T))
+        else:
+            cls.export_vocabulary(vectorizer, model, path)
+        np.save(os.path.join(path, 'intercept.npy'), np.asarray(model.intercept_, dtype=np.float64))
+        with open(os.path.join(path, 'model.json'), 'w', encoding='utf-8') as model_file:
+            json.dump(config, model_file, indent=2, default=list)
+
+    @staticmethod
+    def export_vocabulary(vectorizer, model, path):
+        terms = list(vectorizer.vocabulary_)
+        hashes = np.fromiter((term_hash(term) for term in terms), dtype=np.uint64, count=len(terms))
+        columns = np.fromiter((vectorizer.vocabulary_[term] for term in terms), dtype=np.int64, count=len(terms))
+        order = np.argsort(hashes)
+        hashes, columns = hashes[order], columns[order]
+        if len(hashes) > 1 and not np.all(np.diff(hashes)):
+            raise ValueError('Two vocabulary terms have the same hash')
+
+        np.save(os.path.join(path, 'terms.npy'), hashes)
+        idf = vectorizer.idf_[columns] if vectorizer.use_idf else np.ones(len(columns))
+        np.save(os.path.join(path, 'idf.npy'), idf)
+        # One row per feature, so the rows of a page's features are read together
+        np.save(os.path.join(path, 'coef.npy'), np.ascontiguousarray(model.coef_[:, columns].T))
+
+    def vectorize(self, text):
+        """Returns the feature positions of a text's known terms and their normalized TF-IDF weights."""
+        counts = Counter(self.analyzer(text))
+        if not counts:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        hashes = np.fromiter((term_hash(term) for term in counts), dtype=np.uint64, count=len(counts))
+        positions = np.minimum(np.searchsorted(self.terms, hashes), len(self.terms) - 1)
+        known = self.terms[positions] == hashes
+        positions = positions[known]
+        weights = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))[known]
+
+        config = self.config['vectorizer']
+        if config['binary']:
+            weights = np.ones_like(weights)
+        elif config['sublinear_tf']:
+            weights = 1 + np.log(weights)
+        weights = weights * self.idf[positions]
+        if config['norm'] == 'l2':
+            norm = np.sqrt(np.dot(weights, weights))
+        elif config['norm'] == 'l1':
+            norm = np.abs(weights).sum()
+        else:
+            norm = 0
+        if norm:
+            weights = weights / norm
+        return positions, weights
+
+    def decision_function(self, texts):
+        if self.vectorizer_type == 'hashing':
+            return np.asarray(self.vectorizer.transform(texts) @ self.coef) + self.intercept
+        scores = np.empty((len(texts), self.coef.shape[1]))
+        for row, text in enumerate(texts):
+            positions, weights = self.vectorize(text)
+            scores[row] = weights @ self.coef[positions] + self.intercept
+        return scores
+
+    def predict(self, texts):
+        scores = self.decision_function(texts)
+        if scores.shape[1] == 1:
+            return self.classes[(scores[:, 0] > 0).astype(int)]
+        return self.classes[scores.argmax(axis=1)]
@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import requests
+from app.http_client import OutboundClient
+
+
+class WikipediaError(Exception):
+    """Wikipedia gave no usable answer."""
+
+
+class SummaryCache:
+    """
+    Keeps Wikipedia summaries by search term in a SQLite file, so they survive restarts and
+    are shared by the worker processes of a host. Entries expire ``ttl`` seconds after they
+    were stored; beyond ``max_entries`` entries, the least recently used ones are evicted
+    (0 disables the cache). Searches that found no article are kept too, as None.
+    """
+
+    def __init__(self, path=None, ttl=None, max_entries=None):
+        self.path = path or os.getenv('WIKIPEDIA_CACHE_PATH', 'wikipedia_cache.sqlite3')
+        self.ttl = int(os.getenv('WIKIPEDIA_CACHE_TTL', 7 * 86400)) if ttl is None else ttl
+        if max_entries is None:
+            max_entries = int(os.getenv('WIKIPEDIA_CACHE_SIZE', 100000))
+        self.max_entries = max_entries
+        self._connection = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._writes = 0  # Since the size was last checked
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_entries > 0
+
+    def connection(self):
+        # Opened on first use in each process: SQLite connections must not cross a fork
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS summaries (term TEXT PRIMARY KEY, summary TEXT, '
+                               'expires REAL NOT NULL, used REAL NOT NULL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS summaries_used ON summaries (used)')
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    def get(self, term):
+        """Returns (True, summary) for a cached term, whose summary may be None, or (False, None)."""
+        if not self.enabled:
+            return False, None
+        now = time.time()
+        try:
+            with self._lock:
+                connection = self.connection()
+                row = connection.execute('SELECT summary FROM summaries WHERE term = ? AND expires > ?',
+                                         (term, now)).fetchone()
+                if row is not None:
+                    connection.execute('UPDATE summaries SET used = ? WHERE term = ?', (now, term))
+        except sqlite3.Error as e:
+            print(f"Wikipedia cache unavailable: {str(e)}")
+            row = None
+        if row is None:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, json.loads(row[0])
+
+    def set(self, term, summary):
+        if not self.enabled:
+            return
+        now = time.time()
+        try:
+            with self._lock:
+                connection = self.connection()
+                connection.execute('INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?)',
+                                   (term, json.dumps(summary), now + self.ttl, now))
+                self._writes += 1
+                # Counting the rows scans the index, so the size is only checked every so often
+                if self._writes >= max(1, self.max_entries // 100):
+                    self._writes = 0
+                    self._evict(connection, now)
+        except sqlite3.Error as e:
+            print(f"Wikipedia cache unavailable: {str(e)}")
+
+    def _evict(self, connection, now):
+        connection.execute('DELETE FROM summaries WHERE expires <= ?', (now,))
+        excess = connection.execute('SELECT COUNT(*) FROM summaries').fetchone()[0] - self.max_entries
+        if excess > 0:
+            connection.execute('DELETE FROM summaries WHERE term IN '
+                               '(SELECT term FROM summaries ORDER BY used LIMIT ?)', (excess,))
+
+    def __len__(self):
+        with self._lock:
+            return self.connection().execute('SELECT COUNT(*) FROM summaries').fetchone()[0]
+
+
+class WikipediaClient:
+    """
+    Finds the Wikipedia article best matching a search term and returns the plain text of
+    its introduction, at most ``max_chars`` characters of it, with a single request to the
+    MediaWiki API at ``api_url`` (a search used as the generator of the pages whose
+    extracts are returned). Disambiguation pages are passed over for the next result.
+    Summaries are cached by search term in ``cache``; requests are made by ``http``, an
+    OutboundClient.
+    """
+
+    def __init__(self, api_url=None, max_chars=None, timeout=None, cache=None, results=3, http=None):
+        self.api_url = api_url or os.getenv('WIKIPEDIA_API_URL', 'https://en.wikipedia.org/w/api.php')
+        self.max_chars = int(os.getenv('WIKIPEDIA_MAX_CHARS', 4000)) if max_chars is None else max_chars
+        self.timeout = float(os.getenv('WIKIPEDIA_TIMEOUT', 5)) if timeout is None else timeout
+        self.cache = cache if cache is not None else SummaryCache()
+        self.http = http if http is not None else OutboundClient()
+        self.results = results  # Search results looked at, in case the first ones are disambiguations
+        self.user_agent = os.getenv('WIKIPEDIA_USER_AGENT', 'scraper-extension-backend (location analysis)')
+
+    def summary(self, term):
+        """Returns the summary of the article found for the term, or None when there is none."""
+        term = ' '.join(term.lower().split())
+        found, summary = self.cache.get(term)
+        if found:
+            return summary
+        summary = self.fetch(term)
+        self.cache.set(term, summary)
+        return summary
+
+    def fetch(self, term):
+        params = {
+            'action': 'query',
+            'format': 'json',
+            'formatversion': 2,
+            'generator': 'search',
+            'gsrsearch': term,
+            'gsrlimit': self.results,
+            'prop': 'extracts|pageprops',
+            'exintro': 1,
+            'explaintext': 1,
+            'exlimit': self.results,
+            'ppprop': 'disambiguation',
+            'redirects': 1,
+        }
+        try:
+            response = self.http.get('wikipedia', self.api_url, params=params, headers={'User-Agent': self.user_agent},
+                                     timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise WikipediaError(f"Wikipedia request failed: {str(e)}")
+        if 'error' in data:
+            raise WikipediaError(f"Wikipedia request failed: {data['error'].get('info', data['error'])}")
+        # Pages come in no particular order; 'index' is their rank in the search
+        pages = sorted(data.get('query', {}).get('pages', []), key=lambda page: page.get('index', 0))
+        for page in pages:
+            if 'disambiguation' not in page.get('pageprops', {}) and page.get('extract'):
+                return page['extract'][:self.max_chars]
+        return None
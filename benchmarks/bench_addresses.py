@@ -0,0 +1,56 @@
+"""
+Address extraction cost as text grows, on text built to make the pre-optimization
+patterns backtrack (long runs of house numbers and street keywords with no postal code),
+and on the page corpus.
+
+    python -m benchmarks.bench_addresses [--corpus DIR] [--legacy-limit CHARS]
+"""
+import argparse
+import time
+
+from app.scrape import Scraper
+from benchmarks.corpus import load_corpus
+from benchmarks.legacy import LegacyScraper
+
+
+def backtracking_text(blocks):
+    return ' '.join(f'{i} main street, apt' for i in range(blocks))
+
+
+def time_addresses(scraper):
+    if isinstance(scraper, LegacyScraper):
+        scraper.soup.get_text()
+    else:
+        scraper.index_document()
+    start = time.perf_counter()
+    addresses = scraper.extract_addresses()
+    return time.perf_counter() - start, set(addresses)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--corpus', help='directory of saved *.html pages (default: generated pages)')
+    parser.add_argument('--legacy-limit', type=int, default=5000,
+                        help='largest backtracking text to run the legacy extractor on')
+    args = parser.parse_args()
+
+    print('Backtracking text (one line)')
+    print(f"{'chars':>10}{'legacy':>10}{'current':>10}")
+    for blocks in [50, 100, 200, 1000, 10_000, 100_000]:
+        html = f'<p>{backtracking_text(blocks)}</p>'
+        chars = len(html)
+        legacy = f'{time_addresses(LegacyScraper(html))[0]:>9.3f}s' if chars <= args.legacy_limit else f"{'skipped':>10}"
+        current_time, _ = time_addresses(Scraper(html))
+        print(f'{chars:>10}{legacy}{current_time:>9.3f}s')
+
+    print('\nCorpus')
+    print(f"{'page':<24}{'legacy':>10}{'current':>10}{'legacy n':>10}{'current n':>11}{'common':>8}")
+    for name, html, url in load_corpus(args.corpus):
+        legacy_time, legacy_addresses = time_addresses(LegacyScraper(html, url))
+        current_time, current_addresses = time_addresses(Scraper(html, url))
+        print(f'{name:<24}{legacy_time:>9.3f}s{current_time:>9.3f}s{len(legacy_addresses):>10}'
+              f'{len(current_addresses):>11}{len(legacy_addresses & current_addresses):>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Throughput of scraping a batch of pages one at a time vs with extract_many() over process
+pools of growing size, checking that every page gets the same result.
+
+    python -m benchmarks.bench_batch [--pages N] [--size BYTES] [--processes N ...]
+"""
+import argparse
+import os
+import time
+
+from app.scrape import scrape_page, extract_many
+from benchmarks.bench_scrape import normalize
+from benchmarks.corpus import generate_page
+
+
+def without_timings(result):
+    return normalize({key: value for key, value in result.items() if key != 'timings'})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=48)
+    parser.add_argument('--size', type=int, default=200_000, help='approximate size of each page')
+    parser.add_argument('--processes', type=int, nargs='+')
+    args = parser.parse_args()
+    cores = os.cpu_count() or 1
+    process_counts = args.processes or sorted({1, 2, cores})
+
+    pages = []
+    for seed in range(args.pages):
+        html, url = generate_page(args.size, seed=seed)
+        pages.append((html, f'{url}page-{seed}'))
+
+    start = time.perf_counter()
+    expected = {url: without_timings(scrape_page(html, url)) for html, url in pages}
+    loop_time = time.perf_counter() - start
+    print(f'{len(pages)} pages of ~{args.size // 1000}kB on {cores} cores')
+    print(f"{'mode':<20}{'time':>9}{'pages/s':>9}  same")
+    print(f"{'loop':<20}{loop_time:>8.2f}s{len(pages) / loop_time:>9.1f}  yes")
+    for processes in process_counts:
+        start = time.perf_counter()
+        results = {url: without_timings(result) for url, result in extract_many(pages, processes=processes)}
+        elapsed = time.perf_counter() - start
+        label = f'extract_many({processes})'
+        print(f"{label:<20}{elapsed:>8.2f}s{len(pages) / elapsed:>9.1f}  {'yes' if results == expected else 'NO'}")
+
+
+if __name__ == '__main__':
+    main()
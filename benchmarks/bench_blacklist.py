@@ -0,0 +1,85 @@
+"""
+Cost of blacklist checks as the blacklist grows, on a link-dense page: the per-link
+is_blacklisted() check, and extract_all() end to end, with the compiled blacklist vs the
+pre-optimization check (urlparse and one re.search per pattern, per URL).
+
+    python -m benchmarks.bench_blacklist [--entries N ...] [--links N] [--repeat N]
+"""
+import argparse
+import random
+import re
+import time
+from urllib.parse import urlparse
+
+from app.scrape import Blacklist, Scraper
+from benchmarks.bench_scrape import normalize
+from benchmarks.bench_social import BLACKLIST, link_dense_page
+
+
+class PatternLoopScraper(Scraper):
+    """The current Scraper with the pre-optimization blacklist check."""
+
+    def set_blacklist(self, blacklist):
+        self.blacklist = set(blacklist)
+
+    def is_blacklisted(self, url):
+        parsed_url = urlparse(url)
+        return any(re.search(pattern, parsed_url.netloc) for pattern in self.blacklist)
+
+
+def tracker_blacklist(entries, seed=0):
+    """BLACKLIST padded with made-up ad and tracker domains to ``entries`` patterns."""
+    rng = random.Random(seed)
+    patterns = list(BLACKLIST)
+    while len(patterns) < entries:
+        name = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(4, 12)))
+        patterns.append(rng.choice([f'{name}\\.com', f'{name}\\.net', f'ads\\.{name}\\.io', name]))
+    return patterns
+
+
+def best_time(function, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--entries', type=int, nargs='+', default=[10, 100, 300])
+    parser.add_argument('--links', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    html = link_dense_page(args.links)
+    url = 'https://www.example-news.com/'
+    old = PatternLoopScraper(html, url)
+    new = Scraper(html, url)
+    hrefs = old.get_anchor_hrefs()
+    print(f'Page with {len(hrefs)} links')
+    print(f"{'entries':>8}{'check old':>11}{'check new':>11}{'all old':>9}{'all new':>9}  same")
+    for entries in args.entries:
+        patterns = tracker_blacklist(entries)
+        blacklist = Blacklist(patterns)  # Compiled once, as a worker would
+
+        def check(scraper, blacklist):
+            scraper.set_blacklist(blacklist)  # Also forgets memoized verdicts
+            return [scraper.is_blacklisted(href) for href in hrefs]
+
+        def extract(scraper, blacklist):
+            scraper.set_blacklist(blacklist)
+            return normalize(scraper.extract_all())
+
+        old_check, old_verdicts = best_time(lambda: check(old, patterns), args.repeat)
+        new_check, new_verdicts = best_time(lambda: check(new, blacklist), args.repeat)
+        old_all, old_result = best_time(lambda: extract(old, patterns), args.repeat)
+        new_all, new_result = best_time(lambda: extract(new, blacklist), args.repeat)
+        same = old_verdicts == new_verdicts and old_result == new_result
+        print(f"{entries:>8}{old_check:>10.4f}s{new_check:>10.4f}s{old_all:>8.3f}s{new_all:>8.3f}s  {'yes' if same else 'NO'}")
+
+
+if __name__ == '__main__':
+    main()
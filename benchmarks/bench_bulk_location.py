@@ -0,0 +1,124 @@
+"""
+Location analysis of a list of URLs: get_all_domain_info for each URL on a thread pool
+(as queuing one location task per URL did) vs get_bulk_domain_info, which runs WHOIS
+once per registrable domain, DNS once per host name and geolocation once per address,
+against local WHOIS, DNS and ipinfo-style stubs. Counts the requests each stub received.
+
+    python -m benchmarks.bench_bulk_location [--urls N] [--sites N] [--addresses N] [--concurrency N]
+
+The URLs are on a few host names of each site, and the host names share a smaller set of
+addresses, as sites on shared hosting and CDNs do. The domain lookup cache and the
+extraction of places from Wikipedia are turned off; each case gets a new caching resolver.
+"""
+import argparse
+import contextlib
+import io
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer
+
+from benchmarks import bench_dns
+from benchmarks.bench_domain_lookups import GeoHandler, ThreadingTCPServer, WhoisHandler, delays, start
+
+HOSTS = ['', 'www.', 'blog.', 'shop.']
+counts = {'whois': 0, 'geo': 0}
+lock = threading.Lock()
+
+
+class CountingWhoisHandler(WhoisHandler):
+    def handle(self):
+        with lock:
+            counts['whois'] += 1
+        super().handle()
+
+
+class CountingGeoHandler(GeoHandler):
+    def do_GET(self):
+        with lock:
+            counts['geo'] += 1
+        super().do_GET()
+
+
+# Backlogs long enough for the connections of every lookup thread; the default of 5 drops
+# some of them, which are then retried a second later
+class WhoisServer(ThreadingTCPServer):
+    request_queue_size = 128
+
+
+class GeoServer(ThreadingHTTPServer):
+    request_queue_size = 128
+    daemon_threads = True
+
+
+def synthetic_urls(count, sites, addresses, seed=1):
+    """Returns URLs on the sites' hosts, and adds the hosts to the DNS stub's zone."""
+    rng = random.Random(seed)
+    urls = []
+    for _ in range(count):
+        site = rng.randrange(sites)
+        host = f"{rng.choice(HOSTS)}site{site}.co.ke"
+        if host not in bench_dns.ZONE:
+            bench_dns.ZONE[host] = ([f'192.0.2.{rng.randrange(addresses) + 1}'], [], 300)
+        urls.append(f"https://{host}/page/{rng.randrange(1000)}")
+    return urls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--urls', type=int, default=2000)
+    parser.add_argument('--sites', type=int, default=200)
+    parser.add_argument('--addresses', type=int, default=40, help='distinct addresses the host names resolve to')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--whois-ms', type=float, default=50, help='delay of the WHOIS stub')
+    parser.add_argument('--geo-ms', type=float, default=20, help='delay of the geolocation stub')
+    parser.add_argument('--dns-ms', type=float, default=5, help='delay of the DNS stub')
+    args = parser.parse_args()
+
+    delays['whois'], delays['geo'] = args.whois_ms / 1000, args.geo_ms / 1000
+    bench_dns.stub['delay'] = args.dns_ms / 1000
+    whois_port = start(WhoisServer(('127.0.0.1', 0), CountingWhoisHandler))
+    geo_port = start(GeoServer(('127.0.0.1', 0), CountingGeoHandler))
+    dns_server = bench_dns.ThreadingUDPServer(('127.0.0.1', 0), bench_dns.StubHandler)
+    dns_port = start(dns_server)
+    import app.domain as domain
+    from app.domain import get_all_domain_info, get_bulk_domain_info
+    from app.domain_cache import DomainCache
+    from app.public_suffix import hostname_of, registrable_domain
+    from app.resolver import DNSResolver
+    domain.domain_cache = DomainCache(ttls={'whois': 0, 'dns': 0, 'geo': 0})
+    domain.EXTRACT_LOCATIONS = False
+    domain.WHOIS_SERVER = f'127.0.0.1:{whois_port}'
+    domain.IPINFO_URL = f'http://127.0.0.1:{geo_port}/{{ip}}/json'
+
+    urls = synthetic_urls(args.urls, args.sites, args.addresses)
+    hosts = {hostname_of(url) for url in urls}
+    print(f"{len(urls)} URLs, {len({registrable_domain(url) for url in urls})} domains, {len(hosts)} hosts, "
+          f"{len({bench_dns.ZONE[host][0][0] for host in hosts})} addresses; concurrency {args.concurrency}")
+    print(f"stubs: whois {args.whois_ms:.0f} ms, geo {args.geo_ms:.0f} ms, dns {args.dns_ms:.0f} ms\n")
+    print(f"{'case':<30}{'s':>8}{'whois':>8}{'dns':>8}{'geo':>8}{'errors':>8}")
+
+    def per_url():
+        with ThreadPoolExecutor(args.concurrency) as executor:
+            return dict(zip(urls, executor.map(get_all_domain_info, urls)))
+
+    def bulk():
+        results = get_bulk_domain_info(urls, concurrency=args.concurrency)
+        return {url: results[hostname_of(url)] for url in urls}
+
+    for name, analyze in (('get_all_domain_info per URL', per_url), ('get_bulk_domain_info', bulk)):
+        domain.dns_resolver = DNSResolver(nameservers=[('127.0.0.1', dns_port)], hosts={})
+        counts['whois'] = counts['geo'] = bench_dns.stub['queries'] = 0
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = analyze()
+        seconds = time.perf_counter() - started
+        errors = sum(any(isinstance(value, str) and ('Error' in value or 'Timed out' in value) for value in data.values())
+                     for data in results.values())
+        print(f"{name:<30}{seconds:>8.2f}{counts['whois']:>8}{bench_dns.stub['queries']:>8}{counts['geo']:>8}{errors:>8}")
+    print("\n(dns counts queries: one A and one AAAA per name resolved)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Classification of repeated pages with the result cache: the classification endpoint and
+task on the corpus pages without the cache, on first submission (cache miss), on
+re-submission of the same HTML (answered by the endpoint without enqueueing a task), and
+the task on the same text in different markup (answered without classifying). Also
+checks that the cache stays within its size limit and that a new model version misses.
+
+    python -m benchmarks.bench_classification_cache [--redis URL] [--repeat N]
+
+Needs a Redis server (default: REDIS_URL, or redis://localhost:6379/0); the cache entries
+are written under a throwaway model version and removed afterwards. Run it from the
+directory the app runs in, with a model artifact already built (python build_model.py).
+Tasks run eagerly in-process, as in the benchmark suite.
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import time
+import uuid
+
+from benchmarks.corpus import CORPUS_DIR, load_corpus
+from benchmarks.suite import endpoint_app
+
+
+def timed(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--redis', default=os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = endpoint_app()
+        from app.classification_cache import ClassificationCache
+        from app.tasks import classifier, classifier_queue_manager
+        import app.tasks as tasks
+        import app.api.v1.routes as routes
+        classifier.ensure_model_is_loaded()
+    # A version of our own, so entries of the running app are neither read nor evicted
+    version = f'bench-{uuid.uuid4().hex[:8]}'
+    classifier.pinned_version = classifier.version = version
+    classifier.reload_interval = float('inf')
+    cache = ClassificationCache(url=args.redis, max_entries=100000)
+    cache.index_key = f'classification:{version}:index'
+    tasks.classification_cache = routes.classification_cache = cache
+
+    def post(html, url):
+        with app.test_request_context('/api/v1/analysis/classification', method='POST', json={'html': html, 'url': url}):
+            response = app.full_dispatch_request()
+        if response.status_code not in (200, 202):
+            raise RuntimeError(f'returned {response.status_code}: {response.get_data(as_text=True)}')
+        return response.status_code
+
+    def flush():
+        keys = list(cache.client.scan_iter(f'classification:{version}:*'))
+        if keys:
+            cache.client.delete(*keys)
+
+    print(f"{'page':<22}{'no cache':>10}{'miss':>10}{'same html':>11}{'same text':>11}   (ms, endpoint incl. eager task)")
+    try:
+        for name, html, url in load_corpus(CORPUS_DIR):
+            with contextlib.redirect_stdout(io.StringIO()):
+                cache.max_entries = 0
+                uncached = timed(lambda: post(html, url), args.repeat)
+                cache.max_entries = 100000
+
+                def miss():
+                    flush()
+                    post(html, url)
+                missed = timed(miss, args.repeat)
+                post(html, url)
+                statuses = set()
+                same_html = timed(lambda: statuses.add(post(html, url)), args.repeat)
+                # Other markup around the same text: the task parses it, but doesn't classify it
+                other_markup = html.replace('<div', '<section').replace('</div>', '</section>')
+                variants = iter(range(args.repeat))
+                same_text = timed(lambda: classifier_queue_manager.apply(args=[f'{other_markup}<!-- {next(variants)} -->']), args.repeat)
+            print(f"{name:<22}{uncached * 1000:>10.2f}{missed * 1000:>10.2f}{same_html * 1000:>11.2f}{same_text * 1000:>11.2f}"
+                  f"{'' if statuses == {200} else '   (same html was enqueued)'}")
+        print(f"hits {cache.hits}, misses {cache.misses}")
+
+        flush()
+        cache.max_entries = 50
+        with contextlib.redirect_stdout(io.StringIO()):
+            for number in range(200):
+                classifier_queue_manager.apply(args=[f'<p>page {number} about football scores and league tables</p>'])
+        stored = len(list(cache.client.scan_iter(f'classification:{version}:*:*')))
+        print(f"size limit 50: {stored} entries stored after classifying 200 pages")
+
+        hits = cache.hits
+        classifier.pinned_version = classifier.version = f'{version}-next'
+        with contextlib.redirect_stdout(io.StringIO()):
+            classifier_queue_manager.apply(args=['<p>page 199 about football scores and league tables</p>'])
+        print(f"new model version: {'hit (stale result)' if cache.hits > hits else 'miss'}")
+    finally:
+        flush()
+        cache.client.delete(cache.index_key)
+        keys = list(cache.client.scan_iter(f'classification:{version}-next:*'))
+        if keys:
+            cache.client.delete(*keys)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Classification throughput against batch size: classify_many() on batches of growing size
+vs one classify_website() call per page, then the micro-batcher under concurrent
+submitters (as in a worker running classification tasks on a thread pool) vs each thread
+calling classify_website() itself.
+
+    python -m benchmarks.bench_classify_batch [--data CSV] [--pages N] [--threads N]
+
+Run it from the directory the app runs in, with a model artifact already built
+(python build_model.py). Page texts are taken from the training data.
+"""
+import argparse
+import statistics
+import threading
+import time
+
+import pandas as pd
+
+from app.batching import MicroBatcher
+from app.classifier import WebsiteClassifier
+
+
+def sequential_throughput(classifier, texts, batch_size):
+    start = time.perf_counter()
+    predictions = []
+    for position in range(0, len(texts), batch_size):
+        batch = texts[position:position + batch_size]
+        if batch_size == 1:
+            predictions.append(classifier.classify_website(batch[0]))
+        else:
+            predictions.extend(classifier.classify_many(batch))
+    return len(texts) / (time.perf_counter() - start), predictions
+
+
+def concurrent_run(texts, threads, classify):
+    """Splits the texts over ``threads`` threads that each classify theirs one at a time."""
+    latencies = []
+    results = {}
+
+    def worker(offset):
+        for index in range(offset, len(texts), threads):
+            start = time.perf_counter()
+            results[index] = classify(texts[index])
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(offset,)) for offset in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return len(texts) / elapsed, statistics.median(latencies), [results[index] for index in range(len(texts))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', default='website_classification.csv')
+    parser.add_argument('--pages', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=32)
+    args = parser.parse_args()
+
+    texts = pd.read_csv(args.data)['cleaned_website_text'].fillna('').tolist()
+    texts = (texts * (args.pages // len(texts) + 1))[:args.pages]
+    classifier = WebsiteClassifier()
+    classifier.ensure_model_is_loaded()
+
+    print(f'{len(texts)} pages, sequential')
+    print(f"{'batch size':>10}{'pages/s':>10}{'speedup':>9}  same")
+    single, expected = sequential_throughput(classifier, texts, 1)
+    print(f"{1:>10}{single:>10.0f}{1:>8.1f}x  yes")
+    for batch_size in [2, 4, 8, 16, 32, 64, 128, 256]:
+        throughput, predictions = sequential_throughput(classifier, texts, batch_size)
+        print(f"{batch_size:>10}{throughput:>10.0f}{throughput / single:>8.1f}x  {'yes' if predictions == expected else 'NO'}")
+
+    print(f'\n{args.threads} concurrent submitters')
+    print(f"{'mode':<24}{'pages/s':>10}{'p50 ms':>9}{'avg batch':>11}  same")
+    throughput, latency, predictions = concurrent_run(texts, args.threads, classifier.classify_website)
+    print(f"{'direct':<24}{throughput:>10.0f}{latency * 1000:>9.2f}{1:>11.1f}  {'yes' if predictions == expected else 'NO'}")
+    for max_items, max_wait_ms in [(8, 2), (32, 5), (32, 10), (128, 10)]:
+        batcher = MicroBatcher(classifier.classify_many, max_items, max_wait_ms / 1000)
+        throughput, latency, predictions = concurrent_run(texts, args.threads, lambda text: batcher.submit(text).result())
+        label = f'batched {max_items} / {max_wait_ms}ms'
+        print(f"{label:<24}{throughput:>10.0f}{latency * 1000:>9.2f}{batcher.item_count / batcher.batch_count:>11.1f}"
+              f"  {'yes' if predictions == expected else 'NO'}")
+
+
+if __name__ == '__main__':
+    main()
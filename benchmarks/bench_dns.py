@@ -0,0 +1,142 @@
+"""
+The caching DNS resolver against a local stub DNS server that answers after a set delay:
+lookups without the cache vs from it, many threads looking up one name at once (one
+query per record type, not one per thread), repeated lookups of a name that doesn't
+exist (answered from the negative cache) and of a name whose records expire after a
+second (queried again once they have). Counts the queries the stub received.
+
+    python -m benchmarks.bench_dns [--delay-ms N] [--threads N] [--repeat N]
+"""
+import argparse
+import ipaddress
+import socketserver
+import statistics
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.resolver import AAAA, A, DNSResolver, HostNotFound, skip_name
+
+# Names the stub knows: IPv4 addresses, IPv6 addresses, TTL
+ZONE = {
+    'www.example.test': (['192.0.2.10', '192.0.2.11'], ['2001:db8::10'], 300),
+    'short.example.test': (['192.0.2.20'], [], 1),
+}
+NEGATIVE_TTL = 60
+
+stub = {'delay': 0.0, 'queries': 0}
+
+
+def answer(query):
+    """Returns the stub's response to a query message."""
+    query_id = struct.unpack_from('!H', query)[0]
+    end = skip_name(query, 12)
+    labels, offset = [], 12
+    while query[offset]:
+        labels.append(query[offset + 1:offset + 1 + query[offset]].decode('ascii'))
+        offset += 1 + query[offset]
+    name = '.'.join(labels).lower()
+    record_type = struct.unpack_from('!H', query, end)[0]
+    question = query[12:end + 4]
+
+    records = []
+    if name in ZONE:
+        ipv4, ipv6, ttl = ZONE[name]
+        for address in ipv4 if record_type == A else ipv6 if record_type == AAAA else []:
+            data = ipaddress.ip_address(address).packed
+            records.append(struct.pack('!HHHIH', 0xC00C, record_type, 1, ttl, len(data)) + data)
+    rcode = 0 if name in ZONE else 3
+    authority = []
+    if not records:
+        soa = b'\0\0' + struct.pack('!IIIII', 1, 3600, 600, 86400, NEGATIVE_TTL)
+        authority.append(struct.pack('!HHHIH', 0xC00C, 6, 1, 3600, len(soa)) + soa)
+    header = struct.pack('!HHHHHH', query_id, 0x8180 | rcode, 1, len(records), len(authority), 0)
+    return header + question + b''.join(records) + b''.join(authority)
+
+
+class StubHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        data, sock = self.request
+        stub['queries'] += 1
+        time.sleep(stub['delay'])
+        sock.sendto(answer(data), self.client_address)
+
+
+class ThreadingUDPServer(socketserver.ThreadingMixIn, socketserver.UDPServer):
+    daemon_threads = True
+
+
+def timed(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--delay-ms', type=float, default=20, help='delay of the stub server')
+    parser.add_argument('--threads', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    stub['delay'] = args.delay_ms / 1000
+    server = ThreadingUDPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    nameservers = [('127.0.0.1', server.server_address[1])]
+
+    print(f"stub delay {args.delay_ms:.0f} ms")
+    print(f"{'case':<40}{'p50 ms':>9}{'queries':>9}")
+
+    def report(name, seconds, queries):
+        print(f"{name:<40}{seconds * 1000:>9.3f}{queries:>9}")
+
+    uncached = DNSResolver(nameservers=nameservers, max_entries=0, hosts={})
+    stub['queries'] = 0
+    seconds = timed(lambda: uncached.resolve_sync('www.example.test'), args.repeat)
+    report(f'no cache, {args.repeat} lookups', seconds, stub['queries'])
+
+    resolver = DNSResolver(nameservers=nameservers, hosts={})
+    stub['queries'] = 0
+    resolution = resolver.resolve_sync('www.example.test')
+    seconds = timed(lambda: resolver.resolve_sync('www.example.test'), args.repeat)
+    report(f'cached, {args.repeat} lookups', seconds, stub['queries'])
+    print(f"  -> {resolution.addresses}, ttl {resolution.ttl}")
+
+    collapsing = DNSResolver(nameservers=nameservers, hosts={})
+    stub['queries'] = 0
+    barrier = threading.Barrier(args.threads)
+
+    def lookup(_):
+        barrier.wait()
+        started = time.perf_counter()
+        collapsing.resolve_sync('www.example.test')
+        return time.perf_counter() - started
+    with ThreadPoolExecutor(args.threads) as executor:
+        seconds = statistics.median(executor.map(lookup, range(args.threads)))
+    report(f'{args.threads} threads at once', seconds, stub['queries'])
+    print(f"  -> {collapsing.collapsed} lookups joined a running one")
+
+    stub['queries'] = 0
+
+    def missing():
+        try:
+            resolver.resolve_sync('missing.example.test')
+        except HostNotFound as e:
+            return e.ttl
+    seconds = timed(missing, args.repeat)
+    report(f'name not found, {args.repeat} lookups', seconds, stub['queries'])
+
+    stub['queries'] = 0
+    resolver.resolve_sync('short.example.test')
+    resolver.resolve_sync('short.example.test')
+    time.sleep(1.1)
+    resolver.resolve_sync('short.example.test')
+    print(f"1 s TTL, 2 lookups, wait 1.1 s, 1 lookup: {stub['queries']} queries")
+
+
+if __name__ == '__main__':
+    main()
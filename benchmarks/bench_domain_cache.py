@@ -0,0 +1,100 @@
+"""
+Location lookups of a stream of URLs from a few sites, as in a backfill, with the domain
+lookup cache: without it, with an empty cache, with the entries in Redis only (as for a
+newly started worker) and in the worker's own LRU cache too. Reports the latency of
+get_all_domain_info and the hit rate of each lookup. WHOIS and geolocation are answered
+by local stub servers with a set delay (see bench_domain_lookups); the sites are on
+loopback addresses, so DNS resolution is local.
+
+    python -m benchmarks.bench_domain_cache [--redis URL] [--urls N] [--sites N]
+
+Needs a Redis server (default: REDIS_URL, or redis://localhost:6379/0); the entries of the
+loopback addresses and the benchmark's counters are removed afterwards.
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import time
+from http.server import ThreadingHTTPServer
+
+from benchmarks.bench_domain_lookups import GeoHandler, ThreadingTCPServer, WhoisHandler, delays, start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--redis', default=os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+    parser.add_argument('--urls', type=int, default=300)
+    parser.add_argument('--sites', type=int, default=30)
+    parser.add_argument('--whois-ms', type=float, default=50)
+    parser.add_argument('--geo-ms', type=float, default=30)
+    args = parser.parse_args()
+
+    delays['whois'], delays['geo'] = args.whois_ms / 1000, args.geo_ms / 1000
+    whois_port = start(ThreadingTCPServer(('127.0.0.1', 0), WhoisHandler))
+    geo_server = ThreadingHTTPServer(('127.0.0.1', 0), GeoHandler)
+    geo_server.daemon_threads = True
+    geo_port = start(geo_server)
+    import app.domain as domain
+    from app.domain_cache import DomainCache
+    domain.WHOIS_SERVER = f'127.0.0.1:{whois_port}'
+    domain.IPINFO_URL = f'http://127.0.0.1:{geo_port}/{{ip}}/json'
+    # Wikipedia isn't stubbed, nor cached
+    domain.EXTRACT_LOCATIONS = False
+
+    # Pages of a few sites, some of them visited far more often than others
+    rng = random.Random(1)
+    sites = [f'127.0.0.{number}' for number in range(1, args.sites + 1)]
+    weights = [1 / rank for rank in range(1, args.sites + 1)]
+    urls = [f'http://{rng.choices(sites, weights)[0]}/page/{number}' for number in range(args.urls)]
+
+    def make_cache(**options):
+        cache = DomainCache(url=args.redis, **options)
+        cache.stats_key = 'domain:bench-stats'
+        return cache
+
+    def flush(cache):
+        cache.client.delete(cache.stats_key, *[cache.key(source, site) for source in ('whois', 'dns', 'geo') for site in sites])
+
+    def run(cache):
+        domain.domain_cache = cache
+        samples = []
+        for url in urls:
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                domain.get_all_domain_info(url)
+            samples.append(time.perf_counter() - started)
+        return samples
+
+    print(f"{args.urls} URLs on {args.sites} sites; stubs: whois {args.whois_ms:.0f} ms, geo {args.geo_ms:.0f} ms")
+    print(f"{'cache':<22}{'total s':>9}{'p50 ms':>9}{'p99 ms':>9}  hit rate: whois / dns / geo")
+    shared = make_cache()
+    flush(shared)
+    try:
+        cases = [
+            ('none', make_cache(ttls={'whois': 0, 'dns': 0, 'geo': 0})),
+            ('empty', shared),
+            ('warm, Redis only', make_cache(local_size=0)),
+            ('warm, local LRU', shared),
+        ]
+        for name, cache in cases:
+            samples = run(cache)
+            rates = []
+            for source in ('whois', 'dns', 'geo'):
+                lookups = cache.hits[source] + cache.misses[source]
+                rates.append(f'{cache.hits[source] / lookups:.2f}' if lookups else '-')
+                cache.hits[source] = cache.misses[source] = 0
+            ordered = sorted(samples)
+            print(f"{name:<22}{sum(samples):>9.2f}{statistics.median(samples) * 1000:>9.2f}"
+                  f"{ordered[int(len(ordered) * 0.99)] * 1000:>9.2f}  {' / '.join(rates)}")
+        stats = shared.stats()
+        print('shared counters:', ', '.join(f"{source} {stats[source]['hits']} hits ({stats[source]['local_hits']} local) "
+                                            f"{stats[source]['misses']} misses" for source in stats))
+    finally:
+        flush(shared)
+
+
+if __name__ == '__main__':
+    main()
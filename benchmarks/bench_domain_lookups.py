@@ -0,0 +1,119 @@
+"""
+Latency of get_all_domain_info with its lookups run one after another (the previous
+path: WHOIS, then DNS, then geolocation) vs concurrently with deadlines, against local
+stub servers: a WHOIS server and an ipinfo-style HTTP server that answer after a set
+delay. The last cases make one stub hang past its deadline, to show the partial result.
+
+    python -m benchmarks.bench_domain_lookups [--whois-ms N] [--geo-ms N] [--repeat N]
+
+The URL is on localhost, so DNS resolution is local and fast. The domain lookup cache and
+the extraction of places from Wikipedia are turned off.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import socketserver
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WHOIS_RESPONSE = 'Domain Name: LOCALHOST\nRegistrar: Stub Registrar\nRegistrant Country: KE\n'
+
+# Seconds each stub waits before answering, changed between cases
+delays = {'whois': 0.0, 'geo': 0.0}
+
+
+class WhoisHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.rfile.readline()
+        time.sleep(delays['whois'])
+        self.wfile.write(WHOIS_RESPONSE.encode())
+
+
+class GeoHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(delays['geo'])
+        body = json.dumps({'city': 'Nairobi', 'region': 'Nairobi', 'country': 'KE', 'loc': '-1.28,36.82'}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def start(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1]
+
+
+def sequential(url):
+    from app.domain import DomainInfo
+    domain_info = DomainInfo(url)
+    return {
+        'Domain Name': domain_info.domain_name,
+        'WHOIS Info': domain_info.get_whois_info(),
+        'IP Address': domain_info.get_ip_address(),
+        'Server Location': domain_info.get_server_location(),
+        'Country Code': domain_info.get_country_code(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--whois-ms', type=float, default=300, help='delay of the WHOIS stub')
+    parser.add_argument('--geo-ms', type=float, default=150, help='delay of the geolocation stub')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    whois_port = start(ThreadingTCPServer(('127.0.0.1', 0), WhoisHandler))
+    geo_server = ThreadingHTTPServer(('127.0.0.1', 0), GeoHandler)
+    geo_server.daemon_threads = True
+    geo_port = start(geo_server)
+    os.environ['WHOIS_SERVER'] = f'127.0.0.1:{whois_port}'
+    os.environ['IPINFO_URL'] = f'http://127.0.0.1:{geo_port}/{{ip}}/json'
+    os.environ['DOMAIN_WHOIS_TIMEOUT'] = '1'
+    os.environ['DOMAIN_GEO_TIMEOUT'] = '1'
+    import app.domain as domain
+    from app.domain import get_all_domain_info
+    from app.domain_cache import DomainCache
+    # Every lookup goes to the stubs
+    domain.domain_cache = DomainCache(ttls={'whois': 0, 'dns': 0, 'geo': 0})
+    # Wikipedia isn't stubbed (see bench_ner for the location extraction)
+    domain.EXTRACT_LOCATIONS = False
+
+    url = 'http://localhost/'
+    cases = [
+        ('sequential', sequential, args.whois_ms, args.geo_ms),
+        ('concurrent', get_all_domain_info, args.whois_ms, args.geo_ms),
+        ('sequential, whois hangs', sequential, 3000, args.geo_ms),
+        ('concurrent, whois hangs', get_all_domain_info, 3000, args.geo_ms),
+        ('concurrent, geo hangs', get_all_domain_info, args.whois_ms, 3000),
+    ]
+    print(f"stubs: whois {args.whois_ms:.0f} ms, geo {args.geo_ms:.0f} ms; deadlines: whois 1 s, geo 1 s")
+    print(f"{'case':<26}{'p50 ms':>9}  missing")
+    for name, lookup, whois_ms, geo_ms in cases:
+        delays['whois'], delays['geo'] = whois_ms / 1000, geo_ms / 1000
+        repeat = args.repeat if whois_ms < 1000 and geo_ms < 1000 else 1
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                data = lookup(url)
+            samples.append(time.perf_counter() - started)
+        missing = ', '.join(data.get('timed_out', [])) or '-'
+        print(f"{name:<26}{statistics.median(samples) * 1000:>9.1f}  {missing}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+The offline IP geolocation database on a synthetic range dump the size of a city-level
+one: build time and size, lookup latency for IPv4 and IPv6 addresses (checked against a
+plain bisect over the ranges), the same lookup through an ipinfo-style HTTP stub on
+localhost for comparison, and the memory of worker processes each mapping the database
+vs each reading it into memory.
+
+    python -m benchmarks.bench_geoip [--ipv4 N] [--ipv6 N] [--locations N] [--workers N]
+"""
+import argparse
+import bisect
+import contextlib
+import csv
+import io
+import ipaddress
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+
+from benchmarks.bench_domain_lookups import GeoHandler, start
+from benchmarks.bench_model_memory import memory_kb
+from app.geoip import GeoIPDatabase, build_geoip_database
+
+
+def synthetic_ranges(path, ipv4, ipv6, locations, seed=1):
+    """Writes a DB-IP style CSV of contiguous ranges; returns them as (version, start, end, location index) lists."""
+    rng = random.Random(seed)
+    places = [('EU', f'C{index % 250:03d}', f'Region {index % 4000}', f'City {index}',
+               f'{rng.uniform(-90, 90):.4f}', f'{rng.uniform(-180, 180):.4f}') for index in range(locations)]
+    ranges = []
+    with open(path, 'w', newline='', encoding='utf-8') as csv_file:
+        writer = csv.writer(csv_file)
+        for version, count, bits, address_class in ((4, ipv4, 32, ipaddress.IPv4Address), (6, ipv6, 128, ipaddress.IPv6Address)):
+            # Cut the space into ranges of random sizes around the average
+            average = 2 ** bits // count
+            position = 0
+            for _ in range(count):
+                size = max(1, int(average * rng.uniform(0.1, 1.9)))
+                end = min(position + size, 2 ** bits) - 1
+                place = rng.randrange(locations)
+                writer.writerow([str(address_class(position)), str(address_class(end)), *places[place]])
+                ranges.append((version, position, end, place))
+                position = end + 1
+                if position >= 2 ** bits:
+                    break
+    return ranges, places
+
+
+def worker(path, memory_map, addresses, barrier, results):
+    before = memory_kb()
+    database = GeoIPDatabase(path)
+    if not memory_map:
+        for name in GeoIPDatabase.arrays:
+            setattr(database, name, np.array(getattr(database, name)))
+        database.locations = bytes(database.locations)
+    found = sum(database.lookup(address) is not None for address in addresses)
+    barrier.wait()
+    after = memory_kb()
+    barrier.wait()
+    results.put({'private': after['private'] - before['private'], 'total': after['pss'], 'found': found})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--ipv4', type=int, default=2000000, help='IPv4 ranges')
+    parser.add_argument('--ipv6', type=int, default=500000, help='IPv6 ranges')
+    parser.add_argument('--locations', type=int, default=100000, help='distinct locations')
+    parser.add_argument('--lookups', type=int, default=100000)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        data = os.path.join(directory, 'ranges.csv')
+        ranges, places = synthetic_ranges(data, args.ipv4, args.ipv6, args.locations)
+        path = os.path.join(directory, 'geoip')
+        started = time.perf_counter()
+        count = build_geoip_database(data, path)
+        size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+        print(f"Built {count} ranges ({os.path.getsize(data) / 2 ** 20:.0f}MB of CSV) in {time.perf_counter() - started:.1f}s: "
+              f"{size / 2 ** 20:.1f}MB on disk")
+
+        database = GeoIPDatabase(path)
+        rng = random.Random(2)
+        starts = {4: [], 6: []}
+        for version, range_start, _, _ in ranges:
+            starts[version].append(range_start)
+        by_version = {4: [item for item in ranges if item[0] == 4], 6: [item for item in ranges if item[0] == 6]}
+        print(f"\n{'lookup':<24}{'p50 us':>9}{'p99 us':>9}  correct")
+        for version, address_class, bits in ((4, ipaddress.IPv4Address, 32), (6, ipaddress.IPv6Address, 128)):
+            addresses = [str(address_class(rng.getrandbits(bits))) for _ in range(args.lookups)]
+            samples = []
+            correct = 0
+            for address in addresses:
+                started = time.perf_counter()
+                location = database.lookup(address)
+                samples.append(time.perf_counter() - started)
+                value = int(ipaddress.ip_address(address))
+                _, _, end, place = by_version[version][bisect.bisect_right(starts[version], value) - 1]
+                expected = places[place][3] if value <= end else None  # The ranges may stop short of the last address
+                correct += (location and location['city']) == expected
+            samples.sort()
+            print(f"{f'IPv{version} range table':<24}{samples[len(samples) // 2] * 1e6:>9.1f}{samples[int(len(samples) * 0.99)] * 1e6:>9.1f}"
+                  f"  {correct}/{len(addresses)}")
+
+        import app.domain as domain
+        from app.domain_cache import DomainCache
+        geo_server = ThreadingHTTPServer(('127.0.0.1', 0), GeoHandler)
+        geo_server.daemon_threads = True
+        domain.IPINFO_URL = f'http://127.0.0.1:{start(geo_server)}/{{ip}}/json'
+        domain.geoip_database = False
+        uncached = DomainCache(ttls={'whois': 0, 'dns': 0, 'geo': 0})
+        samples = []
+        for _ in range(200):
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                domain.DomainInfo(f'http://{ipaddress.IPv4Address(rng.getrandbits(32))}/', cache=uncached).get_server_location()
+            samples.append(time.perf_counter() - started)
+        samples.sort()
+        print(f"{'HTTP stub on localhost':<24}{samples[len(samples) // 2] * 1e6:>9.1f}{samples[int(len(samples) * 0.99)] * 1e6:>9.1f}")
+
+        addresses = [str(ipaddress.IPv4Address(rng.getrandbits(32))) for _ in range(10000)]
+        print(f"\n{args.workers} workers  {'private':>10}{'total PSS':>11}")
+        context = multiprocessing.get_context('fork')
+        for mode, memory_map in (('in memory', False), ('mmap', True)):
+            barrier = context.Barrier(args.workers)
+            results = context.Queue()
+            processes = [context.Process(target=worker, args=(path, memory_map, addresses, barrier, results))
+                         for _ in range(args.workers)]
+            for process in processes:
+                process.start()
+            outcomes = [results.get() for _ in processes]
+            for process in processes:
+                process.join()
+            private = statistics.median(outcome['private'] for outcome in outcomes)
+            total = sum(outcome['total'] for outcome in outcomes)
+            print(f"{mode:<11}{private / 1024:>8.1f}MB{total / 1024:>9.0f}MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+The hashing pipeline vs the TF-IDF one: held-out accuracy, training time, the memory of
+the fitted model and its peak while training, and predict latency, on the sample CSV and
+on synthetic pages with growing vocabularies. Then incremental training: the hashing
+model is trained on the first part of the data and updated with each following part
+(update_model), vs refitting the TF-IDF pipeline on everything seen so far.
+
+    python -m benchmarks.bench_hashing [--data CSV] [--terms N ...] [--pages N] [--parts N]
+
+Model memory is the size of the pickled pipeline, which is what a worker holds once it
+has unpickled it. Latency is measured on the pickled pipeline and on its memory-mapped
+export (LinearTextModel), which is what workers load. Run it from the directory
+containing the sample CSV.
+"""
+import argparse
+import os
+import pickle
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from app.classifier import PIPELINE_MODES, WebsiteClassifier
+from app.text_model import LinearTextModel
+from benchmarks.bench_model_memory import synthetic_data
+
+
+def load(csv_file):
+    data = pd.read_csv(csv_file)
+    return train_test_split(data['cleaned_website_text'].fillna(''), data['Category'], test_size=0.2, random_state=42)
+
+
+def accuracy(classifier, X_test, y_test):
+    return sum(predicted == expected for predicted, expected in zip(classifier.classify_many(list(X_test)), y_test)) / len(y_test)
+
+
+def fit(mode, X_train, y_train):
+    classifier = WebsiteClassifier(artifacts_dir=os.devnull, mode=mode, reload_interval=float('inf'))
+    tracemalloc.start()
+    start = time.perf_counter()
+    classifier.train_model(X_train, y_train)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return classifier, seconds, peak
+
+
+def latency(model, texts):
+    samples = []
+    for text in texts[:200]:
+        start = time.perf_counter()
+        model.predict([text])
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def compare(label, X_train, X_test, y_train, y_test):
+    for mode in PIPELINE_MODES:
+        classifier, seconds, peak = fit(mode, X_train, y_train)
+        size = len(pickle.dumps(classifier.pipeline))
+        with tempfile.TemporaryDirectory() as directory:
+            LinearTextModel.export(classifier.pipeline, os.path.join(directory, 'arrays'))
+            arrays = LinearTextModel(os.path.join(directory, 'arrays'))
+            arrays_latency = latency(arrays, list(X_test))
+        print(f"{label:<16}{mode:<9}{accuracy(classifier, X_test, y_test):>9.3f}{seconds:>9.2f}s{size / 1e6:>10.1f}MB"
+              f"{peak / 1e6:>10.1f}MB{latency(classifier.pipeline, list(X_test)) * 1000:>10.2f}ms{arrays_latency * 1000:>10.2f}ms")
+
+
+def incremental(X_train, X_test, y_train, y_test, parts):
+    print(f"\n{'pages seen':>10}{'tfidf refit':>13}{'accuracy':>10}{'hashing update':>16}{'accuracy':>10}")
+    size = len(X_train) // parts
+    hashing = None
+    for part in range(parts):
+        seen = slice(0, (part + 1) * size)
+        new = slice(part * size, (part + 1) * size)
+        tfidf, refit_seconds, _ = fit('tfidf', X_train[seen], y_train[seen])
+        start = time.perf_counter()
+        if hashing is None:
+            hashing, _, _ = fit('hashing', X_train[new], y_train[new])
+        else:
+            hashing.update_model(X_train[new], y_train[new])
+        update_seconds = time.perf_counter() - start
+        print(f"{(part + 1) * size:>10}{refit_seconds:>12.2f}s{accuracy(tfidf, X_test, y_test):>10.3f}"
+              f"{update_seconds:>15.2f}s{accuracy(hashing, X_test, y_test):>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', default='website_classification.csv')
+    parser.add_argument('--terms', type=int, nargs='+', default=[10000, 100000, 400000], help='synthetic vocabulary sizes')
+    parser.add_argument('--pages', type=int, default=4000, help='synthetic pages per vocabulary size')
+    parser.add_argument('--parts', type=int, default=4, help='parts the data is fed in for incremental training')
+    args = parser.parse_args()
+
+    print(f"{'data':<16}{'pipeline':<9}{'accuracy':>9}{'train':>10}{'model':>12}{'peak':>12}{'pickle':>12}{'arrays':>12}")
+    compare('sample CSV', *load(args.data))
+
+    with tempfile.TemporaryDirectory() as directory:
+        for terms in args.terms:
+            data = os.path.join(directory, f'{terms}.csv')
+            # Few of each page's words point at its category, so the task isn't trivial
+            synthetic_data(data, terms, args.pages, own_words=0.15)
+            split = load(data)
+            compare(f'{terms // 1000}k terms', *split)
+        X_train, X_test, y_train, y_test = split
+    incremental(X_train.reset_index(drop=True), X_test, y_train.reset_index(drop=True), y_test, args.parts)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+The enrichment lookups' outbound HTTP client against a local ipinfo-style stub over TLS:
+a new connection per request (the previous requests.get calls) vs the pooled keep-alive
+session; an upstream failing a share of its requests with 503s, without and with retries;
+and an upstream that stalls, without and with the circuit breaker. Prints the latency
+histogram the client recorded for each case.
+
+    python -m benchmarks.bench_http_client [--requests N] [--delay-ms N] [--fail-rate R]
+
+Needs the openssl command, to make the stub's self-signed certificate.
+"""
+import argparse
+import json
+import os
+import random
+import ssl
+import statistics
+import subprocess
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from benchmarks.bench_domain_lookups import start
+from app.http_client import LATENCY_BUCKETS_MS, OutboundClient
+
+stub = {'delay': 0.0, 'fail_rate': 0.0, 'stall': False, 'connections': 0}
+rng = random.Random(1)
+
+
+class IPInfoHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keeps the connection open between requests
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        stub['connections'] += 1
+        super().setup()
+
+    def do_GET(self):
+        if stub['stall']:
+            time.sleep(5)
+        time.sleep(stub['delay'])
+        status = 503 if rng.random() < stub['fail_rate'] else 200
+        body = json.dumps({'city': 'Nairobi', 'region': 'Nairobi', 'country': 'KE', 'loc': '-1.28,36.82'}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def tls_server(directory):
+    key, certificate = os.path.join(directory, 'key.pem'), os.path.join(directory, 'certificate.pem')
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-keyout', key, '-out', certificate,
+                    '-days', '1', '-subj', '/CN=127.0.0.1', '-addext', 'subjectAltName=IP:127.0.0.1'],
+                   check=True, capture_output=True)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), IPInfoHandler)
+    server.daemon_threads = True
+    server.handle_error = lambda request, address: None  # Clients that gave up on a stalled request
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(certificate, key)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    return server, certificate
+
+
+def run(get, count):
+    stub['connections'] = 0
+    samples, failures = [], 0
+    for _ in range(count):
+        started = time.perf_counter()
+        try:
+            failures += get().status_code != 200
+        except requests.RequestException:
+            failures += 1
+        samples.append(time.perf_counter() - started)
+    return samples, failures
+
+
+def histogram(client, upstream):
+    stats = client.stats(client.counts)[upstream]
+    buckets = ' '.join(f"{bucket}:{count}" for bucket, count in stats['latency_ms'].items() if count)
+    return f"    histogram (ms bound:attempts) {buckets}; retries {stats['retries']}, rejected {stats['rejected']}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--delay-ms', type=float, default=2, help='delay of the stub')
+    parser.add_argument('--fail-rate', type=float, default=0.2, help='share of requests the flaky stub fails')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        server, certificate = tls_server(directory)
+        url = f'https://127.0.0.1:{start(server)}/41.90.0.1/json'
+        stub['delay'] = args.delay_ms / 1000
+
+        print(f"{'case':<38}{'p50 ms':>9}{'p99 ms':>9}{'failed':>8}{'conns':>7}")
+
+        def report(name, samples, failures):
+            ordered = sorted(samples)
+            print(f"{name:<38}{statistics.median(samples) * 1000:>9.2f}{ordered[int(len(ordered) * 0.99)] * 1000:>9.2f}"
+                  f"{failures:>8}{stub['connections']:>7}")
+
+        report('requests.get, new connection each', *run(lambda: requests.get(url, verify=certificate, timeout=5),
+                                                          args.requests))
+        pooled = OutboundClient(retries=0, flush_interval=float('inf'))
+        report('pooled session', *run(lambda: pooled.get('ipinfo', url, timeout=5, verify=certificate), args.requests))
+        print(histogram(pooled, 'ipinfo'))
+
+        stub['fail_rate'] = args.fail_rate
+        for retries in (0, 2):
+            client = OutboundClient(retries=retries, backoff=0.01, breaker_failures=1000, flush_interval=float('inf'))
+            report(f'{args.fail_rate:.0%} 503s, {retries} retries',
+                   *run(lambda: client.get('ipinfo', url, timeout=5, verify=certificate), args.requests))
+            print(histogram(client, 'ipinfo'))
+        stub['fail_rate'] = 0
+
+        stub['stall'] = True
+        stalled = min(args.requests, 20)
+        for name, failures in (('stalled, no breaker', 1000), ('stalled, breaker after 5', 5)):
+            client = OutboundClient(retries=0, breaker_failures=failures, flush_interval=float('inf'))
+            samples, failed = run(lambda: client.get('ipinfo', url, timeout=0.2, verify=certificate), stalled)
+            report(f'{name} ({stalled} requests)', samples, failed)
+            print(f"    total {sum(samples):.2f}s; circuit {client.breaker('ipinfo').state}")
+        stub['stall'] = False
+        print(f"buckets: {', '.join(map(str, LATENCY_BUCKETS_MS))}, inf")
+
+
+if __name__ == '__main__':
+    main()
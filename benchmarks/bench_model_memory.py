@@ -0,0 +1,141 @@
+"""
+Memory of the classifier model across prefork workers: forks workers the way the Celery
+prefork pool does, each loading the model and classifying pages, and reports their memory
+while all of them are alive, for the pickled pipeline vs the memory-mapped arrays. Also
+reports load time, classification latency and whether both give the same predictions.
+
+    python -m benchmarks.bench_model_memory [--workers N] [--terms N] [--pages N]
+
+The model is trained on synthetic pages with a vocabulary of ``--terms`` words, in a
+temporary artifact directory, so its size is that of a model trained on a large crawl
+rather than on the small sample CSV. PSS (proportional set size) charges each shared page
+to the processes sharing it in equal parts, so the workers' PSS adds up to the physical
+memory they use together; a worker's own PSS can drop once it forks, as memory it shares
+with the parent is split between more processes. Linux only (it reads /proc/self/smaps_rollup).
+"""
+import argparse
+import contextlib
+import csv
+import io
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from app.classifier import WebsiteClassifier
+
+CATEGORIES = ['E-Commerce', 'Education', 'News', 'Sports', 'Travel']
+
+
+def memory_kb():
+    """Returns the process's PSS and private memory, in kB."""
+    values = {}
+    with open('/proc/self/smaps_rollup', encoding='ascii') as smaps:
+        for line in smaps:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1])
+    return {'pss': values['Pss'], 'private': values['Private_Clean'] + values['Private_Dirty']}
+
+
+def synthetic_data(path, terms, pages, words_per_page=300, own_words=0.6, seed=1):
+    """
+    Writes a training CSV whose categories each favour their own share of the vocabulary:
+    a fraction ``own_words`` of each page's words come from its category's share.
+    """
+    rng = random.Random(seed)
+    vocabulary = [f'w{index:x}q' for index in range(terms)]
+    share = terms // len(CATEGORIES)
+    with open(path, 'w', newline='', encoding='utf-8') as data_file:
+        writer = csv.writer(data_file)
+        writer.writerow(['cleaned_website_text', 'Category'])
+        for page in range(pages):
+            category = page % len(CATEGORIES)
+            own = vocabulary[category * share:(category + 1) * share]
+            words = [rng.choice(own) if rng.random() < own_words else rng.choice(vocabulary) for _ in range(words_per_page)]
+            writer.writerow([' '.join(words), CATEGORIES[category]])
+    return vocabulary
+
+
+def worker(artifacts_dir, memory_map, texts, barrier, results):
+    before = memory_kb()
+    start = time.perf_counter()
+    classifier = WebsiteClassifier(artifacts_dir=artifacts_dir, memory_map=memory_map)
+    with contextlib.redirect_stdout(io.StringIO()):
+        classifier.load_model()
+    load_seconds = time.perf_counter() - start
+    latencies = []
+    predictions = []
+    for text in texts:
+        start = time.perf_counter()
+        predictions.append(classifier.classify_website(text))
+        latencies.append(time.perf_counter() - start)
+    # Measured once every worker has loaded the model, so shared pages are split between all
+    barrier.wait()
+    after = memory_kb()
+    barrier.wait()
+    results.put({'before': before, 'after': after, 'load': load_seconds,
+                 'latency': statistics.median(latencies), 'predictions': predictions})
+
+
+def run(artifacts_dir, memory_map, texts, workers):
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(artifacts_dir, memory_map, texts, barrier, results))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return outcomes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--terms', type=int, default=200000, help='vocabulary size of the synthetic model')
+    parser.add_argument('--pages', type=int, default=2000, help='synthetic training pages')
+    parser.add_argument('--classify', type=int, default=200, help='pages each worker classifies')
+    args = parser.parse_args()
+
+    # Imported before forking, as the app does, so only the model itself differs per mode
+    import sklearn.linear_model  # noqa: F401
+    import sklearn.feature_extraction.text  # noqa: F401
+
+    with tempfile.TemporaryDirectory() as directory:
+        data = os.path.join(directory, 'pages.csv')
+        vocabulary = synthetic_data(data, args.terms, args.pages)
+        builder = WebsiteClassifier(artifacts_dir=os.path.join(directory, 'models'))
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            version = builder.build_artifact(data)
+        print(f"Built model {version} with {len(builder.pipeline.steps[0][1].vocabulary_)} terms "
+              f"in {time.perf_counter() - start:.1f}s")
+        path = builder.artifact_path(version)
+        pickle_kb = os.path.getsize(os.path.join(path, 'model.pkl')) // 1024
+        arrays_kb = sum(os.path.getsize(os.path.join(path, 'arrays', name)) for name in os.listdir(os.path.join(path, 'arrays'))) // 1024
+        print(f"Artifact size: pickle {pickle_kb}kB, arrays {arrays_kb}kB")
+
+        rng = random.Random(2)
+        texts = [' '.join(rng.choice(vocabulary) for _ in range(300)) for _ in range(args.classify)]
+        expected = list(builder.pipeline.predict(texts))
+
+        print(f"\n{args.workers} workers  {'load':>8}{'latency':>10}{'model PSS':>11}{'model private':>15}{'total PSS':>11}  same predictions")
+        for mode, memory_map in (('pickle', False), ('mmap', True)):
+            outcomes = run(os.path.join(directory, 'models'), memory_map, texts, args.workers)
+            load = statistics.median(outcome['load'] for outcome in outcomes)
+            latency = statistics.median(outcome['latency'] for outcome in outcomes)
+            pss = statistics.median(outcome['after']['pss'] - outcome['before']['pss'] for outcome in outcomes)
+            private = statistics.median(outcome['after']['private'] - outcome['before']['private'] for outcome in outcomes)
+            total = sum(outcome['after']['pss'] for outcome in outcomes)
+            same = all(outcome['predictions'] == expected for outcome in outcomes)
+            print(f"{mode:<11}{load * 1000:>8.0f}ms{latency * 1000:>8.2f}ms{pss / 1024:>9.1f}MB{private / 1024:>13.1f}MB"
+                  f"{total / 1024:>9.0f}MB  {same}")
+
+
+if __name__ == '__main__':
+    main()
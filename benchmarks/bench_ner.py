@@ -0,0 +1,112 @@
+"""
+Place extraction from Wikipedia summaries: the previous path, which loaded the full spaCy
+pipeline for every DomainInfo, vs the process's shared pipeline with the entity
+recognizer only; then summaries per second through the full pipeline one at a time, the
+NER-only pipeline one at a time, extract_locations() on batches, and the micro-batcher
+under concurrent lookups.
+
+    python -m benchmarks.bench_ner [--model NAME_OR_PATH] [--summaries N] [--threads N]
+
+The model has to be installed (python -m spacy download en_core_web_sm). The summaries
+are synthetic, about 3000 characters each.
+"""
+import argparse
+import random
+import threading
+import time
+
+import spacy
+
+PLACES = ['Nairobi', 'Kenya', 'London', 'the United Kingdom', 'Lagos', 'Nigeria', 'Paris', 'France',
+          'California', 'San Francisco', 'the Rift Valley', 'Mount Kenya', 'Europe', 'Africa', 'Tokyo']
+SENTENCES = [
+    'The company was founded in {0} in 1998 and moved its headquarters to {1} ten years later.',
+    'It operates offices across {0}, with its largest engineering team based in {1}.',
+    'In 2015 the service launched in {0}, where it had more than two million users by the end of the year.',
+    'The newspaper is printed in {0} and distributed throughout {1}.',
+    'Its founders met while studying at a university near {0}.',
+    'Revenue grew by a third after the expansion into {0} and {1}.',
+]
+
+
+def synthetic_summaries(count, characters=3000, seed=1):
+    rng = random.Random(seed)
+    summaries = []
+    for _ in range(count):
+        sentences = []
+        while sum(len(sentence) + 1 for sentence in sentences) < characters:
+            sentences.append(rng.choice(SENTENCES).format(rng.choice(PLACES), rng.choice(PLACES)))
+        summaries.append(' '.join(sentences))
+    return summaries
+
+
+def per_second(function, summaries):
+    started = time.perf_counter()
+    function(summaries)
+    return len(summaries) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', default=None, help='spaCy pipeline (default: SPACY_MODEL)')
+    parser.add_argument('--summaries', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--old', type=int, default=3, help='lookups through the previous path')
+    args = parser.parse_args()
+
+    import app.domain as domain
+    if args.model:
+        domain.SPACY_MODEL = args.model
+    summaries = synthetic_summaries(args.summaries)
+
+    started = time.perf_counter()
+    for summary in summaries[:args.old]:
+        # As DomainInfo.extract_location did: a pipeline loaded for each instance
+        nlp = spacy.load(domain.SPACY_MODEL)
+        list(nlp(summary).ents)
+    old_seconds = (time.perf_counter() - started) / args.old
+    full = spacy.load(domain.SPACY_MODEL)
+
+    started = time.perf_counter()
+    domain.get_nlp()
+    load_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    domain.extract_locations(summaries[:1])
+    shared_seconds = time.perf_counter() - started
+    print(f"\n{'lookup':<36}{'ms':>9}")
+    print(f"{'full pipeline loaded per lookup':<36}{old_seconds * 1000:>9.1f}")
+    print(f"{'shared NER-only pipeline, first':<36}{(load_seconds + shared_seconds) * 1000:>9.1f}")
+    print(f"{'shared NER-only pipeline, then':<36}{shared_seconds * 1000:>9.1f}")
+    print(f"full pipeline {full.pipe_names}; NER-only {domain.nlp.pipe_names}")
+
+    print(f"\n{'path':<36}{'summaries/s':>12}")
+    rate = per_second(lambda texts: [list(full(text[:domain.NER_MAX_CHARS]).ents) for text in texts], summaries)
+    print(f"{'full pipeline, one at a time':<36}{rate:>12.1f}")
+    rate = per_second(lambda texts: [domain.extract_locations([text]) for text in texts], summaries)
+    print(f"{'NER only, one at a time':<36}{rate:>12.1f}")
+    for batch_size in (8, 32):
+        rate = per_second(lambda texts: [domain.extract_locations(texts[position:position + batch_size])
+                                         for position in range(0, len(texts), batch_size)], summaries)
+        print(f"{f'NER only, batches of {batch_size}':<36}{rate:>12.1f}")
+
+    for name, extract in (('threads calling it', lambda text: domain.extract_locations([text])[0]),
+                          ('threads through the micro-batcher', lambda text: domain.location_batcher.submit(text).result())):
+        results = [None] * len(summaries)
+
+        def worker(offset):
+            for position in range(offset, len(summaries), args.threads):
+                results[position] = extract(summaries[position])
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(args.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        rate = len(summaries) / (time.perf_counter() - started)
+        print(f"{f'{args.threads} {name}':<36}{rate:>12.1f}")
+    batcher = domain.location_batcher
+    print(f"micro-batcher: {batcher.item_count} summaries in {batcher.batch_count} batches")
+
+
+if __name__ == '__main__':
+    main()
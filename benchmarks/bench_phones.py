@@ -0,0 +1,71 @@
+"""
+Phone number extraction: throughput on the page corpus and precision/recall on the
+labelled snippets in fixtures/phones.json, for the current and pre-optimization extractors.
+
+    python -m benchmarks.bench_phones [--corpus DIR] [--repeat N]
+"""
+import argparse
+import json
+import os
+import time
+
+from app.scrape import Scraper, validate_phone_number
+from benchmarks.corpus import load_corpus
+from benchmarks.legacy import LegacyScraper
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'phones.json')
+
+
+def precision_recall(scraper_class, fixtures):
+    true_positives = false_positives = false_negatives = 0
+    for fixture in fixtures:
+        found = set(scraper_class(f"<p>{fixture['text']}</p>").extract_phone_numbers())
+        expected = set(fixture['expected'])
+        true_positives += len(found & expected)
+        false_positives += len(found - expected)
+        false_negatives += len(expected - found)
+    precision = true_positives / (true_positives + false_positives) if true_positives + false_positives else 1.0
+    recall = true_positives / (true_positives + false_negatives) if true_positives + false_negatives else 1.0
+    return precision, recall
+
+
+def time_phone_numbers(scraper, repeat, clear_cache=False):
+    best = float('inf')
+    for _ in range(repeat):
+        if clear_cache:
+            validate_phone_number.cache_clear()
+        start = time.perf_counter()
+        scraper.extract_phone_numbers()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--corpus', help='directory of saved *.html pages (default: generated pages)')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with open(FIXTURES, encoding='utf-8') as fixtures_file:
+        fixtures = json.load(fixtures_file)
+    print(f'Accuracy on {len(fixtures)} labelled snippets')
+    for label, scraper_class in [('legacy', LegacyScraper), ('current', Scraper)]:
+        precision, recall = precision_recall(scraper_class, fixtures)
+        print(f'  {label:<8} precision {precision:.2f}  recall {recall:.2f}')
+
+    print(f"\n{'page':<24}{'legacy':>10}{'cold':>10}{'warm':>10}{'MB/s':>8}")
+    for name, html, url in load_corpus(args.corpus):
+        legacy = LegacyScraper(html, url)
+        legacy.soup.get_text()  # Not timed: the legacy extractor pays for it on every call
+        legacy_time = time_phone_numbers(legacy, args.repeat)
+        current = Scraper(html, url)
+        current.index_document()
+        # Cold: empty validation cache, as for the first page of a site; warm: cache filled
+        cold_time = time_phone_numbers(current, args.repeat, clear_cache=True)
+        warm_time = time_phone_numbers(current, args.repeat)
+        megabytes = len(html) / 1e6
+        print(f"{name:<24}{legacy_time:>9.3f}s{cold_time:>9.3f}s{warm_time:>9.3f}s{megabytes / cold_time:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Registrable domains and TLDs of a stream of URLs, as in a backfill: the public suffix
+trie (compiled once, then per URL with and without its cache of host names) vs the
+previous paths, python-whois's extract_domain for the WHOIS cache key and the dot
+splitting of extract_domain_name and get_country_code. Also counts the groups each
+path puts the URLs in, against the sites they were generated from.
+
+    python -m benchmarks.bench_public_suffix [--urls N] [--sites N]
+
+The URLs are synthetic: sites under a mix of generic, country-code and second-level
+suffixes, with subdomains, ports, user info and paths.
+"""
+import argparse
+import random
+import time
+
+import whois
+
+from app.public_suffix import PublicSuffixList, get_public_suffixes, hostname_of, registrable_domain, top_level_domain
+from benchmarks.legacy import legacy_country_code, legacy_domain_name
+
+SUFFIXES = ['com', 'org', 'net', 'io', 'co.uk', 'ac.uk', 'co.ke', 'or.ke', 'com.au', 'co.jp', 'de', 'fr', 'ke',
+            'com.br', 'gov.uk', 'co.za', 'info', 'news', 'kobe.jp', 'nom.br']
+SUBDOMAINS = ['', '', 'www.', 'news.', 'blog.', 'shop.', 'en.', 'static.cdn.']
+
+
+def synthetic_urls(count, sites, seed=1):
+    """Returns URLs and the site (registrable domain) each was made from."""
+    rng = random.Random(seed)
+    domains = [f"site{index}-{rng.choice('abcdefgh')}.{rng.choice(SUFFIXES)}" for index in range(sites)]
+    # Under the wildcard rules *.nom.br and *.kobe.jp, the sites are one label further down
+    domains = [f'x.{domain}' if domain.endswith(('.nom.br', '.kobe.jp')) else domain for domain in domains]
+    urls, expected = [], []
+    for _ in range(count):
+        domain = rng.choice(domains)
+        host = rng.choice(SUBDOMAINS) + domain
+        port = rng.choice(['', '', '', ':8080'])
+        user = 'user:secret@' if rng.random() < 0.02 else ''
+        path = rng.choice(['/', '/index.html', '/news/2024/story.uk', '/a.b.c/page?id=3', ''])
+        urls.append(f"{rng.choice(['https', 'http'])}://{user}{host}{port}{path}")
+        expected.append(domain)
+    return urls, expected
+
+
+def timed(name, function, urls, expected=None):
+    started = time.perf_counter()
+    results = [function(url) for url in urls]
+    seconds = time.perf_counter() - started
+    groups = len(set(results))
+    wrong = sum(result != site for result, site in zip(results, expected)) if expected else None
+    print(f"{name:<40}{seconds:>8.2f}{len(urls) / seconds / 1e6:>9.2f}{groups:>9}"
+          f"{'' if wrong is None else wrong:>9}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--urls', type=int, default=2000000)
+    parser.add_argument('--sites', type=int, default=20000)
+    parser.add_argument('--whois-urls', type=int, default=200000, help='URLs through python-whois, which is slower')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    suffixes = get_public_suffixes()
+    print(f"compiled {suffixes.rule_count} rules in {(time.perf_counter() - started) * 1000:.0f} ms")
+    urls, expected = synthetic_urls(args.urls, args.sites)
+    print(f"{len(urls)} URLs on {args.sites} sites\n")
+    print(f"{'path':<40}{'s':>8}{'M/s':>9}{'groups':>9}{'wrong':>9}")
+
+    uncached = PublicSuffixList()
+    timed('trie, no host cache', lambda url: uncached.split(hostname_of(url))[0], urls, expected)
+    timed('registrable_domain (trie, host cache)', registrable_domain, urls, expected)
+    timed('top_level_domain', top_level_domain, urls)
+
+    sample = urls[:args.whois_urls]
+    timed(f'whois.extract_domain ({len(sample)} URLs)', lambda url: whois.extract_domain(hostname_of(url)),
+          sample, expected)
+    timed('previous extract_domain_name', legacy_domain_name, urls)
+    timed('previous get_country_code', legacy_country_code, urls)
+
+    # How the previous name and country code went wrong: names shared by different sites, and
+    # country codes missed, for URLs whose host ends in a two-letter TLD
+    names = {}
+    for url, site in zip(urls, expected):
+        names.setdefault(legacy_domain_name(url), set()).add(site)
+    shared = sum(len(sites) for sites in names.values() if len(sites) > 1)
+    country = [url for url, site in zip(urls, expected) if len(site.rsplit('.', 1)[-1]) == 2]
+    missed = sum(legacy_country_code(url) == 'N/A' for url in country)
+    print(f"\nprevious name: {len(names)} names for {args.sites} sites, {shared} sites sharing one "
+          f"(news.bbc.co.uk was news)")
+    print(f"previous country code: missed on {missed} of {len(country)} URLs with a country-code TLD")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Retraining from corrections: a hashing model is built from a small part of a synthetic
+labelled corpus, then the rest arrives as user corrections, a batch between two
+retraining runs (retrain_from_corrections, as run by celery beat). For each run it
+reports the time taken, the held-out accuracy before and after, and the time a full
+refit on all the data seen so far would take instead.
+
+    python -m benchmarks.bench_retraining [--terms N] [--pages N] [--base N] [--batch N]
+
+Runs against a temporary SQLite database and artifact directory.
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+import pandas as pd
+
+from benchmarks.bench_model_memory import synthetic_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--terms', type=int, default=50000, help='vocabulary size of the synthetic pages')
+    parser.add_argument('--pages', type=int, default=6000, help='synthetic pages in all')
+    parser.add_argument('--base', type=int, default=500, help='pages the first model is built from')
+    parser.add_argument('--batch', type=int, default=500, help='corrections between two runs')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        os.environ['CLASSIFIER_ARTIFACTS_DIR'] = os.path.join(directory, 'models')
+        from app import create_app
+        from app.classifier import WebsiteClassifier
+        from app.models import ClassificationSample, db
+        from app.retraining import is_held_out, retrain_from_corrections
+
+        data_file = os.path.join(directory, 'pages.csv')
+        synthetic_data(data_file, args.terms, args.pages, own_words=0.15)
+        data = pd.read_csv(data_file).sample(frac=1, random_state=3)
+        pd.DataFrame(data[:args.base]).to_csv(os.path.join(directory, 'base.csv'), index=False)
+        with contextlib.redirect_stdout(io.StringIO()):
+            app = create_app()
+            WebsiteClassifier(mode='hashing').build_artifact(os.path.join(directory, 'base.csv'))
+        corrections = data[args.base:]
+
+        print(f"{'run':>4}{'corrections':>13}{'new':>6}{'retrain':>10}{'full refit':>12}{'accuracy':>10}{'after':>8}  status")
+        with app.app_context():
+            for run, start in enumerate(range(0, len(corrections), args.batch), 1):
+                batch = corrections[start:start + args.batch]
+                for text, label in zip(batch['cleaned_website_text'], batch['Category']):
+                    task_id = str(uuid.uuid4())
+                    db.session.add(ClassificationSample(task_id=task_id, text=text, predicted=None, label=label,
+                                                        corrected_at=datetime.utcnow(), held_out=is_held_out(task_id)))
+                db.session.commit()
+
+                started = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    summary = retrain_from_corrections(WebsiteClassifier())
+                retrain_seconds = time.perf_counter() - started
+
+                seen = pd.concat([data[:args.base], corrections[:start + args.batch]])
+                refit = WebsiteClassifier(mode='hashing')
+                started = time.perf_counter()
+                refit.train_model(seen['cleaned_website_text'], seen['Category'])
+                refit_seconds = time.perf_counter() - started
+
+                before = summary.get('previous_accuracy')
+                after = summary.get('accuracy')
+                print(f"{run:>4}{start + len(batch):>13}{summary.get('trained_on', 0):>6}{retrain_seconds:>9.2f}s{refit_seconds:>11.2f}s"
+                      f"{before if before is not None else float('nan'):>10.3f}{after if after is not None else float('nan'):>8.3f}"
+                      f"  {summary['status']}")
+
+
+if __name__ == '__main__':
+    main()
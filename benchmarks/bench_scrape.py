@@ -0,0 +1,72 @@
+"""
+Compares Scraper.extract_all against the pre-optimization implementation on the page
+corpus, checking that both return the same data. With --fields, only those fields are
+extracted by the current implementation (the legacy one always extracts everything).
+
+    python -m benchmarks.bench_scrape [--corpus DIR] [--repeat N] [--fields FIELD ...]
+"""
+import argparse
+import time
+
+from app.scrape import Scraper
+from benchmarks.corpus import load_corpus
+from benchmarks.legacy import LegacyScraper
+
+# Fields whose results were deliberately changed, and so are not compared with the legacy
+# implementation. Phone numbers: the redesigned extractor also finds numbers the old one
+# missed; its accuracy is measured by bench_phones. Addresses: matches no longer run into
+# digits from the next block of text; compared by bench_addresses.
+CHANGED_FIELDS = {'phone_numbers', 'addresses'}
+
+
+def normalize(result, exclude=()):
+    """Makes extraction results comparable regardless of set iteration order."""
+    normalized = {}
+    for key, value in result.items():
+        if key in exclude:
+            continue
+        if isinstance(value, dict):
+            normalized[key] = {platform: sorted(links) for platform, links in value.items()}
+        elif isinstance(value, list):
+            normalized[key] = sorted(value)
+        else:
+            normalized[key] = value
+    return normalized
+
+
+def time_extract_all(scraper_class, html, url, repeat, fields=None):
+    """Returns the best parse and extraction times over ``repeat`` runs, plus the result."""
+    best_parse = best_extract = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        scraper = scraper_class(html, url)
+        parsed = time.perf_counter()
+        result = scraper.extract_all() if fields is None else scraper.extract_all(fields)
+        done = time.perf_counter()
+        best_parse = min(best_parse, parsed - start)
+        best_extract = min(best_extract, done - parsed)
+    return best_parse, best_extract, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--corpus', help='directory of saved *.html pages (default: generated pages)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--fields', nargs='+', choices=list(Scraper.extractors))
+    args = parser.parse_args()
+    excluded = set(CHANGED_FIELDS)
+    if args.fields:
+        excluded.update(field for field in Scraper.extractors if field not in args.fields)
+
+    print(f"{'page':<24}{'size':>10}{'parse':>10}{'legacy':>10}{'current':>10}{'speedup':>9}  same")
+    for name, html, url in load_corpus(args.corpus):
+        parse_time, legacy_time, legacy_result = time_extract_all(LegacyScraper, html, url, args.repeat)
+        _, current_time, current_result = time_extract_all(Scraper, html, url, args.repeat, args.fields)
+        same = normalize(legacy_result, excluded) == normalize(current_result, excluded)
+        print(f"{name:<24}{len(html) // 1000:>8}kB{parse_time:>9.3f}s{legacy_time:>9.3f}s{current_time:>9.3f}s"
+              f"{legacy_time / current_time:>8.1f}x  {'yes' if same else 'NO'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Microbenchmark for Scraper.extract_social_links on link-dense pages (news portals, big
+footers), against the pre-optimization implementation.
+
+    python -m benchmarks.bench_social [--links N] [--repeat N]
+"""
+import argparse
+import random
+import time
+
+from app.scrape import Scraper
+from benchmarks.bench_scrape import normalize
+from benchmarks.legacy import LegacyScraper
+
+BLACKLIST = ['doubleclick\\.net', 'tracker\\.net', 'facebook\\.com/tr', 'adservice']
+
+# Links the host dispatch must not get wrong: platforms mentioned outside the host,
+# look-alike hosts, share/intent links, ports and relative links
+EDGE_CASES = [
+    'https://example.com/out?to=https://twitter.com/someone',
+    'https://l.facebook.com/l.php?u=https://instagram.com/brand',
+    'https://notfacebook.com/brand',
+    'https://www.facebook.com/sharer/sharer.php?u=https://twitter.com/x',
+    'https://facebook.com:443/brand',
+    'https://user@github.com/someone',
+    'https://blog.tumblr.com',
+    'https://someone.wordpress.com/',
+    'https://www.linkedin.com/profile/view?id=12345',
+    'https://www.youtube.com/c/channel-name/',
+    'https://www.flickr.com/people/123@N04',
+    'https://www.reddit.com/user/someone',
+    'https://ads.tracker.net/r?u=https://facebook.com/brand',
+    '/relative/facebook.com/brand',
+    'mailto:someone@example.com',
+]
+
+
+def link_dense_page(links, seed=0):
+    """Generates a page with ``links`` anchors, mostly internal and tracker links with social profiles mixed in."""
+    rng = random.Random(seed)
+    anchors = []
+    for i in range(links):
+        roll = rng.random()
+        if roll < 0.6:
+            href = f'/news/{rng.randint(1, 10**6)}/story-{i}'
+        elif roll < 0.8:
+            href = f'https://cdn{rng.randint(1, 20)}.example-news.com/section/{i}?ref=home'
+        elif roll < 0.9:
+            href = f'https://ads{rng.randint(1, 20)}.tracker.net/click?id={i}'
+        elif roll < 0.98:
+            name = f'user{rng.randint(1, 300)}'
+            href = rng.choice([
+                f'https://www.facebook.com/{name}', f'https://twitter.com/{name}',
+                f'https://www.instagram.com/{name}/', f'https://github.com/{name}',
+                f'https://www.youtube.com/channel/{name}', f'https://www.pinterest.com/{name}',
+                f'https://twitter.com/intent/tweet?text={name}',
+            ])
+        else:
+            href = rng.choice(EDGE_CASES)
+        anchors.append(f'<li><a href="{href}">link {i}</a></li>')
+    anchors.extend(f'<a href="{href}">edge</a>' for href in EDGE_CASES)
+    return f'<html><body><ul>{"".join(anchors)}</ul></body></html>'
+
+
+def time_social_links(scraper, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = scraper.extract_social_links()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--links', type=int, nargs='+', default=[1000, 5000, 20000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'links':>8}{'legacy':>10}{'current':>10}{'speedup':>9}  same")
+    for links in args.links:
+        html = link_dense_page(links)
+        legacy = LegacyScraper(html, 'https://www.example-news.com/')
+        legacy.set_blacklist(BLACKLIST)
+        current = Scraper(html, 'https://www.example-news.com/')
+        current.set_blacklist(BLACKLIST)
+        current.index_document()  # Only time the matching, not the shared document walk
+
+        legacy_time, legacy_result = time_social_links(legacy, args.repeat)
+        current_time, current_result = time_social_links(current, args.repeat)
+        same = normalize({'social_links': legacy_result}) == normalize({'social_links': current_result})
+        print(f"{links:>8}{legacy_time:>9.4f}s{current_time:>9.4f}s{legacy_time / current_time:>8.1f}x  {'yes' if same else 'NO'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Process startup cost of the app: time until app.tasks is imported and ready to serve,
+and until the first classification, in fresh processes. It compares the current lazy
+artifact loading with the pre-optimization startup, which read and split the training CSV
+and then loaded the pickled model (or retrained it when missing) and evaluated it, all at
+import time.
+
+    python -m benchmarks.bench_startup [--data CSV] [--repeat N]
+
+Run it from the directory the app runs in, with a model artifact already built
+(python build_model.py).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+CHILD = '''
+import json, resource, sys, time
+start = time.perf_counter()
+import app.tasks as tasks
+mode, data = sys.argv[1], sys.argv[2]
+classifier = tasks.classifier
+if mode != 'current':
+    X_train, X_test, y_train, y_test = classifier.load_data(data)
+    if mode == 'legacy-retrain':
+        classifier.train_model(X_train, y_train)
+    else:
+        classifier.ensure_model_is_loaded()
+    classifier.evaluate_model(X_test, y_test)
+ready = time.perf_counter() - start
+classifier.classify_website('find the best hotel deals and book flights for your next holiday')
+first = time.perf_counter() - start
+print(json.dumps({'ready': ready, 'first': first, 'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+'''
+
+MODES = ['legacy-retrain', 'legacy-load', 'current']
+
+
+def run(mode, data):
+    output = subprocess.run([sys.executable, '-c', CHILD, mode, data], capture_output=True, text=True,
+                            check=True, env={**os.environ, 'PYTHONPATH': os.pathsep.join(sys.path)}).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', default='website_classification.csv')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'startup':<16}{'ready':>9}{'first':>9}{'peak RSS':>11}")
+    for mode in MODES:
+        runs = [run(mode, args.data) for _ in range(args.repeat)]
+        ready = statistics.median(result['ready'] for result in runs)
+        first = statistics.median(result['first'] for result in runs)
+        rss = statistics.median(result['rss_kb'] for result in runs)
+        print(f"{mode:<16}{ready:>8.2f}s{first:>8.2f}s{rss // 1024:>9.0f}MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Peak memory and time of tree-mode vs streaming-mode extraction as pages grow. Each
+measurement runs in a fresh process so peak RSS reflects that run alone.
+
+    python -m benchmarks.bench_streaming [--sizes BYTES ...]
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+from benchmarks.bench_scrape import normalize
+from benchmarks.corpus import generate_page
+
+
+def current_rss_kb():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+def measure(path, streaming, results):
+    from app.scrape import make_scraper
+
+    with open(path, encoding='utf-8') as page_file:
+        html = page_file.read()
+    before = current_rss_kb()
+    start = time.perf_counter()
+    result = make_scraper(html, 'https://www.example.com/', streaming=streaming).extract_all()
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((max(peak - before, 0), elapsed, normalize(result)))
+
+
+def run_isolated(path, streaming):
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=measure, args=(path, streaming, results))
+    process.start()
+    outcome = results.get()
+    process.join()
+    return outcome
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000_000, 5_000_000, 20_000_000])
+    args = parser.parse_args()
+
+    print(f"{'size':>10}{'tree peak':>12}{'stream peak':>13}{'tree':>9}{'stream':>9}  same")
+    for size in args.sizes:
+        html, _ = generate_page(size)
+        with tempfile.NamedTemporaryFile('w', suffix='.html', delete=False, encoding='utf-8') as page_file:
+            page_file.write(html)
+        try:
+            tree_peak, tree_time, tree_result = run_isolated(page_file.name, streaming=False)
+            stream_peak, stream_time, stream_result = run_isolated(page_file.name, streaming=True)
+        finally:
+            os.unlink(page_file.name)
+        print(f"{size // 1000:>8}kB{tree_peak // 1024:>10}MB{stream_peak // 1024:>11}MB"
+              f"{tree_time:>8.2f}s{stream_time:>8.2f}s  {'yes' if tree_result == stream_result else 'NO'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Accuracy and latency of the text the classifier is given: all the text of the page (the
+previous path, extract_text) vs its normalized main content (extract_main_text) under a
+few token budgets, on labelled pages rendered from the held-out split of the training
+CSV with the boilerplate of a real site around them: navigation, a cookie banner, a
+sidebar and related links teasing pages of any category, script fallbacks and a footer.
+Half of the pages mark their content up with <main>, the others don't. With
+``--content-repeat N`` each page's content is its text N times over, for long articles.
+
+    python -m benchmarks.bench_text_prep [--data CSV] [--boilerplate-kb N ...] [--content-repeat N]
+
+Run it from the directory the app runs in, with a model artifact built from the same CSV
+(python build_model.py), so the pages are ones the model was not trained on.
+"""
+import argparse
+import contextlib
+import html as html_escaping
+import io
+import random
+import statistics
+import time
+
+from app.classifier import WebsiteClassifier
+from app.scrape import extract_main_text, extract_text
+
+NAVIGATION = ['Home', 'Shop', 'News', 'Sports', 'Travel', 'Courses', 'Deals', 'Sign in', 'Cart', 'Contact us']
+
+
+def render_page(text, teasers, boilerplate_kb, use_main, rng):
+    """Returns a page with ``text`` as its content and at least ``boilerplate_kb`` kB of furniture around it."""
+    paragraphs = ''.join(f'<p>{html_escaping.escape(" ".join(words))}</p>'
+                         for words in chunks(text.split(), 40))
+    content = f'<main><article><h1>Welcome</h1>{paragraphs}</article></main>' if use_main \
+        else f'<div id="content"><div class="post"><h1>Welcome</h1>{paragraphs}</div></div>'
+    links = ''.join(f'<li><a href="/{item.lower()}">{item}</a></li>' for item in NAVIGATION)
+    related = []
+    size = 0
+    while size < boilerplate_kb * 1024 or not related:
+        teaser = ' '.join(rng.choice(teasers).split()[:25])
+        item = f'<li><a href="/story/{len(related)}">{html_escaping.escape(teaser)}</a></li>'
+        related.append(item)
+        size += len(item)
+    half = len(related) // 2
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>Welcome</title>'
+        '<script>window.dataLayer = [{"page": "home sports news shop travel"}];</script></head><body>'
+        f'<header class="site-header"><nav class="navbar"><ul>{links}</ul></nav></header>'
+        '<div class="cookie-banner">We use cookies to improve your experience. Accept all cookies</div>'
+        f'{content}'
+        f'<aside class="sidebar"><h2>Trending</h2><ul>{"".join(related[:half])}</ul></aside>'
+        f'<div class="related-posts"><h2>You may also like</h2><ul>{"".join(related[half:])}</ul></div>'
+        '<noscript>Please enable JavaScript to view the comments and shop our deals</noscript>'
+        f'<footer><ul>{links}</ul><p>Copyright. Privacy policy. Terms of service.</p></footer>'
+        '</body></html>'
+    )
+
+
+def chunks(items, size):
+    return [items[position:position + size] for position in range(0, len(items), size)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', default='website_classification.csv')
+    parser.add_argument('--boilerplate-kb', type=int, nargs='+', default=[2, 50, 500],
+                        help='size of the page furniture around the content')
+    parser.add_argument('--content-repeat', type=int, default=1, help='times each page repeats its text')
+    parser.add_argument('--budgets', type=int, nargs='+', default=[100, 300, 1000, 0], help='token budgets (0: no limit)')
+    args = parser.parse_args()
+
+    classifier = WebsiteClassifier()
+    with contextlib.redirect_stdout(io.StringIO()):
+        X_train, X_test, y_train, y_test = classifier.load_data(args.data)
+        classifier.ensure_model_is_loaded()
+    texts, labels = list(X_test.fillna('')), list(y_test)
+    teasers = list(X_train.fillna(''))
+
+    preparations = [('full text', lambda html: extract_text(html))]
+    for budget in args.budgets:
+        preparations.append((f'main, {budget or "all"} words', lambda html, budget=budget: extract_main_text(html, max_tokens=budget)))
+
+    print(f"{len(texts)} held-out pages")
+    print(f"{'boilerplate':>11}  {'text':<20}{'accuracy':>9}{'prepare ms':>12}{'classify ms':>13}{'words':>8}")
+    for boilerplate_kb in args.boilerplate_kb:
+        rng = random.Random(boilerplate_kb)
+        pages = []
+        for index, text in enumerate(texts):
+            pages.append(render_page(' '.join([text] * args.content_repeat), teasers, boilerplate_kb, index % 2 == 0, rng))
+        for name, prepare in preparations:
+            correct = 0
+            prepare_times, classify_times, word_counts = [], [], []
+            for page, label in zip(pages, labels):
+                start = time.perf_counter()
+                page_text = prepare(page)
+                prepared = time.perf_counter()
+                predicted = classifier.classify_website(page_text)
+                classify_times.append(time.perf_counter() - prepared)
+                prepare_times.append(prepared - start)
+                word_counts.append(len(page_text.split()))
+                correct += predicted == label
+            print(f"{boilerplate_kb:>9}kB  {name:<20}{correct / len(pages):>9.3f}{statistics.median(prepare_times) * 1000:>12.2f}"
+                  f"{statistics.median(classify_times) * 1000:>13.2f}{statistics.median(word_counts):>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Wikipedia summaries for location extraction against a local MediaWiki API stub that
+answers after a set delay: the previous path's three requests per lookup (search, page,
+page by id, the last with the whole article) vs the summary client's single request for
+the introduction, then lookups from the SQLite cache, from a new client on the same file
+(as after a restart), and the cache's size once more terms than it may hold were looked up.
+
+    python -m benchmarks.bench_wikipedia [--delay-ms N] [--terms N] [--cache-size N]
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from benchmarks.bench_domain_lookups import start
+from app.wikipedia_client import SummaryCache, WikipediaClient
+
+INTRO = ('{0} is a news website based in Nairobi, Kenya. It was founded in 2009 and covers '
+         'East Africa, with bureaus in Kampala, Uganda and Dar es Salaam, Tanzania. ') * 6
+SECTION = 'The site expanded its coverage of Europe and the Americas over the following decade. ' * 40
+
+stub = {'delay': 0.0, 'requests': 0, 'bytes': 0}
+
+
+def article(title):
+    return INTRO.format(title) + '\n\n== History ==\n' + SECTION * 8
+
+
+class MediaWikiHandler(BaseHTTPRequestHandler):
+    """Answers the queries of the summary client, and of the previous path, about any term."""
+
+    def do_GET(self):
+        stub['requests'] += 1
+        time.sleep(stub['delay'])
+        params = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+        if params.get('generator') == 'search':
+            term = params['gsrsearch']
+            # The first result is a disambiguation page, to be passed over
+            pages = [{'pageid': 1, 'title': f'{term} (disambiguation)', 'index': 1,
+                      'pageprops': {'disambiguation': ''}, 'extract': f'{term} may refer to:'},
+                     {'pageid': 2, 'title': term.title(), 'index': 2,
+                      'extract': INTRO.format(term.title()) if params.get('exintro') else article(term.title())}]
+            body = {'batchcomplete': True, 'query': {'pages': pages}}
+        elif params.get('list') == 'search':
+            body = {'query': {'search': [{'title': params['srsearch'].title()}]}}
+        else:
+            title = params.get('titles', 'Page')
+            body = {'query': {'pages': {'2': {'pageid': 2, 'title': title, 'extract': article(title)}}}}
+        data = json.dumps(body).encode()
+        stub['bytes'] += len(data)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def previous_path(api_url, term):
+    """The requests wikipedia.search(), wikipedia.page() and WikipediaPage(pageid=...).content made."""
+    title = requests.get(api_url, params={'list': 'search', 'srsearch': term, 'action': 'query', 'format': 'json'}).json()
+    title = title['query']['search'][0]['title']
+    requests.get(api_url, params={'titles': title, 'prop': 'info|pageprops', 'action': 'query', 'format': 'json'})
+    page = requests.get(api_url, params={'pageids': 2, 'prop': 'extracts|revisions', 'explaintext': '',
+                                        'action': 'query', 'format': 'json'}).json()
+    return next(iter(page['query']['pages'].values()))['extract']
+
+
+def measure(lookup, terms):
+    stub['requests'] = stub['bytes'] = 0
+    samples = []
+    for term in terms:
+        started = time.perf_counter()
+        lookup(term)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), stub['requests'] / len(terms), stub['bytes'] / len(terms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--delay-ms', type=float, default=50, help='delay of the stub')
+    parser.add_argument('--terms', type=int, default=200)
+    parser.add_argument('--cache-size', type=int, default=100, help='entries the cache may hold in the last case')
+    args = parser.parse_args()
+
+    stub['delay'] = args.delay_ms / 1000
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MediaWikiHandler)
+    server.daemon_threads = True
+    api_url = f'http://127.0.0.1:{start(server)}/w/api.php'
+    terms = [f'site{index}' for index in range(args.terms)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'wikipedia_cache.sqlite3')
+        client = WikipediaClient(api_url=api_url, cache=SummaryCache(path, ttl=3600, max_entries=args.terms * 2))
+        print(f"stub delay {args.delay_ms:.0f} ms, {args.terms} terms")
+        print(f"{'lookup':<32}{'p50 ms':>9}{'requests':>10}{'kB':>8}")
+        cases = [
+            ('previous path, 3 requests', lambda term: previous_path(api_url, term)),
+            ('summary client, uncached', client.summary),
+            ('summary client, cached', client.summary),
+        ]
+        for name, lookup in cases:
+            seconds, requests_made, size = measure(lookup, terms)
+            print(f"{name:<32}{seconds * 1000:>9.3f}{requests_made:>10.1f}{size / 1024:>8.1f}")
+        summary = client.summary(terms[0])
+        print(f"  -> {len(summary)} characters: {summary[:60]}...")
+
+        restarted = WikipediaClient(api_url=api_url, cache=SummaryCache(path, ttl=3600, max_entries=args.terms * 2))
+        seconds, requests_made, size = measure(restarted.summary, terms)
+        print(f"{'new client, same cache file':<32}{seconds * 1000:>9.3f}{requests_made:>10.1f}{size / 1024:>8.1f}")
+
+        bounded = WikipediaClient(api_url=api_url, cache=SummaryCache(os.path.join(directory, 'bounded.sqlite3'),
+                                                                     ttl=3600, max_entries=args.cache_size))
+        stub['delay'] = 0
+        for term in terms:
+            bounded.summary(term)
+        print(f"\n{args.terms} terms into a cache of {args.cache_size}: {len(bounded.cache)} entries kept "
+              f"({os.path.getsize(bounded.cache.path) / 1024:.0f} kB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""
+Page corpus for the benchmarks.
+
+Saved pages are read from a directory of ``*.html`` files (the file stem is used as the
+host of the page URL). When no directory is given, a deterministic set of generated pages
+is used instead; they mimic the structure of real sites (navigation, long article bodies,
+product grids, footers full of links) with contact details mixed in among prices, SKUs and
+dates, at the sizes the workers see in production.
+
+The benchmark suite runs on a versioned corpus saved under benchmarks/corpus/<version>,
+whose manifest.json records each page's URL and SHA-256 so results are only ever compared
+on identical pages. Any change to the pages needs a new version:
+
+    python -m benchmarks.corpus --write benchmarks/corpus/v2
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+
+DEFAULT_SIZES = [50_000, 500_000, 2_000_000, 5_000_000]
+
+CORPUS_VERSION = 'v2'
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), 'corpus', CORPUS_VERSION)
+
+WORDS = (
+    'the of and to in our for with on we you are from new at by this more about all your '
+    'service news product store home contact support team company page help privacy terms '
+    'delivery order customer latest world sport travel hotel price offer report city'
+).split()
+
+STREETS = ['Elm Street', 'Main St', 'Oak Avenue', 'Station Road', 'Park Lane', 'Sunset Blvd', 'Mill Way']
+CITIES = [('Springfield', 'IL', '62701'), ('Portland', 'OR', '97205'), ('Austin', 'TX', '73301')]
+UK_POSTCODES = ['SW1A 2AA', 'EC1A 1BB', 'W1A 0AX', 'M1 1AE']
+PHONES = ['+1 (800) 555-1234', '+44 20 7123 4567', '+49 30 901820', '+33 1 42 68 53 00', '+81 3-3224-9999', '(212) 555-0199']
+SOCIAL = [
+    'https://www.facebook.com/{name}', 'https://twitter.com/{name}', 'https://www.linkedin.com/company/{name}',
+    'https://www.instagram.com/{name}/', 'https://www.youtube.com/channel/{name}', 'https://github.com/{name}',
+    'https://www.facebook.com/sharer/sharer.php?u=https://{host}/', 'https://twitter.com/intent/tweet?url={host}',
+    'https://{name}.tumblr.com/', 'https://medium.com/@{name}', 'https://vimeo.com/{name}',
+]
+
+
+def _sentence(rng, length):
+    return ' '.join(rng.choice(WORDS) for _ in range(length)).capitalize() + '.'
+
+
+def _contact_block(rng, host):
+    street = rng.choice(STREETS)
+    city, state, zipcode = rng.choice(CITIES)
+    return (
+        f'<div class="contact"><p>Call us on {rng.choice(PHONES)} or write to '
+        f'info{rng.randint(1, 9)}@{host}.</p>'
+        f'<p>{rng.randint(1, 9999)} {street}, {city}, {state} {zipcode}</p>'
+        f'<p>{rng.randint(1, 99)} {street}, London, {rng.choice(UK_POSTCODES)}</p>'
+        f'<a href="mailto:sales@{host}?subject=Hello">Email sales</a></div>'
+    )
+
+
+def _product_block(rng):
+    return (
+        f'<div class="product"><h3>{_sentence(rng, 4)}</h3>'
+        f'<span class="price">${rng.randint(1, 4999)}.{rng.randint(0, 99):02d}</span> '
+        f'<span class="sku">SKU {rng.randint(10000, 99999)}-{rng.randint(1000, 9999)}</span> '
+        f'<time>2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}</time> '
+        f'<a href="/product/{rng.randint(1, 10**6)}">View</a></div>'
+    )
+
+
+def _article_block(rng):
+    paragraphs = ''.join(f'<p>{_sentence(rng, rng.randint(20, 80))}</p>' for _ in range(rng.randint(2, 6)))
+    return f'<article><h2>{_sentence(rng, 6)}</h2>{paragraphs}<a href="/news/{rng.randint(1, 10**6)}">Read more</a></article>'
+
+
+def _nav(rng, host, links):
+    items = ''.join(f'<li><a href="/section/{rng.randint(1, 500)}">{rng.choice(WORDS)}</a></li>' for _ in range(links))
+    external = ''.join(f'<li><a href="https://ads{rng.randint(1, 40)}.tracker.net/c?id={rng.randint(1, 10**6)}">ad</a></li>' for _ in range(links // 10))
+    return f'<nav><ul>{items}{external}</ul></nav>'
+
+
+def _footer(rng, host, name):
+    social = ''.join(f'<a href="{pattern.format(name=name, host=host)}">s</a>' for pattern in SOCIAL)
+    return f'<footer>{social}<a href="/feed">RSS</a><a href="https://{host}/rss.xml">Feed</a>{_contact_block(rng, host)}</footer>'
+
+
+def generate_page(size, seed=0):
+    """Generates a page of roughly ``size`` bytes. The same size and seed always give the same page."""
+    rng = random.Random(f'{size}-{seed}')
+    name = f'site{seed}'
+    host = f'www.{name}.com'
+    head = (
+        f'<!DOCTYPE html><html><head><title>{_sentence(rng, 5)}</title>'
+        '<link rel="alternate" type="application/rss+xml" title="RSS" href="/rss.xml">'
+        '<link rel="stylesheet" href="/main.css">'
+        f'<script>var config = {{"page": {rng.randint(1, 10**6)}, "items": [{",".join(str(rng.randint(1, 999)) for _ in range(200))}]}};</script>'
+        '</head><body>'
+    )
+    parts = [head, _nav(rng, host, 150)]
+    length = sum(len(part) for part in parts)
+    while length < size:
+        roll = rng.random()
+        if roll < 0.5:
+            block = _article_block(rng)
+        elif roll < 0.95:
+            block = _product_block(rng)
+        else:
+            block = _contact_block(rng, host)
+        parts.append(block)
+        length += len(block)
+    parts.append(_footer(rng, host, name))
+    parts.append('</body></html>')
+    return ''.join(parts), f'https://{host}/'
+
+
+def saved_corpus_pages():
+    """The pages saved in the versioned corpus, as ``(name, html, url)`` tuples."""
+    from benchmarks.bench_addresses import backtracking_text
+    from benchmarks.bench_social import link_dense_page
+
+    pages = []
+    # The largest pages are above the scraper's streaming threshold
+    for seed, size in enumerate([5_000, 20_000, 100_000, 400_000, 1_000_000, 2_500_000, 5_000_000]):
+        html, url = generate_page(size, seed)
+        pages.append((f'generated-{size // 1000}kb', html, url))
+    pages.append(('link-dense', link_dense_page(3000), 'https://www.example-news.com/'))
+    # Text that made the address patterns backtrack before they were bounded
+    pages.append(('address-stress', f'<html><body><p>{backtracking_text(200)}</p></body></html>', 'https://www.example.com/'))
+    return pages
+
+
+def write_corpus(path):
+    """Saves the corpus pages and their manifest to a new directory."""
+    os.makedirs(path)
+    manifest = {'version': os.path.basename(os.path.normpath(path)), 'pages': {}}
+    for name, html, url in saved_corpus_pages():
+        data = html.encode('utf-8')
+        with open(os.path.join(path, f'{name}.html'), 'wb') as page_file:
+            page_file.write(data)
+        manifest['pages'][name] = {'url': url, 'bytes': len(data), 'sha256': hashlib.sha256(data).hexdigest()}
+    with open(os.path.join(path, 'manifest.json'), 'w', encoding='utf-8') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+        manifest_file.write('\n')
+
+
+def read_manifest(path):
+    """Returns the manifest of a versioned corpus directory, or None for a plain directory of pages."""
+    manifest_path = os.path.join(path, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, encoding='utf-8') as manifest_file:
+        return json.load(manifest_file)
+
+
+def load_corpus(path=None, sizes=None):
+    """
+    Returns a list of ``(name, html, url)`` tuples, either read from a directory of saved
+    pages or generated at the given sizes. Pages of a versioned corpus are checked against
+    its manifest.
+    """
+    path = path or os.getenv('BENCH_CORPUS')
+    if path:
+        manifest = read_manifest(path)
+        if manifest is not None:
+            pages = []
+            for name, entry in manifest['pages'].items():
+                with open(os.path.join(path, f'{name}.html'), 'rb') as page_file:
+                    data = page_file.read()
+                if hashlib.sha256(data).hexdigest() != entry['sha256']:
+                    raise ValueError(f"{name}.html does not match the manifest of corpus {manifest['version']}")
+                pages.append((name, data.decode('utf-8'), entry['url']))
+            return pages
+
+        pages = []
+        for filename in sorted(os.listdir(path)):
+            if not filename.endswith('.html'):
+                continue
+            with open(os.path.join(path, filename), encoding='utf-8', errors='replace') as page_file:
+                html = page_file.read()
+            stem = filename[:-len('.html')]
+            pages.append((stem, html, f'https://{stem}/'))
+        return pages
+
+    pages = []
+    for seed, size in enumerate(sizes or DEFAULT_SIZES):
+        html, url = generate_page(size, seed)
+        pages.append((f'generated-{size // 1000}kb', html, url))
+    return pages
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Saves the benchmark corpus to a new versioned directory.')
+    parser.add_argument('--write', metavar='DIR', required=True)
+    write_corpus(parser.parse_args().write)
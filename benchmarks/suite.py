@@ -0,0 +1,293 @@
+"""
+Benchmark suite: runs the scraper (parsing, indexing, each extractor and extract_all), the
+classifier, flatten_data and the analysis endpoint handlers over the versioned page corpus,
+and reports throughput, p50/p99 latency and peak memory for each, compared with a stored
+baseline.
+
+    python -m benchmarks.suite [--corpus DIR] [--repeat N] [--only TEXT ...]
+                               [--baseline FILE] [--save-baseline] [--tolerance FRACTION]
+
+The endpoint handlers are dispatched in-process through Flask's request handling, with
+Celery tasks executed eagerly and their results kept in memory, an in-memory SQLite
+database, and rate limits and the classification result cache off. Peak memory is the
+peak of Python allocations (tracemalloc) during one extra, untimed run, so memory held by
+C libraries such as libxml2 is not included. The cases that classify are skipped while no
+classifier model has been built. The exit status is 1 when a case regressed beyond the
+tolerance compared with the baseline. Baselines only compare meaningfully on the machine
+and corpus version they were recorded with.
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import math
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from benchmarks.corpus import CORPUS_DIR, load_corpus, read_manifest
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# Differences smaller than these are noise, whatever the ratio
+TIME_NOISE_SECONDS = 0.0002
+MEMORY_NOISE_KB = 64
+
+# Cases without per-run state repeat within a sample until it lasts at least this long,
+# so very fast cases are not measured at the resolution of the timer
+MIN_SAMPLE_SECONDS = 0.005
+
+
+class Case:
+    """
+    A benchmark case: ``run(state)`` is timed, ``setup()`` prepares its state untimed
+    before every run. ``size`` is the number of bytes each run processes, if any.
+    """
+
+    def __init__(self, name, run, setup=None, size=None):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.size = size
+
+    def sample(self, number):
+        """Returns the time one run takes, averaged over ``number`` runs."""
+        state = self.setup() if self.setup else None
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(number):
+            self.run(state)
+        return (time.perf_counter() - start) / number
+
+
+def scraper_cases(pages):
+    from app.scrape import Scraper, flatten_data, make_scraper
+
+    # Pages larger than the streaming threshold get the StreamingScraper, as in scrape_page
+    def parsed(html, url):
+        return lambda: make_scraper(html, url)
+
+    def indexed(html, url):
+        def setup():
+            scraper = make_scraper(html, url)
+            scraper.index_document()
+            return scraper
+        return setup
+
+    cases = []
+    for name, html, url in pages:
+        size = len(html.encode('utf-8'))
+        cases.append(Case(f'scraper.parse/{name}', lambda state, html=html, url=url: make_scraper(html, url), size=size))
+        cases.append(Case(f'scraper.index/{name}', lambda scraper: scraper.index_document(), parsed(html, url), size))
+        for field, method in Scraper.extractors.items():
+            cases.append(Case(f'scraper.{field}/{name}', lambda scraper, method=method: getattr(scraper, method)(),
+                              indexed(html, url), size))
+        cases.append(Case(f'scraper.extract_all/{name}',
+                          lambda state, html=html, url=url: make_scraper(html, url).extract_all(), size=size))
+        result = make_scraper(html, url).extract_all()
+        cases.append(Case(f'flatten_data/{name}', lambda state, result=result: flatten_data(result)))
+    return cases
+
+
+def model_built():
+    from app.tasks import classifier
+
+    return classifier.model_version() is not None
+
+
+def classifier_cases(pages, classify=True):
+    from app.scrape import extract_main_text, extract_text
+    from app.tasks import CLASSIFIER_MAX_TOKENS, classifier
+
+    cases = []
+    for name, html, url in pages:
+        if classify:
+            text = extract_text(html)
+            cases.append(Case(f'classify_website/{name}', lambda state, text=text: classifier.classify_website(text),
+                              size=len(text.encode('utf-8'))))
+        cases.append(Case(f'extract_main_text/{name}',
+                          lambda state, html=html: extract_main_text(html, max_tokens=CLASSIFIER_MAX_TOKENS),
+                          size=len(html.encode('utf-8'))))
+    return cases
+
+
+def endpoint_app():
+    """Creates the app with eager Celery tasks, an in-memory database and no rate limits."""
+    os.environ['DATABASE_URL'] = 'sqlite://'
+    os.environ['CELERY_RESULT_BACKEND'] = 'cache+memory://'
+    from app import create_app
+    from app.tasks import celery, classification_cache
+    from app.utils import cache, limiter
+
+    app = create_app()
+    app.config['CACHE_TYPE'] = 'SimpleCache'
+    cache.init_app(app)
+    limiter.enabled = False
+    # Every run classifies the page again rather than answering from the result cache
+    classification_cache.max_entries = 0
+    celery.conf.update(task_always_eager=True, task_store_eager_result=True, result_backend='cache+memory://')
+    return app
+
+
+def endpoint_cases(pages, classify=True):
+    app = endpoint_app()
+
+    def dispatch(path, method='GET', payload=None):
+        with app.test_request_context(f'/api/v1{path}', method=method, json=payload):
+            return app.full_dispatch_request()
+
+    def post(path, payload):
+        response = dispatch(path, 'POST', payload)
+        if response.status_code != 202:
+            raise RuntimeError(f'{path} returned {response.status_code}: {response.get_data(as_text=True)}')
+        return response.get_json()
+
+    def task_status(task_id):
+        response = dispatch(f'/tasks/{task_id}')
+        if response.status_code != 200 or response.get_json()['state'] != 'SUCCESS':
+            raise RuntimeError(f'/tasks/{task_id} returned {response.status_code}: {response.get_data(as_text=True)}')
+
+    cases = []
+    for name, html, url in pages:
+        size = len(html.encode('utf-8'))
+        payload = {'html': html, 'url': url}
+        cases.append(Case(f'endpoint.social/{name}', lambda state, payload=payload: post('/analysis/social', payload), size=size))
+        if classify:
+            cases.append(Case(f'endpoint.classification/{name}',
+                              lambda state, payload=payload: post('/analysis/classification', payload), size=size))
+        task_id = post('/analysis/social', payload)['task_id']
+        cases.append(Case(f'endpoint.task_status/{name}', lambda state, task_id=task_id: task_status(task_id)))
+    return cases
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a sorted list of samples."""
+    return samples[max(math.ceil(fraction * len(samples)) - 1, 0)]
+
+
+def measure(case, repeat, max_seconds):
+    """
+    Takes ``repeat`` samples of a case (fewer if they take longer than ``max_seconds`` in
+    total, but at least 3), then runs it once more under tracemalloc for its peak memory.
+    """
+    number = 1
+    if case.setup is None:
+        first = case.sample(1)
+        number = min(max(int(MIN_SAMPLE_SECONDS / first) if first else 1000, 1), 1000)
+
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < repeat and (len(samples) < 3 or time.perf_counter() - started < max_seconds):
+        samples.append(case.sample(number))
+    samples.sort()
+
+    state = case.setup() if case.setup else None
+    gc.collect()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline_memory = tracemalloc.get_traced_memory()[0]
+    case.run(state)
+    peak_memory = tracemalloc.get_traced_memory()[1] - baseline_memory
+    tracemalloc.stop()
+
+    mean = sum(samples) / len(samples)
+    result = {
+        'runs': len(samples),
+        'best': samples[0],
+        'p50': percentile(samples, 0.5),
+        'p99': percentile(samples, 0.99),
+        'per_second': 1 / mean if mean else float('inf'),
+        'peak_kb': peak_memory // 1024,
+    }
+    if case.size:
+        result['mb_per_second'] = case.size / 1e6 / mean if mean else float('inf')
+    return result
+
+
+def compare(result, base, tolerance):
+    """
+    Returns the regressions of a result compared with its baseline entry. Time is compared
+    on the best sample, which is the least affected by other load on the machine.
+    """
+    regressions = []
+    if result['best'] > base['best'] * (1 + tolerance) and result['best'] - base['best'] > TIME_NOISE_SECONDS:
+        regressions.append(f"best {result['best'] / base['best']:.2f}x")
+    if result['peak_kb'] > base['peak_kb'] * (1 + tolerance) and result['peak_kb'] - base['peak_kb'] > MEMORY_NOISE_KB:
+        regressions.append(f"memory {result['peak_kb']}kB vs {base['peak_kb']}kB")
+    return regressions
+
+
+def machine():
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--corpus', default=CORPUS_DIR, help='versioned corpus directory (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=20, help='timed runs per case')
+    parser.add_argument('--max-seconds', type=float, default=5, help='time after which a case stops repeating')
+    parser.add_argument('--only', nargs='+', help='only run cases whose name contains one of these')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='slowdown or memory growth reported as a regression')
+    args = parser.parse_args()
+
+    manifest = read_manifest(args.corpus)
+    corpus_version = manifest['version'] if manifest else os.path.basename(os.path.normpath(args.corpus))
+    pages = load_corpus(args.corpus)
+
+    base = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            base = json.load(baseline_file)
+        if base['corpus'] != corpus_version:
+            print(f"Baseline was recorded on corpus {base['corpus']}, not {corpus_version}; not comparing")
+            base = None
+        elif base['machine'] != machine():
+            print(f"Baseline was recorded on another machine ({base['machine']}); comparisons are indicative only")
+
+    # The app prints as it works; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        classify = model_built()
+        cases = scraper_cases(pages) + classifier_cases(pages, classify) + endpoint_cases(pages, classify)
+    if not classify:
+        from app.classifier import MISSING_MODEL_MESSAGE
+
+        print(f"Skipping the classify_website and endpoint.classification cases: {MISSING_MODEL_MESSAGE}")
+    if args.only:
+        cases = [case for case in cases if any(text in case.name for text in args.only)]
+
+    print(f"Corpus {corpus_version}: {len(pages)} pages")
+    print(f"{'case':<44}{'runs':>5}{'best ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'per s':>9}{'MB/s':>8}{'peak kB':>9}  vs baseline")
+    results = {}
+    regressions = {}
+    for case in cases:
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = measure(case, args.repeat, args.max_seconds)
+        results[case.name] = result
+        versus = ''
+        if base and case.name in base['results']:
+            base_result = base['results'][case.name]
+            case_regressions = compare(result, base_result, args.tolerance)
+            if case_regressions:
+                regressions[case.name] = case_regressions
+            versus = f"{result['best'] / base_result['best']:.2f}x" + (f"  REGRESSED ({', '.join(case_regressions)})" if case_regressions else '')
+        mb_per_second = f"{result['mb_per_second']:>8.1f}" if 'mb_per_second' in result else f"{'':>8}"
+        print(f"{case.name:<44}{result['runs']:>5}{result['best'] * 1000:>10.2f}{result['p50'] * 1000:>10.2f}{result['p99'] * 1000:>10.2f}"
+              f"{result['per_second']:>9.1f}{mb_per_second}{result['peak_kb']:>9}  {versus}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as baseline_file:
+            json.dump({'corpus': corpus_version, 'machine': machine(), 'results': results}, baseline_file, indent=1, sort_keys=True)
+            baseline_file.write('\n')
+        print(f'Baseline saved to {args.baseline}')
+    elif regressions:
+        print(f'{len(regressions)} of {len(cases)} cases regressed by more than {args.tolerance:.0%}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,17 @@
+# build_geoip.py
+# Builds the offline IP geolocation database location analysis looks addresses up in,
+# from a CSV of IP ranges (such as the DB-IP "IP to City Lite" dump):
+#     python build_geoip.py --data dbip-city-lite.csv [--out DIR]
+# Workers map the database on their first geolocation; restart them to use a rebuilt one.
+import argparse
+import os
+from app.geoip import build_geoip_database
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Builds the offline IP geolocation database.')
+    parser.add_argument('--data', required=True, help='CSV of IP ranges and their locations')
+    parser.add_argument('--out', default=os.getenv('GEOIP_DATABASE', 'geoip'), help='database directory (default: GEOIP_DATABASE, or geoip)')
+    args = parser.parse_args()
+
+    ranges = build_geoip_database(args.data, args.out)
+    print(f"Built geolocation database {args.out} with {ranges} ranges")
@@ -0,0 +1,31 @@
+# build_model.py
+# Trains the website classifier offline and publishes it as a new model version, which
+# web and worker processes pick up as the current one:
+#     python build_model.py --data website_classification.csv [--artifacts DIR] [--pipeline tfidf|hashing]
+# With --update, the current hashing model is trained further on the data instead of
+# being rebuilt from scratch:
+#     python build_model.py --data new_pages.csv --update
+# With --if-missing, nothing is done when a version was already published (the model
+# service of docker-compose.yml runs it that way on every start):
+#     python build_model.py --data website_classification.csv --if-missing
+import os
+import argparse
+from app.classifier import PIPELINE_MODES, WebsiteClassifier
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Trains the website classifier and publishes it as a new model version.')
+    parser.add_argument('--data', default='website_classification.csv', help='labelled training data (default: %(default)s)')
+    parser.add_argument('--artifacts', help='artifact directory (default: CLASSIFIER_ARTIFACTS_DIR, or models)')
+    parser.add_argument('--pipeline', choices=PIPELINE_MODES, help='pipeline to build (default: CLASSIFIER_PIPELINE, or tfidf)')
+    parser.add_argument('--update', action='store_true', help='train the current hashing model further instead of rebuilding it')
+    parser.add_argument('--if-missing', action='store_true', help='only build a model when no version has been published yet')
+    args = parser.parse_args()
+
+    classifier = WebsiteClassifier(artifacts_dir=args.artifacts, mode=args.pipeline)
+    if args.if_missing and classifier.current_version() is not None:
+        print(f"Model version {classifier.current_version()} already published in {classifier.artifacts_dir}")
+        raise SystemExit(0)
+    if not os.path.exists(args.data):
+        parser.error(f"training data {args.data} not found; classification requests fail until a model is built")
+    version = classifier.update_artifact(args.data) if args.update else classifier.build_artifact(args.data)
+    print(f"Published model version {version} in {classifier.artifacts_dir}")
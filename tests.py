@@ -15,6 +15,20 @@ class APITestCase(unittest.TestCase):
         self.assertEqual(response_data['status'], 'success')
         self.assertIn('task_id', response_data)
 
+    def test_analyze_social_selected_fields(self):
+        url = f"{self.BASE_URL}/analysis/social"
+        data = {'html': 'test_html', 'url': 'http://test.com', 'fields': ['social_links', 'emails']}
+        response = requests.post(url, json=data)
+        self.assertEqual(response.status_code, 202)
+        self.assertIn('task_id', response.json())
+
+    def test_analyze_social_unknown_field(self):
+        url = f"{self.BASE_URL}/analysis/social"
+        data = {'html': 'test_html', 'url': 'http://test.com', 'fields': ['social_links', 'faxes']}
+        response = requests.post(url, json=data)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['status'], 'error')
+
     def test_analyze_classification(self):
         url = f"{self.BASE_URL}/analysis/classification"
         data = {'html': 'test_html'}
@@ -33,6 +47,21 @@ class APITestCase(unittest.TestCase):
         self.assertEqual(response_data['status'], 'success')
         self.assertIn('task_id', response_data)
 
+    def test_analyze_location_bulk(self):
+        url = f"{self.BASE_URL}/analysis/location/bulk"
+        data = {'urls': ['http://test.com', 'http://www.test.com/about', 'http://test.com']}
+        response = requests.post(url, json=data)
+        self.assertEqual(response.status_code, 202)
+        response_data = response.json()
+        self.assertIn('task_id', response_data)
+        self.assertEqual(set(response_data['record_ids']), {'http://test.com', 'http://www.test.com/about'})
+
+    def test_analyze_location_bulk_without_urls(self):
+        url = f"{self.BASE_URL}/analysis/location/bulk"
+        response = requests.post(url, json={'urls': []})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['status'], 'error')
+
     def test_get_task_status(self):
         task_id = 'test_task_id'  # You might want to create a real task first
         url = f"{self.BASE_URL}/tasks/{task_id}"
@@ -42,6 +71,23 @@ class APITestCase(unittest.TestCase):
         self.assertIn('task_id', response_data)
         self.assertIn('state', response_data)
 
+    def test_domain_cache_stats(self):
+        url = f"{self.BASE_URL}/stats/domain-cache"
+        response = requests.get(url)
+        self.assertEqual(response.status_code, 200)
+        stats = response.json()['stats']
+        for source in ('whois', 'dns', 'geo'):
+            self.assertIn('hits', stats[source])
+            self.assertIn('misses', stats[source])
+
+    def test_http_stats(self):
+        url = f"{self.BASE_URL}/stats/http"
+        response = requests.get(url)
+        self.assertEqual(response.status_code, 200)
+        for upstream in response.json()['stats'].values():
+            self.assertIn('requests', upstream)
+            self.assertIn('latency_ms', upstream)
+
     def test_flag_record(self):
         record_id = 1  # You might want to create a real record first
         url = f"{self.BASE_URL}/records/{record_id}/flag"
@@ -79,5 +125,44 @@ class APITestCase(unittest.TestCase):
             self.assertIn('url', response_data[0])
             self.assertIn('html_hash', response_data[0])
 
+class FlattenDataTestCase(unittest.TestCase):
+    def test_flatten_scrape_page_output(self):
+        from app.scrape import scrape_page, flatten_data
+        html = '<html><body><a href="mailto:someone@example.com">Email</a> Call +1 202 555 0143</body></html>'
+        data = scrape_page(html, 'http://test.com')
+        flattened = flatten_data(data)
+        self.assertEqual(flattened['emails'], '??'.join(data['emails']))
+        self.assertIn('someone@example.com', flattened['emails'])
+        self.assertEqual(flattened['phone_numbers'], '??'.join(data['phone_numbers']))
+        self.assertIn('timing_emails', flattened)
+
+class ExtractMainTextTestCase(unittest.TestCase):
+    BODY = ' '.join(f'football league match report goals scored team player round{letter}' for letter in 'abcdefghij')
+
+    def main_text(self, html):
+        from app.scrape import extract_main_text
+        return extract_main_text(html).split()
+
+    def test_body_classes_are_not_boilerplate(self):
+        for classes in ('home page has-sidebar', 'nav-open', 'social-share-enabled', 'sidebar'):
+            words = self.main_text(f'<html><head><title>Sports</title></head><body class="{classes}"><p>{self.BODY}</p></body></html>')
+            self.assertIn('football', words, classes)
+
+    def test_hyphenated_class_tokens_are_not_boilerplate(self):
+        words = self.main_text(f'<html><body><div class="site has-comments"><p>{self.BODY}</p></div></body></html>')
+        self.assertIn('football', words)
+
+    def test_main_container_is_kept(self):
+        words = self.main_text(f'<html><body><main class="sidebar"><p>{self.BODY}</p></main></body></html>')
+        self.assertIn('football', words)
+
+    def test_whole_boilerplate_class_is_removed(self):
+        words = self.main_text(f'<html><body><p>{self.BODY}</p><div class="footer">copyright reserved</div></body></html>')
+        self.assertNotIn('copyright', words)
+
+    def test_falls_back_to_body_text(self):
+        words = self.main_text(f'<html><head><title>Sports</title></head><body><div class="comments"><p>{self.BODY}</p></div></body></html>')
+        self.assertIn('football', words)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file